@@ -0,0 +1,248 @@
+"""
+Network-level scraping for NPTEL courses.
+
+Instead of clicking through weeks, lessons and the transcript language
+dropdowns, load the course page once, capture the JSON the page fetches for
+itself, and read the lesson videos and transcript links straight out of it.
+Only records inside the API's lesson and transcript containers are read, and
+the DOM scrapers take over when the captured payloads hold no plausible
+lesson list. Captured responses can be recorded to a folder and replayed
+later as fixtures.
+"""
+
+import os
+import json
+import asyncio
+import argparse
+from playwright.async_api import async_playwright
+
+from scrape_data import youtube_link_from_src, scrape_nptel_course_parallel
+from scrape_transcripts import scrape_transcripts
+
+TITLE_KEYS = ("lesson_title", "lesson_name", "title", "name")
+VIDEO_KEYS = ("youtube_id", "youtubeid", "video_id", "videoid", "youtube")
+LANGUAGE_HINTS = ("lang",)
+# Only records inside these containers are lessons / transcripts; a course's
+# promo video or an announcement with a YouTube link is never one
+LESSON_CONTAINER_KEYS = ("lessons", "lectures", "videos")
+TRANSCRIPT_CONTAINER_KEYS = ("transcripts",)
+# Fewer lessons than this, or fewer than this share of lesson records with a
+# video, means the API shape was not understood and the DOM scraper should run
+MIN_API_LESSONS = 3
+MIN_VIDEO_SHARE = 0.5
+
+
+def _own_title(node):
+    for key in TITLE_KEYS:
+        value = node.get(key)
+        if isinstance(value, str) and value.strip():
+            return value.strip()
+    return None
+
+
+def _video_link(node):
+    for key, value in node.items():
+        if not isinstance(value, str):
+            continue
+        link = youtube_link_from_src(value)
+        if link:
+            return link
+        if key.lower() in VIDEO_KEYS and len(value) == 11:
+            return f"https://www.youtube.com/watch?v={value}"
+    return None
+
+
+def _drive_link(node):
+    for value in node.values():
+        if isinstance(value, str) and "drive.google.com" in value:
+            return value
+    return None
+
+
+def _language(node, keys=()):
+    return " ".join(
+        str(value) for key, value in node.items()
+        if isinstance(value, str) and (key in keys or any(hint in key.lower() for hint in LANGUAGE_HINTS))
+    ).lower()
+
+
+def _transcript_links(record, title):
+    """(title, link, language) of a transcript record and of its per-language files."""
+    drive = _drive_link(record)
+    if drive:
+        yield {"title": title, "link": drive, "language": _language(record)}
+    for value in record.values():
+        for child in value if isinstance(value, list) else [value]:
+            # Nested records name a language or file, never a lesson
+            if isinstance(child, dict) and _drive_link(child):
+                yield {"title": title, "link": _drive_link(child), "language": _language(child, TITLE_KEYS)}
+
+
+def _parse_course_payloads(payloads):
+    lessons, transcripts = [], []
+    lesson_records = 0
+
+    def walk(node):
+        nonlocal lesson_records
+        if isinstance(node, list):
+            for item in node:
+                walk(item)
+            return
+        if not isinstance(node, dict):
+            return
+        for key, value in node.items():
+            records = value if isinstance(value, list) else []
+            if key.lower() in LESSON_CONTAINER_KEYS:
+                for record in records:
+                    if not isinstance(record, dict) or not _own_title(record):
+                        continue
+                    lesson_records += 1
+                    video = _video_link(record)
+                    if video:
+                        lessons.append({"lesson_title": _own_title(record), "youtube_link": video})
+            elif key.lower() in TRANSCRIPT_CONTAINER_KEYS:
+                for record in records:
+                    if isinstance(record, dict) and _own_title(record):
+                        transcripts.extend(_transcript_links(record, _own_title(record)))
+            else:
+                walk(value)
+
+    for payload in payloads:
+        walk(payload)
+    return lessons, transcripts, lesson_records
+
+
+def parse_course_payloads(payloads):
+    """
+    Walk captured JSON payloads and return (lessons, transcripts) in the same
+    shapes the DOM scrapers save. Only records under the lesson containers
+    (LESSON_CONTAINER_KEYS, e.g. a unit's "lessons") and transcript containers
+    are read, each with its own title; anything else is ignored.
+    """
+    lessons, transcripts, _ = _parse_course_payloads(payloads)
+
+    # A lesson seen in several payloads is kept once; lessons sharing a video are all kept
+    seen = set()
+    lessons = [l for l in lessons if not ((l["lesson_title"], l["youtube_link"]) in seen
+                                          or seen.add((l["lesson_title"], l["youtube_link"])))]
+
+    # Prefer the english-verified transcript when languages are present
+    if any("verified" in t["language"] for t in transcripts):
+        transcripts = [t for t in transcripts if "english" in t["language"] and "verified" in t["language"]]
+    by_title = {}
+    for t in transcripts:
+        by_title.setdefault(t["title"], {"title": t["title"], "link": t["link"]})
+    return lessons, list(by_title.values())
+
+
+def lessons_look_plausible(payloads):
+    """True if the payloads hold enough lessons, most of them with a video."""
+    lessons, _, lesson_records = _parse_course_payloads(payloads)
+    return len(lessons) >= MIN_API_LESSONS and len(lessons) >= MIN_VIDEO_SHARE * lesson_records
+
+
+async def capture_course_responses(course_url, record_dir=None, context=None, timeout_ms=30000):
+    """
+    Load the course page (and its Downloads tab) and collect every JSON response
+    body. Uses the given browser context, or launches a browser of its own.
+    """
+    payloads = []
+
+    async def on_response(response):
+        if "json" not in response.headers.get("content-type", ""):
+            return
+        try:
+            body = await response.json()
+        except Exception:
+            return
+        payloads.append({"url": response.url, "body": body})
+
+    async def capture(target):
+        page = await target.new_page()
+        page.on("response", on_response)
+        await page.goto(course_url, wait_until="networkidle", timeout=timeout_ms)
+        downloads_tab = page.locator(".tab", has_text="Downloads")
+        if await downloads_tab.count():
+            await downloads_tab.first.click()
+            await page.wait_for_load_state("networkidle", timeout=timeout_ms)
+        await page.close()
+
+    if context is None:
+        async with async_playwright() as p:
+            browser = await p.chromium.launch(headless=True)
+            await capture(browser)
+            await browser.close()
+    else:
+        await capture(context)
+
+    print(f"📡 Captured {len(payloads)} JSON responses from {course_url}")
+    if record_dir:
+        os.makedirs(record_dir, exist_ok=True)
+        for idx, payload in enumerate(payloads):
+            with open(os.path.join(record_dir, f"{idx:03d}.json"), "w", encoding="utf-8") as f:
+                json.dump(payload, f, indent=2, ensure_ascii=False)
+    return payloads
+
+
+def load_recorded_responses(replay_dir):
+    payloads = []
+    for name in sorted(os.listdir(replay_dir)):
+        if name.endswith(".json"):
+            with open(os.path.join(replay_dir, name), "r", encoding="utf-8") as f:
+                payloads.append(json.load(f))
+    return payloads
+
+
+def ensure_link_file(path):
+    """Write an empty link list if a scraper left none, so "no transcripts" is a result and not a missing file."""
+    if not os.path.exists(path):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump([], f)
+        print(f"💾 Saved an empty link list to {path}")
+
+
+async def scrape_course_via_api(course_url, video_json, transcripts_json, record_dir=None, replay_dir=None,
+                                context=None):
+    """
+    Discover lessons and transcripts from the course's own JSON responses and
+    save them like the DOM scrapers do; either half falls back to DOM clicking
+    when the API shape is not recognised.
+    """
+    if replay_dir:
+        payloads = load_recorded_responses(replay_dir)
+    else:
+        payloads = await capture_course_responses(course_url, record_dir, context)
+    bodies = [p["body"] for p in payloads]
+    lessons, transcripts = parse_course_payloads(bodies)
+
+    for path in (video_json, transcripts_json):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+
+    if lessons and lessons_look_plausible(bodies):
+        with open(video_json, "w", encoding="utf-8") as f:
+            json.dump(lessons, f, indent=2, ensure_ascii=False)
+        print(f"💾 Saved {len(lessons)} lessons from the course API to {video_json}")
+    else:
+        print(f"⚠️ {len(lessons)} lessons in captured responses is not a plausible course, falling back to DOM scraping.")
+        lessons = await scrape_nptel_course_parallel(course_url, video_json, context=context)
+
+    if transcripts:
+        with open(transcripts_json, "w", encoding="utf-8") as f:
+            json.dump(transcripts, f, indent=2, ensure_ascii=False)
+        print(f"💾 Saved {len(transcripts)} transcript links from the course API to {transcripts_json}")
+    else:
+        print("⚠️ No transcripts in captured responses, falling back to DOM scraping.")
+        transcripts = await scrape_transcripts(course_url, transcripts_json, context) or []
+        ensure_link_file(transcripts_json)
+    return lessons, transcripts
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Scrape an NPTEL course from its JSON API responses.")
+    parser.add_argument("course_url", help="URL of the NPTEL course")
+    parser.add_argument("--json", default="data/video_links.json", help="Output JSON for lesson videos")
+    parser.add_argument("--transcripts_json", default="data/transcripts.json", help="Output JSON for transcript links")
+    parser.add_argument("--record", metavar="DIR", help="Save captured responses to DIR")
+    parser.add_argument("--replay", metavar="DIR", help="Parse responses recorded in DIR instead of opening a browser")
+    args = parser.parse_args()
+    asyncio.run(scrape_course_via_api(args.course_url, args.json, args.transcripts_json, args.record, args.replay))
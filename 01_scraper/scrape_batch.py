@@ -0,0 +1,143 @@
+"""
+Batch scraping of many NPTEL courses against one shared browser.
+
+One Chromium instance is launched for the whole batch; each course gets its
+own browser context from a bounded pool, with a separate concurrency limit
+per host. Results land in per-course link files:
+
+    data/courses/<course_id>/video_links.json
+    data/courses/<course_id>/transcripts.json
+
+Courses are read from their API responses (scrape_api), or with dom_scrape
+by clicking through each page as the single-course DOM scrapers do.
+
+Usage:
+    python 01_scraper/scrape_batch.py https://nptel.ac.in/courses/106106184 courses.txt --contexts 4 [--dom_scrape]
+"""
+
+import os
+import json
+import time
+import asyncio
+import argparse
+from collections import defaultdict
+from urllib.parse import urlparse
+from playwright.async_api import async_playwright
+
+from scrape_api import scrape_course_via_api, ensure_link_file
+from scrape_data import scrape_nptel_course_parallel
+from scrape_transcripts import scrape_transcripts
+
+COURSES_DIR = "data/courses"
+DOM_SCRAPE_PAGES = 4
+
+
+def course_id(course_url):
+    """Last path segment of the course URL, e.g. 106106184."""
+    parsed = urlparse(course_url)
+    segments = [s for s in parsed.path.split("/") if s]
+    raw = segments[-1] if segments else parsed.netloc
+    return "".join(c if c.isalnum() or c in "-_" else "_" for c in raw)
+
+
+def course_link_files(course_url, output_root=COURSES_DIR):
+    course_dir = os.path.join(output_root, course_id(course_url))
+    return os.path.join(course_dir, "video_links.json"), os.path.join(course_dir, "transcripts.json")
+
+
+def read_course_urls(sources):
+    """Expand a mix of URLs and text files (one URL per line, # comments) into a de-duplicated list."""
+    urls = []
+    for source in sources:
+        if os.path.isfile(source):
+            with open(source, "r", encoding="utf-8") as f:
+                urls.extend(line.strip() for line in f if line.strip() and not line.strip().startswith("#"))
+        else:
+            urls.append(source)
+    return list(dict.fromkeys(urls))
+
+
+async def scrape_course_via_dom(course_url, video_json, transcripts_json, context=None, pages=DOM_SCRAPE_PAGES):
+    """Click through the course page for its lessons and transcripts; returns (lessons, transcripts)."""
+    os.makedirs(os.path.dirname(video_json) or ".", exist_ok=True)
+    lessons = await scrape_nptel_course_parallel(course_url, video_json, pages, context=context)
+    transcripts = await scrape_transcripts(course_url, transcripts_json, context) or []
+    ensure_link_file(transcripts_json)
+    return lessons, transcripts
+
+
+async def scrape_courses(course_urls, output_root=COURSES_DIR, contexts=4, per_host=2, skip_existing=True,
+                         dom_scrape=False):
+    """
+    Scrape every course with one browser, from its API responses or, with
+    dom_scrape, by clicking through its page. Returns {course_url: (video_json,
+    transcripts_json)} for the courses whose lesson links exist afterwards; a
+    course without transcripts still has its audio downloaded.
+    """
+    scrape_course = scrape_course_via_dom if dom_scrape else scrape_course_via_api
+    host_limits = defaultdict(lambda: asyncio.Semaphore(per_host))
+    context_pool = asyncio.Semaphore(contexts)
+    summary = {}
+
+    async def scrape_one(browser, course_url):
+        video_json, transcripts_json = course_link_files(course_url, output_root)
+        if skip_existing and os.path.exists(video_json) and os.path.exists(transcripts_json):
+            print(f"ℹ️ {course_url}: link files exist, skipping.")
+            summary[course_url] = {"status": "cached"}
+            return
+        # Wait for the host first: a course queued behind its host's limit must
+        # not hold a context slot another host's course could use
+        async with host_limits[urlparse(course_url).netloc], context_pool:
+            start = time.perf_counter()
+            context = await browser.new_context()
+            try:
+                lessons, transcripts = await scrape_course(
+                    course_url, video_json, transcripts_json, context=context
+                )
+                summary[course_url] = {
+                    "status": "ok", "lessons": len(lessons), "transcripts": len(transcripts),
+                    "seconds": round(time.perf_counter() - start, 1)
+                }
+            except Exception as e:
+                print(f"❌ {course_url}: {e}")
+                summary[course_url] = {"status": "failed", "error": str(e)}
+            finally:
+                await context.close()
+
+    start = time.perf_counter()
+    async with async_playwright() as p:
+        browser = await p.chromium.launch(headless=True)
+        await asyncio.gather(*(scrape_one(browser, url) for url in course_urls))
+        await browser.close()
+    elapsed = time.perf_counter() - start
+
+    os.makedirs(output_root, exist_ok=True)
+    index = {
+        course_id(url): dict(url=url, **summary.get(url, {})) for url in course_urls
+    }
+    with open(os.path.join(output_root, "index.json"), "w", encoding="utf-8") as f:
+        json.dump(index, f, indent=2, ensure_ascii=False)
+    print(f"\n💾 Scraped {len(course_urls)} courses in {elapsed:.1f}s "
+          f"({len(course_urls) / elapsed if elapsed else 0:.2f} courses/s)")
+
+    return {
+        url: course_link_files(url, output_root) for url in course_urls
+        if os.path.exists(course_link_files(url, output_root)[0])
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Scrape many NPTEL courses with one shared browser.")
+    parser.add_argument("courses", nargs="+", help="Course URLs and/or files with one URL per line")
+    parser.add_argument("--output", default=COURSES_DIR, help="Folder for per-course link files")
+    parser.add_argument("--contexts", type=int, default=4, help="Courses scraped concurrently")
+    parser.add_argument("--per_host", type=int, default=2, help="Concurrent courses per host")
+    parser.add_argument("--rescrape", action="store_true", help="Scrape courses whose link files already exist")
+    parser.add_argument("--dom_scrape", action="store_true", help="Click through each course page instead of capturing its API responses")
+    args = parser.parse_args()
+    course_urls = read_course_urls(args.courses)
+    if not course_urls:
+        parser.error(f"no course URLs in {' '.join(args.courses)}")
+    asyncio.run(scrape_courses(
+        course_urls, args.output, args.contexts, args.per_host, not args.rescrape, args.dom_scrape
+    ))
@@ -1,7 +1,8 @@
+import re
 import asyncio
 import json
 import argparse
-from playwright.async_api import async_playwright
+from playwright.async_api import async_playwright, TimeoutError as PlaywrightTimeoutError
 
 async def scrape_nptel_course(course_url, json_path):
     async with async_playwright() as p:
@@ -87,12 +88,185 @@ async def scrape_nptel_course(course_url, json_path):
         print(f"\n💾 Saved {len(data)} entries to {json_path}")
         await browser.close()
 
+# ---------- Parallel multi-page mode ----------
+WEEK_SELECTOR = "//span[contains(translate(text(), 'ABCDEFGHIJKLMNOPQRSTUVWXYZ', 'abcdefghijklmnopqrstuvwxyz'), 'week')]"
+LESSON_SELECTOR = ".lessons-list li"
+YOUTUBE_IFRAME_SELECTOR = "iframe[src*='youtube']"
+YOUTUBE_ID_RE = re.compile(r"(?:youtube(?:-nocookie)?\.com/(?:embed/|watch\?v=|v/)|youtu\.be/)([\w-]{11})")
+
+def youtube_link_from_src(src):
+    """Turn an embed/watch URL into a canonical watch link, or None."""
+    match = YOUTUBE_ID_RE.search(src or "")
+    return f"https://www.youtube.com/watch?v={match.group(1)}" if match else None
+
+CLICK_ATTEMPTS = 2
+# Resolves once the player shows something other than what it showed before the
+# click: a new iframe element, a new src, or a reload of the same src (two
+# lessons sharing a video). window.__player / __loads are set by _mark_player.
+PLAYER_SWITCHED_JS = """([sel, prev]) => {
+    const f = document.querySelector(sel);
+    return !!(f && f.src && (f !== window.__player || f.src !== prev || f.__loads > 0));
+}"""
+
+async def _iframe_src(page):
+    return await page.evaluate(
+        "sel => { const f = document.querySelector(sel); return f ? f.src : null; }",
+        YOUTUBE_IFRAME_SELECTOR
+    )
+
+# True once the player has finished loading its current src (or was never watched)
+PLAYER_LOADED_JS = """sel => {
+    const f = document.querySelector(sel);
+    return !f || !f.__counting || f.__loadedSrc === f.src;
+}"""
+
+async def _mark_player(page):
+    """Remember the current player iframe and count its reloads from now on; returns its src."""
+    return await page.evaluate("""sel => {
+        const f = document.querySelector(sel);
+        window.__player = f;
+        if (!f) return null;
+        if (!f.__counting) {
+            f.__counting = true;
+            f.__loadedSrc = f.src;
+            f.addEventListener("load", () => { f.__loads++; f.__loadedSrc = f.src; });
+        }
+        f.__loads = 0;
+        return f.src;
+    }""", YOUTUBE_IFRAME_SELECTOR)
+
+async def _click_lesson(page, li, timeout_ms):
+    """Click a lesson until the player switches (CLICK_ATTEMPTS tries); returns (src before, switched)."""
+    previous_src = await _mark_player(page)
+    for _ in range(CLICK_ATTEMPTS):
+        await li.scroll_into_view_if_needed()
+        await li.click(force=True)
+        try:
+            # Event-driven: resolve as soon as the player points at (or reloads) a video
+            await page.wait_for_function(PLAYER_SWITCHED_JS, arg=[YOUTUBE_IFRAME_SELECTOR, previous_src],
+                                         timeout=timeout_ms)
+        except PlaywrightTimeoutError:
+            continue
+        try:
+            # Let the new video's load event fire now, not after the next lesson's click
+            await page.wait_for_function(PLAYER_LOADED_JS, arg=YOUTUBE_IFRAME_SELECTOR, timeout=timeout_ms)
+        except PlaywrightTimeoutError:
+            pass
+        return previous_src, True
+    return previous_src, False
+
+async def _scrape_week(page, week_index, timeout_ms):
+    """Open one week on this page and read every lesson's video from the iframe src."""
+    week = page.locator(WEEK_SELECTOR).nth(week_index)
+    week_text = (await week.text_content()).strip()
+    print(f"\n📂 Opening {week_text}...")
+    await week.scroll_into_view_if_needed()
+    await week.click()
+
+    lessons = page.locator(LESSON_SELECTOR)
+    try:
+        await lessons.first.wait_for(timeout=timeout_ms)
+    except PlaywrightTimeoutError:
+        print(f"  ❌ No lessons found in {week_text}")
+        return []
+    count = await lessons.count()
+    print(f"  📑 Found {count} lessons in {week_text}.")
+
+    results = []
+    for j in range(count):
+        li = lessons.nth(j)
+        lesson_title = (await li.text_content()).strip()
+        if not lesson_title:
+            continue
+        try:
+            previous_src, switched = await _click_lesson(page, li, timeout_ms)
+            if not switched:
+                if previous_src is None:
+                    print(f"    ⚠️ Skipped: No YouTube iframe found for lesson '{lesson_title}'")
+                    continue
+                if not (week_index == 0 and j == 0):
+                    print(f"    ❌ Failed: the player stayed on the previous video after {CLICK_ATTEMPTS} "
+                          f"clicks on '{lesson_title}'")
+                    continue
+                # The course page opens with the first lesson already playing
+            src = await _iframe_src(page)
+            youtube_link = youtube_link_from_src(src)
+            if youtube_link:
+                print(f"    ✅ {lesson_title}: {youtube_link}")
+                results.append((j, {"lesson_title": lesson_title, "youtube_link": youtube_link}))
+            else:
+                print(f"    ⚠️ Skipped: the player for lesson '{lesson_title}' is not a YouTube video ({src})")
+        except Exception as e:
+            print(f"    ⚠️ Skipped {lesson_title}: {e}")
+            await page.keyboard.press("Escape")
+    return results
+
+async def _week_worker(context, course_url, queue, results, timeout_ms):
+    page = await context.new_page()
+    await page.goto(course_url)
+    await page.wait_for_selector(WEEK_SELECTOR, timeout=30000)
+    while True:
+        try:
+            week_index = queue.get_nowait()
+        except asyncio.QueueEmpty:
+            break
+        try:
+            for lesson_index, entry in await _scrape_week(page, week_index, timeout_ms):
+                results[(week_index, lesson_index)] = entry
+        except Exception as e:
+            print(f"  ❌ Week {week_index + 1} failed: {e}")
+    await page.close()
+
+async def _scrape_weeks_in_context(context, course_url, pages, timeout_ms):
+    page = await context.new_page()
+    await page.goto(course_url)
+    print(f"📘 Loaded course page: {course_url}")
+    await page.wait_for_selector(WEEK_SELECTOR, timeout=30000)
+    n_weeks = await page.locator(WEEK_SELECTOR).count()
+    await page.close()
+    print(f"🔎 Found {n_weeks} week sections, scraping with {min(pages, n_weeks)} pages.")
+
+    queue = asyncio.Queue()
+    for week_index in range(n_weeks):
+        queue.put_nowait(week_index)
+    results = {}
+    await asyncio.gather(*(
+        _week_worker(context, course_url, queue, results, timeout_ms)
+        for _ in range(max(1, min(pages, n_weeks)))
+    ))
+    return [results[key] for key in sorted(results)]
+
+async def scrape_nptel_course_parallel(course_url, json_path, pages=4, timeout_ms=5000, context=None):
+    """
+    Scrape a course with several pages of one browser context working on
+    different weeks at once. Output order matches the single-page scraper.
+    Pass a context to reuse an already running browser.
+    """
+    if context is not None:
+        data = await _scrape_weeks_in_context(context, course_url, pages, timeout_ms)
+    else:
+        async with async_playwright() as p:
+            browser = await p.chromium.launch(headless=True)
+            context = await browser.new_context()
+            data = await _scrape_weeks_in_context(context, course_url, pages, timeout_ms)
+            await browser.close()
+
+    with open(json_path, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=2, ensure_ascii=False)
+    print(f"\n💾 Saved {len(data)} entries to {json_path}")
+    return data
+
 def main():
     parser = argparse.ArgumentParser(description="Scrape NPTEL course YouTube links using Playwright.")
-    parser.add_argument("course_url", help="URL of the NPTEL course")
+    parser.add_argument("course_url", help="URL of the NPTEL course (a file:// fixture works too)")
     parser.add_argument("--json", default="data/output.json", help="Path to output JSON file")
+    parser.add_argument("--pages", type=int, default=1,
+                        help="Pages working on different weeks concurrently (1 = original single-page scraper)")
     args = parser.parse_args()
-    asyncio.run(scrape_nptel_course(args.course_url, args.json))
+    if args.pages > 1:
+        asyncio.run(scrape_nptel_course_parallel(args.course_url, args.json, args.pages))
+    else:
+        asyncio.run(scrape_nptel_course(args.course_url, args.json))
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
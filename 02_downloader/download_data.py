@@ -1,42 +1,191 @@
 import os
 import json
+import time
+import threading
 import subprocess
-from urllib.parse import parse_qs, urlparse
+from concurrent.futures import ThreadPoolExecutor, as_completed
 import argparse
 import requests
+from requests.adapters import HTTPAdapter
 
-def download_audio_from_json(json_path, output_folder="data/audio_downloads"):
+from lesson_index import LessonIndex, LESSON_INDEX_PATH, extract_drive_file_id, lesson_source, link_file_course
+
+YTDLP_BIN = "yt-dlp"
+# yt-dlp leaves these behind while a download is in progress or was interrupted
+PARTIAL_MARKERS = (".part", ".ytdl", ".temp")
+DOWNLOAD_MANIFEST = ".downloads.json"
+
+def safe_filename(lesson_title):
+    return "".join(c for c in lesson_title if c.isalnum() or c in " _-").rstrip()
+
+def index_downloads(output_folder):
+    """
+    Scan output_folder once. Returns (complete, partial): complete maps a title
+    stem to its finished file, partial is the set of stems with leftovers from an
+    interrupted download. Safe titles contain no dots, so the stem is the text
+    before the first dot.
+    """
+    complete, partial = {}, set()
+    if not os.path.isdir(output_folder):
+        return complete, partial
+    for entry in os.scandir(output_folder):
+        if not entry.is_file() or entry.name == DOWNLOAD_MANIFEST:
+            continue
+        stem = entry.name.split(".", 1)[0]
+        if any(marker in entry.name for marker in PARTIAL_MARKERS):
+            partial.add(stem)
+        else:
+            complete[stem] = entry.name
+    for stem in partial:
+        complete.pop(stem, None)
+    return complete, partial
+
+def load_download_manifest(output_folder, name=DOWNLOAD_MANIFEST):
+    path = os.path.join(output_folder, name)
+    if not os.path.exists(path):
+        return {}
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+def save_download_manifest(output_folder, manifest, name=DOWNLOAD_MANIFEST):
+    path = os.path.join(output_folder, name)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2, ensure_ascii=False)
+    os.replace(tmp_path, path)
+
+def run_ytdlp(youtube_link, safe_title, output_folder, retries=3, backoff=2.0, ytdlp_bin=YTDLP_BIN):
+    """
+    Download one lesson's audio, retrying with exponential backoff. yt-dlp resumes
+    its own .part files. Returns (file name, bytes, seconds).
+    """
+    output_path = os.path.join(output_folder, f"{safe_title}.%(ext)s")
+    start = time.perf_counter()
+    for attempt in range(retries + 1):
+        try:
+            result = subprocess.run([
+                ytdlp_bin,
+                "-f", "bestaudio",
+                "--no-progress",
+                "--print", "after_move:filepath",
+                "-o", output_path,
+                youtube_link
+            ], check=True, capture_output=True, text=True)
+            break
+        except subprocess.CalledProcessError as e:
+            if attempt == retries:
+                error = (e.stderr or "").strip().splitlines()
+                raise RuntimeError(error[-1] if error else str(e))
+            time.sleep(backoff * (2 ** attempt))
+
+    printed = [line for line in result.stdout.splitlines() if line.strip()]
+    if printed and os.path.exists(printed[-1].strip()):
+        filename = os.path.basename(printed[-1].strip())
+    else:
+        filename = index_downloads(output_folder)[0].get(safe_title)
+        if filename is None:
+            raise RuntimeError("yt-dlp finished but no output file was found")
+    size = os.path.getsize(os.path.join(output_folder, filename))
+    return filename, size, time.perf_counter() - start
+
+def download_audio_from_json(json_path, output_folder="data/audio_downloads", concurrency=4, retries=3,
+                             ytdlp_bin=YTDLP_BIN, index_path=LESSON_INDEX_PATH, progress=None, stage="download",
+                             course=None):
+    """
+    Download every lesson's audio as <lesson id>.<ext>, IDs taken from the lesson index
+    (within course, in batch mode, so courses sharing the folder cannot clash).
+    progress (a pipeline_progress.ProgressReporter) receives one event per finished download.
+    """
     if not os.path.exists(json_path):
         print(f"❌ JSON file not found: {json_path}")
-        return
+        return []
 
     with open(json_path, "r", encoding="utf-8") as f:
         data = json.load(f)
 
-    print(f"\n📥 Starting download of {len(data)} items from {json_path}")
+    os.makedirs(output_folder, exist_ok=True)
+    manifest = load_download_manifest(output_folder)
+    complete, partial = index_downloads(output_folder)
+    lessons = LessonIndex(index_path)
+
+    pending = []
+    queued = set()
+    duplicates = 0
     for item in data:
-        lesson_title = item["lesson_title"]
-        youtube_link = item["youtube_link"]
-        download_audio_from_youtube_links(youtube_link, lesson_title, output_folder)
+        title = lessons.lesson_id(item["lesson_title"], "audio", lesson_source(item, "audio"), course)
+        if title in queued:
+            # The same lesson listed twice; two yt-dlp runs must not write one file
+            print(f"ℹ️ Duplicate entry for {title}, downloading it once.")
+            duplicates += 1
+            continue
+        queued.add(title)
+        recorded = manifest.get(title)
+        if recorded and os.path.exists(os.path.join(output_folder, recorded["file"])):
+            continue
+        if title in complete and title not in partial:
+            # Downloaded before the manifest existed
+            manifest[title] = {"file": complete[title], "link": item["youtube_link"],
+                               "bytes": os.path.getsize(os.path.join(output_folder, complete[title]))}
+            continue
+        if title in partial:
+            print(f"↩️ Resuming partial download: {title}")
+        pending.append((item["youtube_link"], title))
+
+    print(f"\n📥 {len(data)} items in {json_path}: {len(data) - len(pending) - duplicates} already downloaded, "
+          f"{duplicates} duplicate entries, {len(pending)} to fetch with {concurrency} workers")
+    save_download_manifest(output_folder, manifest)
+    lessons.save()
 
-def download_audio_from_youtube_links(youtube_link, lesson_title, output_folder="data/audio_downloads"):
-    safe_title = "".join(c for c in lesson_title if c.isalnum() or c in " _-").rstrip()
+    start = time.perf_counter()
+    total_bytes = 0
+    failures = []
+    if progress:
+        progress.start(stage, len(pending))
+    with ThreadPoolExecutor(max_workers=max(1, concurrency)) as pool:
+        futures = {
+            pool.submit(run_ytdlp, link, title, output_folder, retries, 2.0, ytdlp_bin): (link, title)
+            for link, title in pending
+        }
+        for future in as_completed(futures):
+            link, title = futures[future]
+            try:
+                filename, size, seconds = future.result()
+            except Exception as e:
+                failures.append(title)
+                print(f"❌ yt-dlp failed for {title}: {e}")
+                if progress:
+                    progress.fail(stage, title)
+                continue
+            total_bytes += size
+            if progress:
+                progress.advance(stage, filename, size)
+            manifest[title] = {"file": filename, "link": link, "bytes": size}
+            save_download_manifest(output_folder, manifest)
+            print(f"🎧 Downloaded {filename} ({size / 1e6:.1f} MB in {seconds:.1f}s, "
+                  f"{size / 1e6 / seconds if seconds else 0:.2f} MB/s)")
+
+    if progress:
+        progress.finish(stage)
+    elapsed = time.perf_counter() - start
+    print(f"✅ {len(pending) - len(failures)} downloaded, {len(failures)} failed, "
+          f"{total_bytes / 1e6:.1f} MB in {elapsed:.1f}s ({total_bytes / 1e6 / elapsed if elapsed else 0:.2f} MB/s)")
+    return failures
+
+def download_audio_from_youtube_links(youtube_link, lesson_title, output_folder="data/audio_downloads",
+                                      index_path=LESSON_INDEX_PATH):
+    lessons = LessonIndex(index_path)
+    safe_title = lessons.lesson_id(lesson_title, "audio", lesson_source({"youtube_link": youtube_link}, "audio"))
+    lessons.save()
     os.makedirs(output_folder, exist_ok=True)
-    output_path = os.path.join(output_folder, f"{safe_title}.%(ext)s")
-    expected_files = [f for f in os.listdir(output_folder) if f.startswith(safe_title)]
-    if expected_files:
+    complete, _ = index_downloads(output_folder)
+    if safe_title in complete:
         print(f"⚠️ Skipping {safe_title}, already exists.")
         return
     print(f"⬇️ Downloading audio for: {safe_title}")
     try:
-        subprocess.run([
-            "yt-dlp",
-            "-f", "bestaudio",
-            "-o", output_path,
-            youtube_link
-        ], check=True)
-        print(f"🎧 Downloaded and saved as: {safe_title} (original audio format)\n")
-    except subprocess.CalledProcessError as e:
+        filename, _, _ = run_ytdlp(youtube_link, safe_title, output_folder)
+        print(f"🎧 Downloaded and saved as: {filename} (original audio format)\n")
+    except RuntimeError as e:
         print(f"❌ yt-dlp failed for {safe_title}: {e}")
 
 def get_confirm_token(response):
@@ -45,53 +194,198 @@ def get_confirm_token(response):
             return value
     return None
 
-def download_file_from_google_drive(file_id, destination):
-    URL = "https://docs.google.com/uc?export=download"
+DRIVE_DOWNLOAD_URL = "https://docs.google.com/uc?export=download"
+TRANSCRIPT_MANIFEST = ".transcripts.json"
+
+def make_session(pool_size=8):
+    """A requests session with a connection pool of pool_size."""
     session = requests.Session()
-    response = session.get(URL, params={"id": file_id}, stream=True)
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+class ThreadSessions:
+    """
+    One session per worker thread: requests.Session is not thread-safe, but a
+    worker reuses its own session's kept-alive connections for every file it
+    fetches, so TCP/TLS setup is paid once per worker rather than per file.
+    """
+
+    def __init__(self):
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._sessions = []
+
+    def get(self):
+        session = getattr(self._local, "session", None)
+        if session is None:
+            session = self._local.session = make_session(1)
+            with self._lock:
+                self._sessions.append(session)
+        return session
+
+    def close(self):
+        for session in self._sessions:
+            session.close()
+
+def looks_complete_pdf(path):
+    """A PDF header at the start and an %%EOF marker near the end, as a finished download has."""
+    try:
+        with open(path, "rb") as f:
+            if f.read(5) != b"%PDF-":
+                return False
+            f.seek(max(0, os.path.getsize(path) - 1024))
+            return b"%%EOF" in f.read()
+    except OSError:
+        return False
+
+def fetch_drive_file(session, file_id, destination, base_url=DRIVE_DOWNLOAD_URL, etag=None):
+    """
+    Stream a Drive file to destination + '.part' and rename it into place once
+    complete. Returns (bytes, etag), or None when the server reports the
+    recorded etag is still current.
+    """
+    headers = {"If-None-Match": etag} if etag else {}
+    response = session.get(base_url, params={"id": file_id}, headers=headers, stream=True)
     token = get_confirm_token(response)
     if token:
-        response = session.get(URL, params={"id": file_id, "confirm": token}, stream=True)
-    if response.status_code == 200:
-        with open(destination, "wb") as f:
-            for chunk in response.iter_content(32768):
+        # Read the small warning page so its connection goes back to the pool
+        response.content
+        response.close()
+        response = session.get(base_url, params={"id": file_id, "confirm": token}, headers=headers, stream=True)
+
+    with response:
+        if response.status_code == 304:
+            return None
+        if response.status_code != 200:
+            response.content
+            raise Exception(f"HTTP {response.status_code}: download failed or file is not publicly accessible.")
+        tmp_path = destination + ".part"
+        size = 0
+        with open(tmp_path, "wb") as f:
+            for chunk in response.iter_content(1 << 16):
                 if chunk:
                     f.write(chunk)
+                    size += len(chunk)
+        os.replace(tmp_path, destination)
+        return size, response.headers.get("ETag")
+
+def download_file_from_google_drive(file_id, destination, session=None):
+    try:
+        fetch_drive_file(session or make_session(1), file_id, destination)
         return True
-    else:
+    except Exception:
         return False
 
-def download_transcripts(json_path="data/transcript_links.json", output_dir="data/transcript_downloads"):
+def download_transcripts(json_path="data/transcript_links.json", output_dir="data/transcript_downloads",
+                         workers=8, base_url=DRIVE_DOWNLOAD_URL, revalidate=False, index_path=LESSON_INDEX_PATH,
+                         progress=None, stage="transcript_download", course=None):
+    """
+    Download transcript PDFs concurrently, each worker thread over its own
+    kept-alive session, saved as <lesson id>.pdf. Files recorded as complete in
+    the output folder's manifest (same size on disk), or complete PDFs already
+    there from before the manifest, are skipped; with revalidate=True they are
+    re-requested with their etag instead. progress receives one event per
+    finished download; course scopes lesson IDs as in download_audio_from_json.
+    Returns the number of failed downloads.
+    """
     os.makedirs(output_dir, exist_ok=True)
     if not os.path.exists(json_path):
         print(f"❌ JSON file not found: {json_path}")
-        return
+        return 0
     with open(json_path, "r", encoding="utf-8") as f:
         transcripts = json.load(f)
-    print(f"📄 Downloading {len(transcripts)} transcripts...\n")
+    lessons = LessonIndex(index_path)
+    manifest = load_download_manifest(output_dir, TRANSCRIPT_MANIFEST)
+
+    jobs = []
+    queued = set()
+    seeded = duplicates = unlinked = 0
     for idx, entry in enumerate(transcripts, 1):
         title = entry.get("title", f"Transcript_{idx}")
         url = entry.get("link")
-        try:
-            print(url)
-            parsed_url = urlparse(url)
-            file_id = None
-            if "id=" in url:
-                file_id = parse_qs(parsed_url.query).get("id", [None])[0]
-            elif "/d/" in url:
-                file_id = url.split("/d/")[1].split("/")[0]
-            if not file_id:
-                raise ValueError("Could not extract file ID from URL.")
-            filename = "".join(c if c.isalnum() else "_" for c in title) + ".pdf"
-            filepath = os.path.join(output_dir, filename)
-            print(f"⬇️  Downloading '{title}'...")
-            success = download_file_from_google_drive(file_id, filepath)
-            if not success:
-                raise Exception("Download failed or file is not publicly accessible.")
-        except Exception as e:
-            print(f"⚠️ Failed to download {title}: {e}")
+        file_id = extract_drive_file_id(url or "")
+        if not file_id:
+            print(f"⚠️ Failed to download {title}: Could not extract file ID from URL.")
             print(f"🔗 Manual link: {url}\n")
-    print("\n✅ All downloads attempted.")
+            unlinked += 1
+            continue
+        filename = lessons.lesson_id(title, "transcript", file_id, course) + ".pdf"
+        if filename in queued:
+            # Listed twice; two workers must not write the same file
+            duplicates += 1
+            continue
+        queued.add(filename)
+        filepath = os.path.join(output_dir, filename)
+        recorded = manifest.get(filename)
+        if recorded is None and os.path.exists(filepath) and looks_complete_pdf(filepath):
+            # Downloaded before the manifest existed
+            recorded = manifest[filename] = {"file_id": file_id, "bytes": os.path.getsize(filepath), "etag": None}
+            seeded += 1
+        complete = (
+            recorded is not None and recorded.get("file_id") == file_id
+            and os.path.exists(filepath) and os.path.getsize(filepath) == recorded.get("bytes")
+        )
+        if complete and not revalidate:
+            continue
+        jobs.append((title, url, file_id, filename, filepath, recorded.get("etag") if complete else None))
+
+    lessons.save()
+    if seeded:
+        print(f"ℹ️ {seeded} transcripts already on disk recorded as downloaded.")
+    save_download_manifest(output_dir, manifest, TRANSCRIPT_MANIFEST)
+    already = len(transcripts) - len(jobs) - duplicates - unlinked
+    print(f"📄 {len(transcripts)} transcripts: {already} already downloaded, {duplicates} duplicate entries, "
+          f"{unlinked} without a Drive link, {len(jobs)} to download with {workers} workers...\n")
+    sessions = ThreadSessions()
+
+    def fetch(file_id, filepath, etag):
+        return fetch_drive_file(sessions.get(), file_id, filepath, base_url, etag)
+
+    start = time.perf_counter()
+    total_bytes = 0
+    failed = 0
+    if progress:
+        progress.start(stage, len(jobs))
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        futures = {
+            pool.submit(fetch, file_id, filepath, etag): (title, url, file_id, filename)
+            for title, url, file_id, filename, filepath, etag in jobs
+        }
+        for future in as_completed(futures):
+            title, url, file_id, filename = futures[future]
+            try:
+                result = future.result()
+            except Exception as e:
+                failed += 1
+                print(f"⚠️ Failed to download {title}: {e}")
+                print(f"🔗 Manual link: {url}\n")
+                if progress:
+                    progress.fail(stage, filename)
+                continue
+            if result is None:
+                print(f"ℹ️ Up to date: '{title}'")
+                if progress:
+                    progress.advance(stage, filename)
+                continue
+            size, etag = result
+            total_bytes += size
+            if progress:
+                progress.advance(stage, filename, size)
+            # Recorded as each file lands, so an interrupted run keeps what it fetched
+            manifest[filename] = {"file_id": file_id, "bytes": size, "etag": etag}
+            save_download_manifest(output_dir, manifest, TRANSCRIPT_MANIFEST)
+            print(f"⬇️  Downloaded '{title}' ({size / 1e3:.0f} KB)")
+
+    sessions.close()
+    if progress:
+        progress.finish(stage)
+
+    elapsed = time.perf_counter() - start
+    print(f"\n✅ All downloads attempted: {len(jobs) - failed} ok, {failed} failed, "
+          f"{total_bytes / 1e6:.2f} MB in {elapsed:.1f}s ({total_bytes / 1e6 / elapsed if elapsed else 0:.2f} MB/s)")
+    return failed
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Download audio and transcripts from JSON mapping.")
@@ -100,9 +394,18 @@ if __name__ == "__main__":
     parser.add_argument("--transcript_json", default="data/transcripts.json", help="Path to transcripts.json for transcript download")
     parser.add_argument("--pdf_out", default="data/transcript_downloads", help="Output folder for transcript PDFs")
     parser.add_argument("--mode", choices=["audio", "transcript", "both"], default="audio", help="Download mode")
+    parser.add_argument("--concurrency", type=int, default=4, help="Parallel downloads")
+    parser.add_argument("--retries", type=int, default=3, help="Retries per download, with exponential backoff")
+    parser.add_argument("--transcript_workers", type=int, default=8, help="Parallel transcript downloads")
+    parser.add_argument("--drive_url", default=DRIVE_DOWNLOAD_URL, help="Drive download endpoint (a local server works for testing)")
+    parser.add_argument("--revalidate", action="store_true", help="Re-check already downloaded transcripts by etag")
+    parser.add_argument("--ytdlp", default=YTDLP_BIN, help="yt-dlp executable (a local stub works for testing)")
+    parser.add_argument("--course", default=None, help="Course ID prefixing lesson IDs (default: from a data/courses/<id>/ link file path)")
     args = parser.parse_args()
 
     if args.mode in ("audio", "both"):
-        download_audio_from_json(args.audio_json, args.audio_out)
+        download_audio_from_json(args.audio_json, args.audio_out, args.concurrency, args.retries, args.ytdlp,
+                                 course=args.course or link_file_course(args.audio_json))
     if args.mode in ("transcript", "both"):
-        download_transcripts(args.transcript_json, args.pdf_out)
\ No newline at end of file
+        download_transcripts(args.transcript_json, args.pdf_out, args.transcript_workers, args.drive_url, args.revalidate,
+                             course=args.course or link_file_course(args.transcript_json))
\ No newline at end of file
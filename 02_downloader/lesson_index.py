@@ -0,0 +1,286 @@
+"""
+Canonical lesson IDs shared by the audio and transcript downloaders.
+
+Every scraped lesson is mapped once to a stable ID: its title's letters and
+digits, lowercased. The same ID names the downloaded audio, the transcript PDF
+and every processed file after them, so audio and text pair by exact name and
+no rename pass is needed. The mapping lives in data/lesson_index.json:
+
+    {"lessons": {"<id>": {"key": "<normalized title>", "titles": {"audio": ..., "transcript": ...},
+                          "sources": {"audio": "<video id>", "transcript": "<drive file id>"},
+                          "course": "<course id, batch mode only>"}},
+     "collisions": [...]}
+
+A lesson of each kind is identified by its source (YouTube video ID, Drive
+file ID), not by its title: the same source always gets the same ID. An audio
+source and a transcript source whose titles normalize alike are the same
+lesson. Two different sources of the same kind whose titles normalize alike,
+identical titles included, are a collision: the later one gets "<key>-2",
+"<key>-3", ... and is recorded, so nothing is skipped or overwritten. IDs,
+once given, never change.
+
+In batch mode every course shares the download folders, so lessons are
+looked up within their course and the ID is prefixed with the course ID
+("106106184-introduction"): two courses' "Introduction" lessons are two
+lessons, not one skipped as already downloaded. Link files under
+data/courses/<course id>/ belong to that course (see link_file_course).
+
+Usage (one-off, for data downloaded under the old naming):
+    python 02_downloader/lesson_index.py --migrate --video_json data/video_links.json --transcripts_json data/transcripts.json
+"""
+
+import os
+import json
+import argparse
+import unicodedata
+from urllib.parse import parse_qs, urlparse
+
+LESSON_INDEX_PATH = "data/lesson_index.json"
+MIGRATE_DIRS = ("data/audio_downloads", "data/audio_processed", "data/transcript_downloads", "data/transcript_processed")
+# Per-folder download records keyed by the old names
+DOWNLOAD_RECORDS = (".downloads.json", ".transcripts.json")
+# Batch-mode link files live in data/courses/<course id>/
+COURSES_FOLDER = "courses"
+
+
+def normalize_title(title):
+    """Lowercase letters and digits of a title; every other character is dropped."""
+    text = unicodedata.normalize("NFKC", title)
+    return "".join(c for c in text.lower() if c.isalnum())
+
+
+def extract_drive_file_id(url):
+    parsed_url = urlparse(url)
+    if "id=" in url:
+        return parse_qs(parsed_url.query).get("id", [None])[0]
+    if "/d/" in url:
+        return url.split("/d/")[1].split("/")[0]
+    return None
+
+
+def youtube_video_id(link):
+    """The v= parameter of a watch link, else the last path segment (youtu.be / embed links)."""
+    parsed = urlparse(link)
+    video_id = parse_qs(parsed.query).get("v", [None])[0]
+    return video_id or parsed.path.rstrip("/").rsplit("/", 1)[-1] or link
+
+
+def link_file_course(path):
+    """Course ID of a batch-mode link file (data/courses/<id>/...), None for the single-course files."""
+    course_dir = os.path.dirname(os.path.abspath(path))
+    if os.path.basename(os.path.dirname(course_dir)) == COURSES_FOLDER:
+        return os.path.basename(course_dir)
+    return None
+
+
+class LessonIndex:
+    """Persistent (source, title) -> lesson ID mapping with collision detection."""
+
+    def __init__(self, path=LESSON_INDEX_PATH):
+        self.path = path
+        self.lessons = {}
+        self.collisions = []
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            self.lessons = data.get("lessons", {})
+            self.collisions = data.get("collisions", [])
+        self._by_key = {}
+        for lesson_id, lesson in self.lessons.items():
+            self._by_key.setdefault(self._group(lesson["key"], lesson.get("course")), []).append(lesson_id)
+
+    @staticmethod
+    def _group(key, course):
+        return f"{course}/{key}" if course else key
+
+    def lesson_id(self, title, kind, source=None, course=None):
+        """
+        Stable ID for a lesson of the given kind ("audio" or "transcript"),
+        assigning one if new. source identifies what is downloaded (video ID,
+        Drive file ID); without it the title alone decides, as in older indexes.
+        course (batch mode) scopes the lookup to one course and prefixes new IDs.
+        """
+        key = normalize_title(title) or "untitled"
+        candidates = self._by_key.setdefault(self._group(key, course), [])
+        for lesson_id in candidates:
+            if source is not None and self.lessons[lesson_id].get("sources", {}).get(kind) == source:
+                return lesson_id
+        for lesson_id in candidates:
+            lesson = self.lessons[lesson_id]
+            recorded = lesson.get("sources", {}).get(kind)
+            if lesson["titles"].get(kind) == title and (source is None or recorded is None):
+                # Registered before sources were recorded (or looked up without one)
+                if source is not None:
+                    lesson.setdefault("sources", {})[kind] = source
+                return lesson_id
+        for lesson_id in candidates:
+            lesson = self.lessons[lesson_id]
+            if kind not in lesson["titles"]:
+                # The other kind's entry for the same lesson
+                lesson["titles"][kind] = title
+                if source is not None:
+                    lesson.setdefault("sources", {})[kind] = source
+                return lesson_id
+
+        base = f"{course}-{key}" if course else key
+        lesson_id = base if not candidates else f"{base}-{len(candidates) + 1}"
+        if candidates:
+            clash = {"id": lesson_id, "kind": kind, "title": title, "source": source,
+                     "clashes_with": [{"title": self.lessons[c]["titles"].get(kind),
+                                       "source": self.lessons[c].get("sources", {}).get(kind)} for c in candidates]}
+            self.collisions.append(clash)
+            print(f"⚠️ Title collision: '{title}' ({source}) normalizes like "
+                  f"{[c['title'] for c in clash['clashes_with']]}, using ID {lesson_id}")
+        self.lessons[lesson_id] = {"key": key, "titles": {kind: title}}
+        if source is not None:
+            self.lessons[lesson_id]["sources"] = {kind: source}
+        if course:
+            self.lessons[lesson_id]["course"] = course
+        candidates.append(lesson_id)
+        return lesson_id
+
+    def ids_for_key(self, key):
+        """Every lesson ID whose title normalizes to key, in any course."""
+        return [lesson_id for lesson_id, lesson in self.lessons.items() if lesson["key"] == key]
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"lessons": self.lessons, "collisions": self.collisions}, f, indent=2, ensure_ascii=False)
+        os.replace(tmp_path, self.path)
+
+
+def index_link_files(index, video_jsons=(), transcripts_jsons=()):
+    """Register every scraped lesson and transcript in the index, as the downloaders would."""
+    for path in video_jsons:
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                for entry in json.load(f):
+                    index.lesson_id(entry["lesson_title"], "audio", lesson_source(entry, "audio"),
+                                    link_file_course(path))
+    for path in transcripts_jsons:
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                for idx, entry in enumerate(json.load(f), 1):
+                    index.lesson_id(entry.get("title") or f"Transcript_{idx}", "transcript",
+                                    lesson_source(entry, "transcript"), link_file_course(path))
+
+
+def lesson_source(entry, kind):
+    """Source key of a scraped link-file entry: the YouTube video ID or the Drive file ID."""
+    if kind == "audio":
+        return youtube_video_id(entry["youtube_link"]) if entry.get("youtube_link") else None
+    return extract_drive_file_id(entry.get("link") or "")
+
+
+def _split_name(name):
+    stem = name.split(".", 1)[0]
+    return stem, name[len(stem):]
+
+
+def _legacy_stems(title):
+    """Names the old scheme gave a title: safe_filename audio, underscored PDFs."""
+    audio = "".join(c for c in title if c.isalnum() or c in " _-").rstrip()
+    transcript = "".join(c if c.isalnum() else "_" for c in title)
+    return {audio, transcript}
+
+
+def _resolve(index, legacy, stem):
+    """Lesson IDs a file stem may belong to: an exact old-style name first, then its normalized form."""
+    exact = legacy.get(stem, set())
+    return sorted(exact) if len(exact) == 1 else index.ids_for_key(normalize_title(stem))
+
+
+def migrate_data_dirs(index, dirs=MIGRATE_DIRS, dry_run=False):
+    """
+    Rename files named by the old safe_filename / clean_filename schemes to
+    their lesson IDs, and re-key the folders' download records. Files whose
+    normalized name matches no lesson or several colliding ones are left alone
+    and reported. Returns {"renamed": n, "skipped": [...]}.
+    """
+    renamed, skipped = 0, []
+    legacy = {}
+    for lesson_id, lesson in index.lessons.items():
+        for title in lesson["titles"].values():
+            for stem in _legacy_stems(title):
+                legacy.setdefault(stem, set()).add(lesson_id)
+
+    for directory in dirs:
+        if not os.path.isdir(directory):
+            continue
+        moves = {}
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                if not entry.is_file() or entry.name.startswith("."):
+                    continue
+                stem, ext = _split_name(entry.name)
+                ids = _resolve(index, legacy, stem)
+                if stem in ids:
+                    continue  # already named by a lesson ID
+                if len(ids) != 1:
+                    reason = "no matching lesson" if not ids else f"ambiguous: {ids}"
+                    skipped.append({"path": entry.path, "reason": reason})
+                    continue
+                moves[entry.name] = ids[0] + ext
+
+        for old_name, new_name in sorted(moves.items()):
+            new_path = os.path.join(directory, new_name)
+            if os.path.exists(new_path):
+                skipped.append({"path": os.path.join(directory, old_name), "reason": f"{new_name} exists"})
+                continue
+            print(f"{'Would rename' if dry_run else 'Renamed'} {old_name} -> {new_name}")
+            if not dry_run:
+                os.rename(os.path.join(directory, old_name), new_path)
+            renamed += 1
+
+        if not dry_run:
+            _rekey_download_records(index, legacy, directory)
+
+    for item in skipped:
+        print(f"⚠️ Not migrated: {item['path']} ({item['reason']})")
+    print(f"✅ {renamed} files {'to rename' if dry_run else 'renamed'}, {len(skipped)} left as they were")
+    return {"renamed": renamed, "skipped": skipped}
+
+
+def _rekey_download_records(index, legacy, directory):
+    """Point .downloads.json / .transcripts.json entries at the renamed files."""
+    for record_name in DOWNLOAD_RECORDS:
+        path = os.path.join(directory, record_name)
+        if not os.path.exists(path):
+            continue
+        with open(path, "r", encoding="utf-8") as f:
+            records = json.load(f)
+        rekeyed = {}
+        for key, record in records.items():
+            ids = _resolve(index, legacy, _split_name(key)[0])
+            if len(ids) != 1:
+                rekeyed[key] = record
+                continue
+            ext = _split_name(key)[1]
+            if "file" in record:
+                record = dict(record, file=ids[0] + _split_name(record["file"])[1])
+            rekeyed[ids[0] + ext] = record
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(rekeyed, f, indent=2, ensure_ascii=False)
+        os.replace(tmp_path, path)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build the lesson ID index and migrate old file names.")
+    parser.add_argument("--index", default=LESSON_INDEX_PATH, help="Lesson index JSON")
+    parser.add_argument("--video_json", nargs="*", default=["data/video_links.json"], help="Scraped lesson link files")
+    parser.add_argument("--transcripts_json", nargs="*", default=["data/transcripts.json"], help="Scraped transcript link files")
+    parser.add_argument("--migrate", action="store_true", help="Rename existing data files to lesson IDs")
+    parser.add_argument("--dirs", nargs="*", default=list(MIGRATE_DIRS), help="Folders to migrate")
+    parser.add_argument("--dry_run", action="store_true", help="Only print what would be renamed")
+    args = parser.parse_args()
+
+    lesson_index = LessonIndex(args.index)
+    index_link_files(lesson_index, args.video_json, args.transcripts_json)
+    if args.migrate:
+        migrate_data_dirs(lesson_index, args.dirs, args.dry_run)
+    if not args.dry_run:
+        lesson_index.save()
+    print(f"🗂️ {len(lesson_index.lessons)} lessons, {len(lesson_index.collisions)} collisions in {args.index}")
@@ -0,0 +1,211 @@
+"""
+Fused per-file audio pipeline: decode -> resample -> trim -> (clean) -> write.
+
+ffmpeg decodes and resamples straight into a pipe as 16-bit PCM, the trailing
+trim and optional cleaning happen in memory, and exactly one WAV is written per
+lecture, replacing the preprocess_audio.sh -> data/audio_wav -> trim -> clean
+chain of full intermediate copies.
+
+With --clean --stream the decoded, trimmed lecture is written to a temporary
+<name>.wav.part file next to the output and cleaned block by block
+(clean_audio's streaming mode), so memory per file stays bounded however long
+the lecture is. The .part suffix keeps a file left by a killed run out of the
+manifest, which only pairs .wav files.
+
+Usage:
+    python 03_audio_preprocessor/audio_pipeline.py data/audio_downloads data/audio_processed --workers 4 [--clean [--stream]]
+"""
+
+import os
+import argparse
+import tempfile
+import subprocess
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+import numpy as np
+import soundfile as sf
+
+from convert_audio import find_audio_files
+from remove_trailing_audio import trimmed_frame_count
+
+PIPE_BLOCK_FRAMES = 1 << 16
+# Lowest bitrate expected from the downloads (64 kbps): dividing a file's size by
+# it overestimates the lecture's duration, which keeps memory estimates on the safe side
+SOURCE_BYTES_PER_SECOND = 8000
+
+
+def iter_decoded_pcm(input_path, sample_rate=16000, channels=1, block_frames=PIPE_BLOCK_FRAMES):
+    """
+    Yield int16 (frames, channels) blocks decoded and resampled by ffmpeg.
+    A nonzero exit raises once the stream has been read to the end; a consumer
+    that stops early just stops ffmpeg.
+    """
+    # ffmpeg's log goes to a file, not a pipe: a corrupt input can log more than
+    # a pipe buffer before stdout reaches EOF, and ffmpeg would block writing it
+    with tempfile.TemporaryFile() as log:
+        proc = subprocess.Popen([
+            "ffmpeg", "-loglevel", "error",
+            "-i", input_path,
+            "-ac", str(channels),
+            "-ar", str(sample_rate),
+            "-f", "s16le", "-acodec", "pcm_s16le",
+            "pipe:1"
+        ], stdout=subprocess.PIPE, stderr=log)
+
+        frame_width = 2 * channels
+        leftover = b""
+        finished = False
+        try:
+            while True:
+                data = proc.stdout.read(block_frames * frame_width)
+                if not data:
+                    break
+                data = leftover + data
+                usable = len(data) - len(data) % frame_width
+                leftover = data[usable:]
+                if usable:
+                    yield np.frombuffer(data[:usable], dtype=np.int16).reshape(-1, channels)
+            finished = True
+        finally:
+            proc.stdout.close()
+            if not finished:
+                proc.kill()
+            returncode = proc.wait()
+        if returncode != 0:
+            log.seek(0)
+            stderr = log.read().decode(errors="replace")
+            raise RuntimeError(f"ffmpeg failed for {input_path}: {stderr.strip()}")
+
+
+def decode_pcm(input_path, sample_rate=16000, channels=1):
+    """Decode a whole file into one int16 (frames, channels) array."""
+    blocks = list(iter_decoded_pcm(input_path, sample_rate, channels))
+    if not blocks:
+        return np.zeros((0, channels), dtype=np.int16)
+    return np.concatenate(blocks)
+
+
+def _write_trimmed_stream(blocks, output_path, sample_rate, channels, trim_seconds):
+    """
+    Write decoded blocks while holding back just enough frames to apply the
+    trailing trim once the total length is known, so memory stays constant.
+    """
+    holdback = int(trim_seconds * sample_rate) + sample_rate // 1000 + 2
+    pending = []
+    pending_frames = 0
+    total = 0
+    written = 0
+    with sf.SoundFile(output_path, "w", samplerate=sample_rate, channels=channels, format="WAV",
+                      subtype="PCM_16") as out:
+        for block in blocks:
+            pending.append(block)
+            pending_frames += len(block)
+            total += len(block)
+            if pending_frames > holdback:
+                data = np.concatenate(pending)
+                flush = len(data) - holdback
+                out.write(data[:flush])
+                written += flush
+                pending = [data[flush:]]
+                pending_frames = holdback
+
+        keep = trimmed_frame_count(total, sample_rate, trim_seconds)
+        tail = np.concatenate(pending) if pending else np.zeros((0, channels), dtype=np.int16)
+        tail = tail[:max(0, keep - written)]
+        if written + len(tail) < keep:
+            # Same zero padding pydub applies to a slice past the end
+            tail = np.concatenate([tail, np.zeros((keep - written - len(tail), channels), dtype=np.int16)])
+        out.write(tail)
+    return total / sample_rate
+
+
+def transform_audio_file(input_path, output_path, sample_rate=16000, channels=1, trim_seconds=10, clean=False,
+                         stream=False):
+    """
+    Decode, resample, trim and optionally clean one lecture, writing a single WAV.
+    With clean and stream, cleaning runs block by block from a temporary WAV.
+    Returns the decoded duration in seconds.
+    """
+    os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
+    if not clean:
+        # A kept-ranges sidecar from an earlier cleaned run no longer describes this WAV
+        stale_sidecar = os.path.splitext(output_path)[0] + ".kept.json"
+        if os.path.exists(stale_sidecar):
+            os.remove(stale_sidecar)
+        blocks = iter_decoded_pcm(input_path, sample_rate, channels)
+        return _write_trimmed_stream(blocks, output_path, sample_rate, channels, trim_seconds)
+
+    if stream:
+        # The streaming cleaner makes several passes over a seekable file
+        from clean_audio import clean_file_streaming
+
+        fd, temp_path = tempfile.mkstemp(prefix=os.path.basename(output_path) + ".", suffix=".part",
+                                         dir=os.path.dirname(output_path) or ".")
+        os.close(fd)
+        try:
+            blocks = iter_decoded_pcm(input_path, sample_rate, channels)
+            duration = _write_trimmed_stream(blocks, temp_path, sample_rate, channels, trim_seconds)
+            clean_file_streaming(temp_path, output_path)
+        finally:
+            os.remove(temp_path)
+        return duration
+
+    # Cleaning in memory needs the whole lecture for the silence map and normalization peak
+    from clean_audio import clean_samples, save_kept_ranges, length_ms
+
+    samples = decode_pcm(input_path, sample_rate, channels)
+    duration = len(samples) / sample_rate
+    keep = trimmed_frame_count(len(samples), sample_rate, trim_seconds)
+    y, ranges = clean_samples(samples[:keep], sample_rate)
+    sf.write(output_path, y, sample_rate, subtype="PCM_16")
+    save_kept_ranges(output_path, ranges, length_ms(keep, sample_rate))
+    return duration
+
+
+def estimate_transform_memory(input_path, sample_rate=16000, channels=1, stream=False):
+    """Expected peak memory in bytes of cleaning one download, from its file size (no decoding)."""
+    from clean_audio import (MEMORY_PER_INPUT_BYTE, STREAM_BLOCK_SECONDS, STREAM_MEMORY_PER_BLOCK_SAMPLE,
+                             STREAM_MEMORY_PER_SECOND)
+
+    seconds = os.path.getsize(input_path) / SOURCE_BYTES_PER_SECOND
+    if stream:
+        block_samples = STREAM_BLOCK_SECONDS * sample_rate * channels
+        return int(block_samples * STREAM_MEMORY_PER_BLOCK_SAMPLE + seconds * STREAM_MEMORY_PER_SECOND)
+    # The whole decoded int16 lecture, times clean_file's peak per input byte
+    return int(seconds * sample_rate * channels * 2 * MEMORY_PER_INPUT_BYTE)
+
+
+def process_audio_directory(input_dir, output_dir, workers=4, sample_rate=16000, trim_seconds=10, clean=False,
+                            stream=False):
+    """Run transform_audio_file over every source audio file in input_dir."""
+    jobs = [
+        (path, os.path.join(output_dir, os.path.splitext(os.path.basename(path))[0] + ".wav"))
+        for path in find_audio_files(input_dir)
+    ]
+    # ffmpeg does the work in its own process unless cleaning is enabled
+    executor = ProcessPoolExecutor if clean else ThreadPoolExecutor
+    with executor(max_workers=max(1, workers)) as pool:
+        futures = [
+            (in_path, pool.submit(transform_audio_file, in_path, out_path, sample_rate, 1, trim_seconds, clean, stream))
+            for in_path, out_path in jobs
+        ]
+        for in_path, future in futures:
+            try:
+                duration = future.result()
+                print(f"[✓] {in_path} ({duration:.1f}s)")
+            except Exception as e:
+                print(f"[!] Error processing {in_path}: {e}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Decode, resample, trim and optionally clean audio in one pass.")
+    parser.add_argument("input_dir", help="Folder with downloaded audio")
+    parser.add_argument("output_dir", help="Folder for processed .wav files")
+    parser.add_argument("--workers", type=int, default=4, help="Files processed in parallel")
+    parser.add_argument("--sample_rate", type=int, default=16000, help="Output sample rate")
+    parser.add_argument("--trim_secs", type=float, default=10, help="Seconds to drop from the end")
+    parser.add_argument("--clean", action="store_true", help="Also remove silence, normalize and denoise")
+    parser.add_argument("--stream", action="store_true",
+                        help="Clean block by block with bounded memory instead of the whole lecture at once")
+    args = parser.parse_args()
+    process_audio_directory(args.input_dir, args.output_dir, args.workers, args.sample_rate, args.trim_secs,
+                            args.clean, args.stream)
@@ -6,18 +6,264 @@ Audio Cleaning Pipeline:
 3. Reduce background noise
 
 Usage:
-    python audio_preprocessor/clean_audio.py input_folder output_folder
+    python audio_preprocessor/clean_audio.py input_folder output_folder [--workers N]
 """
 
 import os
 import sys
+import json
+import time
+import argparse
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
 from pydub import AudioSegment, silence, effects
-import noisereduce as nr
-import librosa
 import soundfile as sf
 
+# noisereduce takes ~1.5 s to import; it is imported inside the two denoising
+# functions so the silence helpers below stay cheap to import for the manifest stages.
+
 # ---------- Step 1: Remove Long Silences ----------
+# Vectorized re-implementation of pydub's split_on_silence. Audio is bucketed
+# into milliseconds exactly like pydub slices it (frame = int(ms * rate / 1000),
+# short tails padded with zeros), so min_silence_len / silence_thresh keep
+# their pydub meaning while the window RMS is computed from cumulative sums.
+SAMPLE_DTYPES = {2: np.int16, 4: np.int32}
+ENERGY_BLOCK_MS = 60_000  # bounds the int64 scratch buffer to one minute of audio
+
+def ms_to_frame(ms, frame_rate):
+    return int(ms * (frame_rate / 1000.0))
+
+def length_ms(n_frames, frame_rate):
+    """Same rounding as len(AudioSegment)."""
+    return round(1000 * (n_frames / frame_rate))
+
+def ms_boundaries(n_ms, frame_rate):
+    return (np.arange(n_ms + 1) * (frame_rate / 1000.0)).astype(np.int64)
+
+def _bucket_energy(block, bounds):
+    """Sum of squares per bucket [bounds[i], bounds[i+1]) for a block starting at frame bounds[0]."""
+    block = block.astype(np.int64)
+    f0 = bounds[0]
+    cumulative = np.zeros(bounds[-1] - f0 + 1, dtype=np.int64)
+    # Frames past the end of the data stay zero, like pydub's padding
+    np.cumsum((block * block).sum(axis=1), out=cumulative[1:len(block) + 1])
+    cumulative[len(block) + 1:] = cumulative[len(block)]
+    return cumulative[bounds[1:] - f0] - cumulative[bounds[:-1] - f0]
+
+def ms_energy(samples, frame_rate):
+    """
+    Per-millisecond sum of squared samples and sample counts for an integer
+    array of shape (frames,) or (frames, channels).
+    """
+    samples = samples.reshape(len(samples), -1)
+    n_ms = length_ms(len(samples), frame_rate)
+    bounds = ms_boundaries(n_ms, frame_rate)
+    energy = np.zeros(n_ms, dtype=np.int64)
+
+    for k0 in range(0, n_ms, ENERGY_BLOCK_MS):
+        k1 = min(n_ms, k0 + ENERGY_BLOCK_MS)
+        energy[k0:k1] = _bucket_energy(samples[bounds[k0]:bounds[k1]], bounds[k0:k1 + 1])
+
+    counts = np.diff(bounds) * samples.shape[1]
+    return energy, counts
+
+def iter_ms_energy(f, block_ms=ENERGY_BLOCK_MS):
+    """Yield (energy, counts) per block of block_ms milliseconds of an open SoundFile, from its start."""
+    n_ms = length_ms(f.frames, f.samplerate)
+    bounds = ms_boundaries(n_ms, f.samplerate)
+    f.seek(0)
+    for k0 in range(0, n_ms, block_ms):
+        k1 = min(n_ms, k0 + block_ms)
+        block = f.read(bounds[k1] - bounds[k0], dtype=PCM_DTYPE, always_2d=True)
+        yield _bucket_energy(block, bounds[k0:k1 + 1]), np.diff(bounds[k0:k1 + 1]) * f.channels
+
+def ms_energy_file(path):
+    """ms_energy for a WAV on disk, reading one energy block at a time."""
+    with sf.SoundFile(path) as f:
+        blocks = list(iter_ms_energy(f))
+    if not blocks:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+    energy, counts = zip(*blocks)
+    return np.concatenate(energy), np.concatenate(counts)
+
+def scan_energy(f, window_ms=500):
+    """
+    One block-wise pass over an open SoundFile: (total energy, total sample
+    count, length in ms, energy of every whole window_ms window). Nothing
+    per-millisecond outlives its block; window_ms must divide ENERGY_BLOCK_MS.
+    """
+    total_energy = total_counts = n_ms = 0
+    windows = []
+    for energy, counts in iter_ms_energy(f):
+        total_energy += int(energy.sum())
+        total_counts += int(counts.sum())
+        n_ms += len(energy)
+        whole = len(energy) // window_ms * window_ms
+        windows.append(energy[:whole].reshape(-1, window_ms).sum(axis=1))
+    window_energy = np.concatenate(windows) if windows else np.zeros(0, dtype=np.int64)
+    return total_energy, total_counts, n_ms, window_energy
+
+def rms_dbfs(energy, n_samples, max_possible_amplitude):
+    """dBFS of the whole signal from its total energy (AudioSegment.dBFS)."""
+    rms = int(np.sqrt(energy / n_samples)) if n_samples else 0
+    if not rms:
+        return -float("infinity")
+    return 20 * np.log10(rms / max_possible_amplitude)
+
+def detect_silence_ranges(energy, counts, min_silence_len, silence_thresh, max_possible_amplitude):
+    """[start_ms, end_ms] silent ranges, matching pydub.silence.detect_silence(seek_step=1)."""
+    n_ms = len(energy)
+    if n_ms < min_silence_len:
+        return []
+    thresh = 10 ** (silence_thresh / 20) * max_possible_amplitude
+
+    cum_energy = np.concatenate(([0], np.cumsum(energy)))
+    cum_counts = np.concatenate(([0], np.cumsum(counts)))
+    window_energy = cum_energy[min_silence_len:] - cum_energy[:-min_silence_len]
+    window_counts = cum_counts[min_silence_len:] - cum_counts[:-min_silence_len]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        window_rms = np.floor(np.sqrt(window_energy / window_counts))
+    window_rms[window_counts == 0] = 0
+
+    starts = np.flatnonzero(window_rms <= thresh)
+    if len(starts) == 0:
+        return []
+    # A new range begins where the next silent window starts past the previous one's end
+    breaks = np.flatnonzero(np.diff(starts) > min_silence_len)
+    range_starts = starts[np.concatenate(([0], breaks + 1))]
+    range_ends = starts[np.concatenate((breaks, [len(starts) - 1]))] + min_silence_len
+    return [[int(a), int(b)] for a, b in zip(range_starts, range_ends)]
+
+class SilenceScanner:
+    """
+    detect_silence_ranges over per-millisecond energy fed in consecutive
+    blocks. Only the last min_silence_len - 1 ms (the start of windows that
+    straddle the next block) and the open silent range are carried between
+    blocks, so memory does not grow with the length of the audio.
+    """
+
+    def __init__(self, min_silence_len, silence_thresh, max_possible_amplitude):
+        self.min_silence_len = min_silence_len
+        self.thresh = 10 ** (silence_thresh / 20) * max_possible_amplitude
+        self.position = 0
+        self.ranges = []
+        self._energy_tail = np.zeros(0, dtype=np.int64)
+        self._counts_tail = np.zeros(0, dtype=np.int64)
+        self._range_start = None
+        self._last_start = None
+
+    def feed(self, energy, counts):
+        msl = self.min_silence_len
+        energy = np.concatenate((self._energy_tail, energy))
+        counts = np.concatenate((self._counts_tail, counts))
+        base = self.position - len(self._energy_tail)
+        self.position = base + len(energy)
+        if len(energy) >= msl:
+            cum_energy = np.concatenate(([0], np.cumsum(energy)))
+            cum_counts = np.concatenate(([0], np.cumsum(counts)))
+            window_energy = cum_energy[msl:] - cum_energy[:-msl]
+            window_counts = cum_counts[msl:] - cum_counts[:-msl]
+            with np.errstate(divide="ignore", invalid="ignore"):
+                window_rms = np.floor(np.sqrt(window_energy / window_counts))
+            window_rms[window_counts == 0] = 0
+            self._add_starts(np.flatnonzero(window_rms <= self.thresh) + base)
+        keep = max(0, len(energy) - (msl - 1))
+        self._energy_tail, self._counts_tail = energy[keep:], counts[keep:]
+
+    def _add_starts(self, starts):
+        if len(starts) == 0:
+            return
+        if self._range_start is None:
+            self._range_start = self._last_start = int(starts[0])
+        chain = np.concatenate(([self._last_start], starts))
+        for b in np.flatnonzero(np.diff(chain) > self.min_silence_len):
+            self.ranges.append([self._range_start, int(chain[b]) + self.min_silence_len])
+            self._range_start = int(chain[b + 1])
+        self._last_start = int(starts[-1])
+
+    def finish(self):
+        """The silent [start_ms, end_ms] ranges of everything fed so far."""
+        ranges = list(self.ranges)
+        if self._range_start is not None:
+            ranges.append([self._range_start, self._last_start + self.min_silence_len])
+        return ranges
+
+def nonsilent_from_silent(silent_ranges, n_ms):
+    """Complement of the silent ranges in [0, n_ms], as pydub.silence.detect_nonsilent builds it."""
+    if not silent_ranges:
+        return [[0, n_ms]]
+    if silent_ranges[0][0] == 0 and silent_ranges[0][1] == n_ms:
+        return []
+
+    nonsilent_ranges = []
+    prev_end = 0
+    for start, end in silent_ranges:
+        nonsilent_ranges.append([prev_end, start])
+        prev_end = end
+    if silent_ranges[-1][1] != n_ms:
+        nonsilent_ranges.append([prev_end, n_ms])
+    if nonsilent_ranges[0] == [0, 0]:
+        nonsilent_ranges.pop(0)
+    return nonsilent_ranges
+
+def detect_nonsilent_ranges(energy, counts, min_silence_len, silence_thresh, max_possible_amplitude):
+    """[start_ms, end_ms] non-silent ranges, matching pydub.silence.detect_nonsilent."""
+    silent_ranges = detect_silence_ranges(energy, counts, min_silence_len, silence_thresh, max_possible_amplitude)
+    return nonsilent_from_silent(silent_ranges, len(energy))
+
+def detect_nonsilent_ranges_file(f, min_silence_len, silence_thresh, max_possible_amplitude):
+    """detect_nonsilent_ranges for an open SoundFile, scanned one energy block at a time."""
+    scanner = SilenceScanner(min_silence_len, silence_thresh, max_possible_amplitude)
+    for energy, counts in iter_ms_energy(f):
+        scanner.feed(energy, counts)
+    return nonsilent_from_silent(scanner.finish(), scanner.position)
+
+def keep_ranges(nonsilent_ranges, n_ms, keep_silence=100):
+    """Pad non-silent ranges by keep_silence ms, splitting overlaps like split_on_silence."""
+    ranges = [[start - keep_silence, end + keep_silence] for start, end in nonsilent_ranges]
+    for current, following in zip(ranges, ranges[1:]):
+        if following[0] < current[1]:
+            current[1] = (current[1] + following[0]) // 2
+            following[0] = current[1]
+    return [[max(start, 0), min(end, n_ms)] for start, end in ranges]
+
+def concat_ranges(samples, ranges_ms, frame_rate, pause_ms=100):
+    """Copy the kept ranges, each followed by a short pause, into one preallocated array."""
+    samples = samples.reshape(len(samples), -1)
+    pause = ms_to_frame(pause_ms, frame_rate)
+    spans = [(ms_to_frame(a, frame_rate), ms_to_frame(b, frame_rate)) for a, b in ranges_ms]
+    total = sum(b - a + pause for a, b in spans)
+    out = np.zeros((total, samples.shape[1]), dtype=samples.dtype)
+    pos = 0
+    for a, b in spans:
+        chunk = samples[a:min(b, len(samples))]
+        out[pos:pos + len(chunk)] = chunk
+        pos += b - a + pause
+    return out
+
+def remove_silence_array(samples, frame_rate, min_silence_len=500, silence_thresh=-40,
+                         keep_silence=100, pause_ms=100):
+    """
+    Remove long silences from an integer sample array; silence_thresh is relative
+    to the signal's own dBFS. Returns (samples, kept ranges in ms).
+    """
+    max_amplitude = float(2 ** (samples.dtype.itemsize * 8 - 1))
+    energy, counts = ms_energy(samples, frame_rate)
+    dbfs = rms_dbfs(int(energy.sum()), samples.size, max_amplitude)
+    nonsilent = detect_nonsilent_ranges(energy, counts, min_silence_len, dbfs + silence_thresh, max_amplitude)
+    ranges = keep_ranges(nonsilent, len(energy), keep_silence)
+    return concat_ranges(samples, ranges, frame_rate, pause_ms), ranges
+
 def remove_silence(sound, min_silence_len=500, silence_thresh=-40):
+    if sound.sample_width not in SAMPLE_DTYPES:
+        return remove_silence_pydub(sound, min_silence_len, silence_thresh)
+    samples = np.frombuffer(sound.raw_data, dtype=SAMPLE_DTYPES[sound.sample_width])
+    samples = samples.reshape(-1, sound.channels)
+    processed, _ = remove_silence_array(samples, sound.frame_rate, min_silence_len, silence_thresh)
+    return sound._spawn(processed.tobytes())
+
+def remove_silence_pydub(sound, min_silence_len=500, silence_thresh=-40):
+    """Original pydub implementation, kept for 8/24-bit audio and benchmarking."""
     chunks = silence.split_on_silence(
         sound,
         min_silence_len=min_silence_len,
@@ -28,53 +274,353 @@ def remove_silence(sound, min_silence_len=500, silence_thresh=-40):
         processed += chunk + AudioSegment.silent(duration=100)  # add tiny pause
     return processed
 
+def benchmark_silence_removal(wav_path, min_silence_len=500, silence_thresh=-40):
+    """Time the NumPy and pydub silence removal on one file and compare detected ranges."""
+    sound = AudioSegment.from_wav(wav_path)
+    print(f"Benchmarking silence removal on {wav_path} ({len(sound) / 1000:.1f}s audio)")
+
+    start = time.perf_counter()
+    fast = remove_silence(sound, min_silence_len, silence_thresh)
+    fast_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    slow = remove_silence_pydub(sound, min_silence_len, silence_thresh)
+    slow_time = time.perf_counter() - start
+
+    samples = np.frombuffer(sound.raw_data, dtype=SAMPLE_DTYPES[sound.sample_width]).reshape(-1, sound.channels)
+    energy, counts = ms_energy(samples, sound.frame_rate)
+    ours = detect_nonsilent_ranges(
+        energy, counts, min_silence_len, sound.dBFS + silence_thresh, sound.max_possible_amplitude
+    )
+    theirs = silence.detect_nonsilent(sound, min_silence_len, sound.dBFS + silence_thresh)
+
+    print(f"  numpy: {fast_time:.3f}s -> {len(fast) / 1000:.1f}s kept")
+    print(f"  pydub: {slow_time:.3f}s -> {len(slow) / 1000:.1f}s kept")
+    print(f"  speedup: {slow_time / fast_time:.1f}x, {len(ours)} ranges, identical ranges: {ours == theirs}")
+    return ours == theirs
+
 # ---------- Step 2: Normalize Volume ----------
 def normalize_volume(sound):
     return effects.normalize(sound)
 
+def normalize_array(samples, headroom=0.1):
+    """
+    Convert integer PCM to FLOAT_DTYPE and peak-normalize to -headroom dBFS,
+    the float equivalent of pydub's effects.normalize. This is the only
+    int -> float conversion in the chain.
+    """
+    scale = float(2 ** (samples.dtype.itemsize * 8 - 1))
+    y = samples.astype(FLOAT_DTYPE)
+    peak = np.abs(y).max() if y.size else 0
+    if peak == 0:
+        y /= scale
+        return y
+    y *= FLOAT_DTYPE(10 ** (-headroom / 20) / peak)
+    return y
+
 # ---------- Step 3: Reduce Background Noise ----------
 def reduce_noise(sound, sr=16000):
-    # Convert pydub sound -> numpy
-    samples = sound.get_array_of_samples()
-    y = librosa.util.buf_to_float(samples, n_bytes=2)
-    reduced = nr.reduce_noise(y=y, sr=sr)
-    # Write back to AudioSegment
-    temp_file = "temp_denoised.wav"
-    sf.write(temp_file, reduced, sr)
-    return AudioSegment.from_wav(temp_file)
+    samples = np.frombuffer(sound.raw_data, dtype=SAMPLE_DTYPES[sound.sample_width]).reshape(-1, sound.channels)
+    scale = float(2 ** (sound.sample_width * 8 - 1))
+    reduced = reduce_noise_array(samples.astype(FLOAT_DTYPE) / scale, sr)
+    pcm = np.clip(np.round(reduced * scale), -scale, scale - 1).astype(samples.dtype)
+    return sound._spawn(pcm.tobytes())
+
+def reduce_noise_array(y, sr=16000):
+    """Denoise a float (frames, channels) array in memory."""
+    import noisereduce as nr
+    # noisereduce expects (channels, frames) for multichannel input
+    y_in = y[:, 0] if y.shape[1] == 1 else y.T
+    reduced = np.asarray(nr.reduce_noise(y=y_in, sr=sr), dtype=FLOAT_DTYPE)
+    return reduced.reshape(-1, 1) if y.shape[1] == 1 else reduced.T
 
 # ---------- Main Processing Function ----------
+# Dtype policy: audio is decoded once as PCM_DTYPE (the integer samples the
+# silence detector measures), converted once to FLOAT_DTYPE in [-1, 1) by
+# normalization, denoised in float, and quantized back to PCM_16 only by the
+# final write. No intermediate files are written.
+PCM_DTYPE = "int16"
+FLOAT_DTYPE = np.float32
+
+def clean_samples(samples, sr):
+    """
+    Silence removal -> normalize -> denoise on an in-memory (frames, channels) PCM array.
+    Returns (cleaned float samples, kept ranges in ms of the input).
+    """
+    # Step 1: Remove silence
+    samples, ranges = remove_silence_array(samples, sr)
+
+    # Step 2: Normalize
+    y = normalize_array(samples)
+    del samples
+
+    # Step 3: Noise reduction
+    return reduce_noise_array(y, sr), ranges
+
+def clean_file(input_path, output_path):
+    """Run the full cleaning chain on one file and return its input duration in seconds."""
+    samples, sr = sf.read(input_path, dtype=PCM_DTYPE, always_2d=True)
+    n_frames = len(samples)
+    y, ranges = clean_samples(samples, sr)
+
+    # Export final file
+    sf.write(output_path, y, sr, subtype="PCM_16")
+    save_kept_ranges(output_path, ranges, length_ms(n_frames, sr))
+    return n_frames / sr
+
+# ---------- Kept-ranges sidecar ----------
+# Cleaned lectures get a <name>.kept.json next to the WAV recording which
+# milliseconds of the input survived silence removal. Each kept range is
+# followed by pause_ms of silence in the output, so the sidecar both maps
+# source times (e.g. slide timestamps) onto the cleaned audio and lists the
+# pauses where the lecture can be cut into utterances.
+KEPT_RANGES_SUFFIX = ".kept.json"
+
+def kept_ranges_path(wav_path):
+    return os.path.splitext(wav_path)[0] + KEPT_RANGES_SUFFIX
+
+def save_kept_ranges(wav_path, ranges_ms, source_ms, pause_ms=100):
+    with open(kept_ranges_path(wav_path), "w", encoding="utf-8") as f:
+        json.dump({"source_ms": source_ms, "pause_ms": pause_ms, "kept_ms": ranges_ms}, f)
+
+def load_kept_ranges(wav_path):
+    """The sidecar written by save_kept_ranges, or None for uncleaned audio."""
+    path = kept_ranges_path(wav_path)
+    if not os.path.exists(path):
+        return None
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+# ---------- Streaming Mode ----------
+# Variant of clean_file for arbitrarily long lectures, reading the file block
+# by block. One pass sums the energy (for the dBFS threshold) and the energy
+# of every 500 ms window (for the noise profile), one runs the silence
+# detector block by block, one finds the peak of the kept audio, and the last
+# one denoises overlapping blocks against a noise profile estimated once per
+# file and writes them with a linear crossfade. What grows with duration is
+# small: 8 bytes per noise window and the list of kept ranges.
+STREAM_BLOCK_SECONDS = 30
+STREAM_OVERLAP_SECONDS = 1
+NOISE_WINDOW_MS = 500
+NOISE_CLIP_SECONDS = 5
+
+def estimate_noise_profile(f, window_energy, noise_clip_seconds=NOISE_CLIP_SECONDS, window_ms=NOISE_WINDOW_MS):
+    """Read the quietest non-digital-silence windows of an open SoundFile as a noise clip."""
+    order = np.argsort(window_energy, kind="stable")
+    order = order[window_energy[order] > 0]
+    chosen = np.sort(order[:max(1, int(noise_clip_seconds * 1000 / window_ms))])
+    if len(chosen) == 0:
+        return None
+
+    clips = []
+    for w in chosen:
+        f.seek(ms_to_frame(int(w) * window_ms, f.samplerate))
+        clips.append(f.read(ms_to_frame(window_ms, f.samplerate), dtype=PCM_DTYPE, always_2d=True))
+    return np.concatenate(clips)
+
+def iter_kept_audio(f, ranges_ms, pause_ms=100, block_frames=1 << 18):
+    """Yield the kept ranges of an open SoundFile in blocks, each range followed by a pause."""
+    pause = np.zeros((ms_to_frame(pause_ms, f.samplerate), f.channels), dtype=PCM_DTYPE)
+    for start_ms, end_ms in ranges_ms:
+        start, end = ms_to_frame(start_ms, f.samplerate), ms_to_frame(end_ms, f.samplerate)
+        f.seek(min(start, f.frames))
+        pos = start
+        while pos < end:
+            block = f.read(min(block_frames, end - pos), dtype=PCM_DTYPE, always_2d=True)
+            if len(block) == 0:
+                # Past the end of the data: pad with silence like concat_ranges
+                block = np.zeros((end - pos, f.channels), dtype=PCM_DTYPE)
+            yield block
+            pos += len(block)
+        yield pause
+
+def iter_overlapping_blocks(chunks, block_frames, overlap_frames):
+    """Re-block a stream of arrays into blocks of block_frames sharing overlap_frames with the previous one."""
+    buffer = []
+    buffered = 0
+    new_frames = 0
+    for chunk in chunks:
+        buffer.append(chunk)
+        buffered += len(chunk)
+        new_frames += len(chunk)
+        while buffered >= block_frames:
+            data = np.concatenate(buffer)
+            yield data[:block_frames]
+            buffer = [data[block_frames - overlap_frames:]]
+            buffered = len(buffer[0])
+            new_frames = buffered - overlap_frames
+    if buffer and new_frames > 0:
+        yield np.concatenate(buffer)
+
+def clean_file_streaming(input_path, output_path, block_seconds=STREAM_BLOCK_SECONDS,
+                         overlap_seconds=STREAM_OVERLAP_SECONDS, min_silence_len=500, silence_thresh=-40):
+    """clean_file with memory bounded by block size instead of lecture length."""
+    import noisereduce as nr
+
+    with sf.SoundFile(input_path) as f:
+        sr = f.samplerate
+        duration = f.frames / sr
+        scale = float(2 ** 15)
+
+        # Pass 1: total energy -> silence threshold, window energies -> noise profile
+        total_energy, _, n_ms, window_energy = scan_energy(f, NOISE_WINDOW_MS)
+        dbfs = rms_dbfs(total_energy, f.frames * f.channels, scale)
+
+        # Pass 2: silence map -> kept ranges
+        nonsilent = detect_nonsilent_ranges_file(f, min_silence_len, dbfs + silence_thresh, scale)
+        ranges = keep_ranges(nonsilent, n_ms)
+
+        # Pass 3: peak of the kept audio -> normalization gain
+        peak = 0
+        for block in iter_kept_audio(f, ranges):
+            if len(block):
+                peak = max(peak, int(np.abs(block.astype(np.int32)).max()))
+        gain = FLOAT_DTYPE(10 ** (-0.1 / 20) / peak) if peak else FLOAT_DTYPE(1 / scale)
+
+        noise = estimate_noise_profile(f, window_energy)
+        if noise is not None:
+            noise = noise.astype(FLOAT_DTYPE) * gain
+            noise = noise[:, 0] if f.channels == 1 else noise.T
+
+        # Pass 4: denoise overlapping blocks and crossfade them into the output
+        block_frames = int(block_seconds * sr)
+        overlap = int(overlap_seconds * sr)
+        with sf.SoundFile(output_path, "w", samplerate=sr, channels=f.channels, subtype="PCM_16") as out:
+            tail = None
+            for block in iter_overlapping_blocks(iter_kept_audio(f, ranges), block_frames, overlap):
+                y = block.astype(FLOAT_DTYPE) * gain
+                y_in = y[:, 0] if f.channels == 1 else y.T
+                if noise is not None:
+                    reduced = nr.reduce_noise(y=y_in, sr=sr, stationary=True, y_noise=noise)
+                else:
+                    reduced = nr.reduce_noise(y=y_in, sr=sr)
+                reduced = np.asarray(reduced, dtype=FLOAT_DTYPE).reshape(f.channels, -1).T
+
+                if tail is not None:
+                    n = min(len(tail), len(reduced))
+                    fade = np.linspace(0, 1, n, dtype=FLOAT_DTYPE)[:, None]
+                    reduced[:n] = tail[:n] * (1 - fade) + reduced[:n] * fade
+                keep = max(0, len(reduced) - overlap)
+                out.write(reduced[:keep])
+                tail = reduced[keep:]
+            if tail is not None:
+                out.write(tail)
+    save_kept_ranges(output_path, ranges, n_ms)
+    return duration
+
 def process_audio(input_path, output_path):
     try:
-        sound = AudioSegment.from_wav(input_path)
-        
-        # Step 1: Remove silence
-        sound = remove_silence(sound)
-        
-        # Step 2: Normalize
-        sound = normalize_volume(sound)
-        
-        # Step 3: Noise reduction
-        sound = reduce_noise(sound, sr=sound.frame_rate)
-        
-        # Export final file
-        sound.export(output_path, format="wav")
+        clean_file(input_path, output_path)
         print(f"[✓] Processed: {input_path} -> {output_path}")
     except Exception as e:
         print(f"[!] Error processing {input_path}: {e}")
 
+# ---------- Parallel Engine ----------
+# Rough peak RSS per byte of input WAV while a file is being cleaned
+# (decoded samples, float buffers and STFT intermediates).
+MEMORY_PER_INPUT_BYTE = 12
+# clean_file_streaming peaks at about 370 bytes per sample of one denoise block
+# (measured with tracemalloc on 5 and 20 minute lectures), plus what grows with
+# the lecture: noise-window energies and kept ranges, ~100 bytes per second
+# measured and budgeted here at 1 KiB.
+STREAM_MEMORY_PER_BLOCK_SAMPLE = 400
+STREAM_MEMORY_PER_SECOND = 1024
+
+def estimate_clean_memory(input_path, streaming=False):
+    """Expected peak memory in bytes of cleaning one WAV, from its size or header."""
+    if not streaming:
+        return os.path.getsize(input_path) * MEMORY_PER_INPUT_BYTE
+    info = sf.info(input_path)
+    block_samples = STREAM_BLOCK_SECONDS * info.samplerate * info.channels
+    return int(block_samples * STREAM_MEMORY_PER_BLOCK_SAMPLE + info.duration * STREAM_MEMORY_PER_SECOND)
+
+def clean_folder(input_folder, output_folder, workers=1, max_memory_gb=None, streaming=False):
+    """
+    Clean every .wav in input_folder using a process pool.
+
+    At most `workers` files are in flight, and when max_memory_gb is given a
+    file is only admitted while the estimated memory of all in-flight files
+    stays within budget (one file is always allowed so large lectures still run).
+    Progress is printed in input order; failures are collected into the summary.
+    With streaming=True files go through clean_file_streaming, whose memory
+    is mostly per block rather than per lecture, so more workers fit in the
+    same budget.
+    """
+    os.makedirs(output_folder, exist_ok=True)
+    filenames = sorted(f for f in os.listdir(input_folder) if f.endswith(".wav"))
+    jobs = [(os.path.join(input_folder, f), os.path.join(output_folder, f)) for f in filenames]
+    budget = max_memory_gb * (1 << 30) if max_memory_gb else None
+
+    start = time.perf_counter()
+    results = {}
+    failures = []
+    audio_seconds = 0.0
+    next_to_report = 0
+    next_to_submit = 0
+    in_flight = {}
+    reserved = 0
+
+    with ProcessPoolExecutor(max_workers=max(1, workers)) as pool:
+        while next_to_report < len(jobs):
+            # Admit files while under the in-flight and memory bounds
+            while next_to_submit < len(jobs) and len(in_flight) < max(1, workers):
+                in_path, out_path = jobs[next_to_submit]
+                estimate = estimate_clean_memory(in_path, streaming)
+                if budget is not None and in_flight and reserved + estimate > budget:
+                    break
+                future = pool.submit(clean_file_streaming if streaming else clean_file, in_path, out_path)
+                in_flight[future] = (next_to_submit, estimate)
+                reserved += estimate
+                next_to_submit += 1
+
+            done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in done:
+                index, estimate = in_flight.pop(future)
+                reserved -= estimate
+                try:
+                    results[index] = (future.result(), None)
+                except Exception as e:
+                    results[index] = (0.0, f"{type(e).__name__}: {e}")
+
+            # Report finished files in input order
+            while next_to_report in results:
+                seconds, error = results.pop(next_to_report)
+                in_path, out_path = jobs[next_to_report]
+                next_to_report += 1
+                if error:
+                    failures.append((in_path, error))
+                    print(f"[{next_to_report}/{len(jobs)}] [!] {in_path}: {error}")
+                else:
+                    audio_seconds += seconds
+                    print(f"[{next_to_report}/{len(jobs)}] [✓] {in_path} -> {out_path} ({seconds:.1f}s audio)")
+
+    elapsed = time.perf_counter() - start
+    print("\n--- Cleaning Summary ---")
+    print(f"Files: {len(jobs) - len(failures)} cleaned, {len(failures)} failed")
+    print(f"Audio processed: {audio_seconds:.1f}s in {elapsed:.1f}s wall "
+          f"({audio_seconds / elapsed if elapsed > 0 else 0:.1f} audio-s per wall-s)")
+    for in_path, error in failures:
+        print(f"  [!] {in_path}: {error}")
+    return failures
+
 # ---------- Run Over Folder ----------
 if __name__ == "__main__":
-    if len(sys.argv) != 3:
-        print("Usage: python clean_audio.py <input_folder> <output_folder>")
-        sys.exit(1)
+    parser = argparse.ArgumentParser(description="Remove silence, normalize and denoise a folder of WAV files.")
+    parser.add_argument("input_folder", nargs="?", help="Folder with .wav files")
+    parser.add_argument("output_folder", nargs="?", help="Folder for cleaned .wav files")
+    parser.add_argument("--workers", type=int, default=1, help="Number of parallel worker processes")
+    parser.add_argument("--max_memory_gb", type=float, default=None,
+                        help="Approximate memory budget for files in flight")
+    parser.add_argument("--stream", action="store_true",
+                        help="Denoise in overlapping blocks with constant memory per worker")
+    parser.add_argument("--benchmark_silence", metavar="WAV",
+                        help="Compare NumPy and pydub silence removal on one file and exit")
+    args = parser.parse_args()
 
-    input_folder = sys.argv[1]
-    output_folder = sys.argv[2]
-    os.makedirs(output_folder, exist_ok=True)
+    if args.benchmark_silence:
+        sys.exit(0 if benchmark_silence_removal(args.benchmark_silence) else 1)
+    if not args.input_folder or not args.output_folder:
+        parser.error("input_folder and output_folder are required")
 
-    for filename in os.listdir(input_folder):
-        if filename.endswith(".wav"):
-            in_path = os.path.join(input_folder, filename)
-            out_path = os.path.join(output_folder, filename)
-            process_audio(in_path, out_path)
+    failures = clean_folder(args.input_folder, args.output_folder, args.workers, args.max_memory_gb, args.stream)
+    sys.exit(1 if failures else 0)
@@ -0,0 +1,14 @@
+import os
+
+# Same set of inputs preprocess_audio.sh picks up
+AUDIO_EXTENSIONS = (".mp3", ".m4a", ".webm", ".wav", ".flac")
+
+
+def find_audio_files(input_dir):
+    """Recursively list source audio files, like the `find` in preprocess_audio.sh."""
+    audio_files = []
+    for root, _, files in os.walk(input_dir):
+        for name in files:
+            if name.lower().endswith(AUDIO_EXTENSIONS):
+                audio_files.append(os.path.join(root, name))
+    return sorted(audio_files)
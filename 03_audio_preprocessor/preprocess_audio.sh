@@ -1,6 +1,9 @@
 #!/bin/bash
 
 # Usage: ./preprocess_audio.sh <input_dir> <output_dir> <num_cpus>
+#
+# Output is 16 kHz mono 16-bit PCM WAV with no metadata chunks, the layout
+# 05_train_manifest/audio_reader.py memory-maps for offset/duration segments.
 
 input_dir=$1
 output_dir=$2
@@ -16,7 +19,7 @@ process_file() {
     output_file="$output_dir/${filename%.*}.wav"
 
     echo "Processing $filename..."
-    ffmpeg -y -i "$input_file" -ac 1 -ar 16000 "$output_file"
+    ffmpeg -y -i "$input_file" -ac 1 -ar 16000 -c:a pcm_s16le -map_metadata -1 -fflags +bitexact "$output_file"
 }
 
 export -f process_file
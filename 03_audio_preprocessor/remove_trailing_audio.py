@@ -1,24 +1,172 @@
 import os
+import time
+import wave
+import struct
 import argparse
+import tempfile
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pydub import AudioSegment
 
+COPY_BLOCK_FRAMES = 1 << 20
 
-def trim_trailing_audio(input_dir, output_dir,seconds_to_trim=10):
+
+def trimmed_frame_count(n_frames, frame_rate, seconds_to_trim):
+    """Number of frames pydub keeps for audio[:len(audio) - seconds_to_trim * 1000]."""
+    duration_ms = round(1000 * (n_frames / frame_rate))
+    keep_ms = max(0, duration_ms - seconds_to_trim * 1000)
+    return int(keep_ms * (frame_rate / 1000.0))
+
+
+def trim_audio_file_pydub(audio_path, output_path, seconds_to_trim=10):
+    """Full decode/re-encode trim, kept as the reference for verification."""
+    audio = AudioSegment.from_wav(audio_path)
+    duration = len(audio)
+    trimmed = audio[:max(0, duration - seconds_to_trim * 1000)]
+    trimmed.export(output_path, format="wav")
+
+
+def _copy_frames(audio_path, output_path, seconds_to_trim):
+    """Read the header, then copy only the kept frames with large block reads."""
+    with wave.open(audio_path, "rb") as src:
+        params = src.getparams()
+        keep = trimmed_frame_count(params.nframes, params.framerate, seconds_to_trim)
+        frame_width = params.nchannels * params.sampwidth
+
+        with wave.open(output_path, "wb") as dst:
+            dst.setnchannels(params.nchannels)
+            dst.setsampwidth(params.sampwidth)
+            dst.setframerate(params.framerate)
+            dst.setnframes(keep)
+            remaining = keep
+            while remaining > 0:
+                data = src.readframes(min(COPY_BLOCK_FRAMES, remaining))
+                if not data:
+                    # pydub pads a slice that ends past the data with silence
+                    data = b"\0" * (remaining * frame_width)
+                dst.writeframesraw(data)
+                remaining -= len(data) // frame_width
+
+
+def _wav_layout(f):
+    """Return (data_offset, data_size, frame_width, frame_rate) of an open RIFF/WAVE file."""
+    riff, _, wave_id = struct.unpack("<4sI4s", f.read(12))
+    if riff != b"RIFF" or wave_id != b"WAVE":
+        raise wave.Error("not a RIFF/WAVE file")
+    frame_width = frame_rate = None
+    while True:
+        header = f.read(8)
+        if len(header) < 8:
+            raise wave.Error("no data chunk")
+        chunk_id, size = struct.unpack("<4sI", header)
+        if chunk_id == b"fmt ":
+            fmt = f.read(size + (size & 1))
+            _, _, frame_rate, _, block_align = struct.unpack("<HHIIH", fmt[:14])
+            frame_width = block_align
+        elif chunk_id == b"data":
+            if frame_width is None:
+                raise wave.Error("data chunk before fmt chunk")
+            return f.tell(), size, frame_width, frame_rate
+        else:
+            f.seek(size + (size & 1), os.SEEK_CUR)
+
+
+def _truncate_in_place(audio_path, seconds_to_trim):
+    """Drop the trailing frames by truncating the file and patching the RIFF/data sizes."""
+    with open(audio_path, "r+b") as f:
+        data_offset, data_size, frame_width, frame_rate = _wav_layout(f)
+        file_size = os.fstat(f.fileno()).st_size
+        if data_offset + data_size + (data_size & 1) < file_size:
+            # Chunks after the data chunk; rewrite through a copy instead
+            return False
+        keep = trimmed_frame_count(data_size // frame_width, frame_rate, seconds_to_trim)
+        new_size = keep * frame_width
+        if new_size > data_size:
+            return False
+        f.truncate(data_offset + new_size)
+        f.seek(data_offset - 4)
+        f.write(struct.pack("<I", new_size))
+        f.seek(4)
+        f.write(struct.pack("<I", data_offset + new_size - 8))
+    return True
+
+
+def trim_audio_file(audio_path, output_path, seconds_to_trim=10):
+    """
+    Trim the last seconds_to_trim seconds of a WAV without decoding it. Writing
+    in place truncates the file; otherwise only the kept frames are copied.
+    Falls back to pydub for WAV variants the wave module cannot read.
+    """
+    try:
+        if os.path.abspath(audio_path) == os.path.abspath(output_path):
+            if _truncate_in_place(audio_path, seconds_to_trim):
+                return
+            fd, temp_path = tempfile.mkstemp(suffix=".wav", dir=os.path.dirname(output_path) or ".")
+            os.close(fd)
+            _copy_frames(audio_path, temp_path, seconds_to_trim)
+            os.replace(temp_path, output_path)
+        else:
+            _copy_frames(audio_path, output_path, seconds_to_trim)
+    except (wave.Error, EOFError):
+        trim_audio_file_pydub(audio_path, output_path, seconds_to_trim)
+
+
+def trim_trailing_audio(input_dir, output_dir,seconds_to_trim=10, workers=4):
+    """Trim every WAV in input_dir; a file that fails is reported and skipped. Returns the failed paths."""
     os.makedirs(output_dir, exist_ok=True)
 
-    for file in os.listdir(input_dir):
-        if file.endswith(".wav"):
-            audio_path = os.path.join(input_dir, file)
-            output_path = os.path.join(output_dir, file)
+    jobs = [
+        (os.path.join(input_dir, file), os.path.join(output_dir, file))
+        for file in sorted(os.listdir(input_dir)) if file.endswith(".wav")
+    ]
+    failed = []
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        futures = {pool.submit(trim_audio_file, inp, out, seconds_to_trim): inp for inp, out in jobs}
+        for future in as_completed(futures):
+            try:
+                future.result()
+            except Exception as e:
+                print(f"❌ Failed to trim {futures[future]}: {e}")
+                failed.append(futures[future])
+    if failed:
+        print(f"⚠️ {len(failed)} of {len(jobs)} files could not be trimmed.")
+    return failed
+
+
+def verify_trim(audio_path, seconds_to_trim=10):
+    """Check the fast trim keeps exactly the samples of the pydub slice, and time both."""
+    with tempfile.TemporaryDirectory() as tmp:
+        fast_path = os.path.join(tmp, "fast.wav")
+        slow_path = os.path.join(tmp, "slow.wav")
+
+        start = time.perf_counter()
+        trim_audio_file(audio_path, fast_path, seconds_to_trim)
+        fast_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        trim_audio_file_pydub(audio_path, slow_path, seconds_to_trim)
+        slow_time = time.perf_counter() - start
+
+        fast = AudioSegment.from_wav(fast_path)
+        slow = AudioSegment.from_wav(slow_path)
+        identical = fast.raw_data == slow.raw_data and fast.frame_rate == slow.frame_rate
+
+    print(f"{audio_path}: fast {fast_time:.3f}s, pydub {slow_time:.3f}s, "
+          f"{slow_time / fast_time if fast_time else 0:.1f}x faster, identical samples: {identical}")
+    return identical
 
-            audio = AudioSegment.from_wav(audio_path)
-            duration = len(audio)
-            trimmed = audio[:max(0, duration - seconds_to_trim * 1000)]
-            trimmed.export(output_path, format="wav")
 
 if __name__ == "__main__":
-    input_dir = 'data/audio_wav'
-    output_dir = 'data/audio_processed'
-    trim_secs = 10
-    trim_trailing_audio(input_dir, output_dir, trim_secs)
-    print(f"Trimmed audio files saved to {output_dir}")
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Trim trailing seconds from every WAV in a folder.")
+    parser.add_argument("--input_dir", default="data/audio_wav", help="Folder with .wav files")
+    parser.add_argument("--output_dir", default="data/audio_processed", help="Folder for trimmed .wav files")
+    parser.add_argument("--trim_secs", type=float, default=10, help="Seconds to drop from the end")
+    parser.add_argument("--workers", type=int, default=4, help="Files trimmed in parallel")
+    parser.add_argument("--verify", metavar="WAV", help="Compare the fast trim with pydub on one file and exit")
+    args = parser.parse_args()
+
+    if args.verify:
+        raise SystemExit(0 if verify_trim(args.verify, args.trim_secs) else 1)
+    failed = trim_trailing_audio(args.input_dir, args.output_dir, args.trim_secs, args.workers)
+    print(f"Trimmed audio files saved to {args.output_dir}")
+    if failed:
+        raise SystemExit(1)
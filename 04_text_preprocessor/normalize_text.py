@@ -0,0 +1,237 @@
+"""
+Compiled transcript normalization.
+
+The unspoken-segment rules are compiled once and applied in list order, one
+pass per rule, exactly like the original re.sub cascade. Rules are not fused
+into alternations: a fused pass tries every rule at each position, so an
+earlier match swallows text a later rule would have removed first (e.g.
+"(see Indian Institute of Technology Madras)" loses the closing bracket to
+the institute rule before the bracket rule sees it), and fuzzing found
+hundreds of such differences. The gain over the cascade comes from the
+precompiled rules, a regex punctuation pass and spelling out digit runs
+through a bounded LRU cache, since the same slide and lecture numbers come
+up over and over.
+
+Course-specific rules go in a JSON file, a list of
+    {"name": "...", "pattern": "...", "ignore_case": true}
+entries; they run after the built-in rules, in file order, and are
+case-insensitive unless they set "ignore_case" to false.
+
+Usage:
+    python 04_text_preprocessor/normalize_text.py --benchmark train_manifest.jsonl
+    python 04_text_preprocessor/normalize_text.py --fuzz 20000
+"""
+
+import re
+import json
+import time
+import random
+import string
+import argparse
+from functools import lru_cache
+from num2words import num2words
+
+RULE_FLAGS = re.IGNORECASE | re.MULTILINE
+PUNCTUATION_RE = re.compile(f"[{re.escape(string.punctuation)}]+")
+DIGITS_RE = re.compile(r'\d+')
+SLIDE_TIME_RE = re.compile(r"\(refer slide time: (?:(\d{1,2}):)?(\d{1,2}):(\d{2})\)", re.IGNORECASE)
+NUM2WORDS_CACHE_SIZE = 4096
+
+# Unspoken transcript segments, removed in this order. Later rules see the text
+# earlier ones left behind (the blank-line rules run after the span rules, and
+# the course title rule last), so the order is part of the behaviour.
+DEFAULT_RULES = [
+    {"name": "slide_time", "pattern": r"\(refer slide time: \d{2}:\d{2}\)"},
+    {"name": "professor", "pattern": r"\bprof\.\s+[a-z\s]+\n?"},
+    {"name": "department", "pattern": r"department of [a-z\s&]+"},
+    {"name": "institute", "pattern": r"indian institute of technology[^\n]*"},
+    {"name": "lecture_number", "pattern": r"lecture\s*[-–—]?\s*\d+"},
+    {"name": "table_of_contents", "pattern": r"\btable of contents\b"},
+    {"name": "brackets", "pattern": r"\(.*?\)"},
+    {"name": "page_number", "pattern": r"^\s*\d+\s*$"},
+    {"name": "empty_line", "pattern": r"^\s*$"},
+    {"name": "course_title", "pattern": r"^[a-z\s:]{0,50}history of deep learning.*$"},
+]
+
+# Pieces the fuzzer strings together: rule triggers, their near misses, and
+# characters that lowercase or case-fold unusually
+FUZZ_FRAGMENTS = [
+    "Prof. ", "prof.", "Prof. S. Rao\n", "Department of ", "Department of Computer Science & Engineering",
+    "Indian Institute of Technology Madras", "indian institute of technology", "(", ")", "(see ", "(part 1)",
+    "(Refer Slide Time: 12:34)", "(Refer Slide Time: 1:02:03)", "Lecture - 12", "lecture 3", "LECTURE–4",
+    "Table of Contents", "table of contentsx", "\n", "\n\n", "  ", "\t", "12", "1,000", "3.14", "2024",
+    "History of Deep Learning", "a brief history of deep learning: part 2", ":", "&", "-", ".", ",",
+    "graphs", "the", "Welcome", "to this course", "on", "ſ", "ı", "İ", "K", "é", "Ω",
+]
+
+
+@lru_cache(maxsize=NUM2WORDS_CACHE_SIZE)
+def number_to_words(digits):
+    return num2words(digits)
+
+
+def _digits_to_words(match):
+    return number_to_words(match.group())
+
+
+def load_rules(path):
+    """Read extra rules from a JSON file; each needs a pattern, the name is optional."""
+    with open(path, "r", encoding="utf-8") as f:
+        rules = json.load(f)
+    for idx, rule in enumerate(rules):
+        if "pattern" not in rule:
+            raise ValueError(f"Rule {idx} in {path} has no pattern")
+        re.compile(rule["pattern"], RULE_FLAGS)  # fail early on a bad pattern
+        rule.setdefault("name", f"custom_{idx}")
+        rule.setdefault("ignore_case", True)
+    return rules
+
+
+def compile_rules(rules):
+    """(name, compiled regex) for every rule, in the order they are applied."""
+    return [
+        (rule["name"], re.compile(rule["pattern"], RULE_FLAGS if rule.get("ignore_case", True) else re.MULTILINE))
+        for rule in rules
+    ]
+
+
+class TextNormalizer:
+    """Lowercase, strip unspoken segments, drop punctuation and spell out numbers."""
+
+    def __init__(self, extra_rules=None):
+        self.rules = DEFAULT_RULES + list(extra_rules or [])
+        self.compiled = compile_rules(self.rules)
+
+    def remove_unspoken_segments(self, text):
+        for _, regex in self.compiled:
+            text = regex.sub("", text)
+        return text
+
+    def clean(self, text):
+        text = self.remove_unspoken_segments(text.lower())
+        # Punctuation goes before digits so "1,000" is read as one number
+        text = PUNCTUATION_RE.sub("", text)
+        return DIGITS_RE.sub(_digits_to_words, text)
+
+    def word_anchors(self, text, cleaned=None):
+        """
+        [{"time": seconds, "word": index}] for every (Refer Slide Time: mm:ss)
+        marker, where index is the marker's position among the words of
+        clean(text). The pieces between markers are cleaned separately and their
+        word counts rescaled to the whole-text count. Pass clean(text) as
+        cleaned when it is already at hand, so the text is not cleaned again.
+        """
+        matches = list(SLIDE_TIME_RE.finditer(text))
+        if not matches:
+            return []
+        bounds = [0] + [m.start() for m in matches] + [len(text)]
+        counts = [len(self.clean(text[a:b]).split()) for a, b in zip(bounds, bounds[1:])]
+        total = len((self.clean(text) if cleaned is None else cleaned).split())
+        scale = total / sum(counts) if sum(counts) else 0.0
+
+        anchors = []
+        words_before = 0
+        for match, count in zip(matches, counts):
+            words_before += count
+            hours, minutes, seconds = (int(g or 0) for g in match.groups())
+            anchors.append({"time": hours * 3600 + minutes * 60 + seconds, "word": round(words_before * scale)})
+        return anchors
+
+    def describe(self):
+        """Rule set as plain data, for build fingerprints."""
+        return [dict(rule) for rule in self.rules]
+
+
+DEFAULT_NORMALIZER = TextNormalizer()
+
+
+def clean_text_legacy(text, patterns):
+    """The original cascade: one re.sub per pattern, then punctuation and digits."""
+    text = text.lower()
+    for pattern in patterns:
+        text = re.sub(pattern, "", text, flags=RULE_FLAGS)
+    text = text.translate(str.maketrans('', '', string.punctuation))
+    return re.sub(r'\d+', lambda m: num2words(m.group()), text)
+
+
+def benchmark_normalizer(manifest_path, extra_texts=(), repeat=3, normalizer=DEFAULT_NORMALIZER):
+    """Time the legacy cascade against the compiled engine over the manifest's transcripts."""
+    texts = list(extra_texts)
+    with open(manifest_path, "r", encoding="utf-8") as f:
+        texts.extend(json.loads(line)["text"] for line in f if line.strip())
+    patterns = [rule["pattern"] for rule in normalizer.rules]
+    n_chars = sum(len(t) for t in texts)
+    print(f"📏 {len(texts)} transcripts, {n_chars / 1e6:.2f}M characters, {len(normalizer.compiled)} rules")
+
+    timings = {}
+    outputs = {}
+    for label, fn in (("legacy", lambda t: clean_text_legacy(t, patterns)), ("engine", normalizer.clean)):
+        best = float("inf")
+        for _ in range(repeat):
+            number_to_words.cache_clear()
+            start = time.perf_counter()
+            outputs[label] = [fn(t) for t in texts]
+            best = min(best, time.perf_counter() - start)
+        timings[label] = best
+        print(f"⏱️ {label}: {best:.3f}s ({n_chars / best / 1e6:.1f}M chars/s)")
+
+    mismatches = [i for i, (a, b) in enumerate(zip(outputs["legacy"], outputs["engine"])) if a != b]
+    print(f"🚀 Speedup: {timings['legacy'] / timings['engine']:.1f}x, "
+          f"num2words cache: {number_to_words.cache_info()}")
+    if mismatches:
+        print(f"⚠️ {len(mismatches)} transcripts differ from the legacy output (first: #{mismatches[0]})")
+    else:
+        print("✅ Output identical to the legacy cascade for every transcript")
+    return timings, mismatches
+
+
+def fuzz_text(rng, max_fragments=30):
+    """A random string of FUZZ_FRAGMENTS, joined by nothing, spaces or newlines."""
+    parts = rng.choices(FUZZ_FRAGMENTS, k=rng.randint(1, max_fragments))
+    return "".join(part + rng.choice(("", "", " ", "\n")) for part in parts)
+
+
+def fuzz_equivalence(n=20000, seed=0, normalizer=DEFAULT_NORMALIZER):
+    """Texts (out of n random ones) on which the engine and the legacy cascade disagree."""
+    rng = random.Random(seed)
+    patterns = [rule["pattern"] for rule in normalizer.rules]
+    mismatches = []
+    for _ in range(n):
+        text = fuzz_text(rng)
+        if normalizer.clean(text) != clean_text_legacy(text, patterns):
+            mismatches.append(text)
+    return mismatches
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Normalize transcript text with the compiled rule engine.")
+    parser.add_argument("input", nargs="?", help="Text file to normalize (printed to stdout)")
+    parser.add_argument("--rules", help="JSON file with extra course-specific rules")
+    parser.add_argument("--benchmark", metavar="MANIFEST", help="Compare against the legacy cascade on a manifest")
+    parser.add_argument("--raw", nargs="*", default=[], help="Extra raw text files to include in the benchmark")
+    parser.add_argument("--fuzz", type=int, metavar="N", help="Compare against the legacy cascade on N random texts")
+    parser.add_argument("--repeat", type=int, default=3, help="Benchmark repetitions (best is reported)")
+    args = parser.parse_args()
+
+    normalizer = TextNormalizer(load_rules(args.rules)) if args.rules else DEFAULT_NORMALIZER
+    if args.fuzz:
+        mismatches = fuzz_equivalence(args.fuzz, normalizer=normalizer)
+        if mismatches:
+            print(f"⚠️ {len(mismatches)} of {args.fuzz} random texts differ from the legacy cascade, e.g. {mismatches[0]!r}")
+        else:
+            print(f"✅ Output identical to the legacy cascade on {args.fuzz} random texts")
+    elif args.benchmark:
+        extra = []
+        for path in args.raw:
+            with open(path, "r", encoding="utf-8") as f:
+                extra.append(f.read())
+        benchmark_normalizer(args.benchmark, extra, args.repeat, normalizer)
+    elif args.input:
+        with open(args.input, "r", encoding="utf-8") as f:
+            print(normalizer.clean(f.read()))
+    else:
+        parser.print_help()
+
+
+if __name__ == "__main__":
+    main()
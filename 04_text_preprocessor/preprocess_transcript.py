@@ -1,72 +1,139 @@
 import os
-import re
-import string
-from num2words import num2words
+import json
+import time
+import hashlib
+import argparse
+from concurrent.futures import ProcessPoolExecutor
 from PyPDF2 import PdfReader
+from normalize_text import DEFAULT_NORMALIZER, TextNormalizer, load_rules
+
+RAW_CACHE_DIR = "data/transcript_raw_cache"
 
 def pdf_to_text(pdf_path):
     """Extract raw text from a PDF file."""
+    return extract_pdf_pages(pdf_path)[0]
+
+def extract_pdf_pages(pdf_path):
+    """Extract raw text from a PDF file, returning (text, page count)."""
     reader = PdfReader(pdf_path)
-    full_text = ""
+    parts = []
     for page in reader.pages:
-        full_text += page.extract_text() + "\n"
-    return full_text
+        parts.append(page.extract_text())
+        parts.append("\n")
+    return "".join(parts), len(reader.pages)
+
+def file_sha256(path):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+def extract_pdf_text_cached(pdf_path, cache_dir=RAW_CACHE_DIR):
+    """
+    Raw PDF text, cached by the PDF's content hash so changes to the cleaning
+    rules never force PDFs to be parsed again.
+    Returns (text, stats) with page count, extraction time and cache hit flag.
+    """
+    digest = file_sha256(pdf_path)
+    text_path = os.path.join(cache_dir, f"{digest}.txt")
+    meta_path = os.path.join(cache_dir, f"{digest}.json")
+    if os.path.exists(text_path) and os.path.exists(meta_path):
+        with open(text_path, "r", encoding="utf-8") as f:
+            text = f.read()
+        with open(meta_path, "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        return text, dict(meta, cached=True)
+
+    start = time.perf_counter()
+    text, pages = extract_pdf_pages(pdf_path)
+    meta = {"pages": pages, "extract_seconds": round(time.perf_counter() - start, 4)}
+
+    os.makedirs(cache_dir, exist_ok=True)
+    for path, content in ((text_path, text), (meta_path, json.dumps(meta))):
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(content)
+        os.replace(tmp_path, path)
+    return text, dict(meta, cached=False)
+
 def remove_unspoken_segments(text):
     """Remove unspoken transcript segments using general patterns."""
-    patterns_to_remove = [
-        r"\(refer slide time: \d{2}:\d{2}\)",         # (Refer Slide Time: )
-        r"\bprof\.\s+[a-z\s]+\n?",                   # Lines with professor names
-        r"department of [a-z\s&]+",                  # Department names
-        r"indian institute of technology[^\n]*",     # IIT + location
-        r"lecture\s*[-–—]?\s*\d+",                   # Lecture numbers
-        r"\btable of contents\b",                    # Table of contents
-        r"\(.*?\)",                                  # Bracketed titles or asides
-        r"^\s*\d+\s*$",                              # Standalone numbers (slide/page numbers)
-        r"^\s*$",                                    # Empty lines
-        r"^[a-z\s:]{0,50}history of deep learning.*$", # Flexible match for titles
-    ]
-
-    for pattern in patterns_to_remove:
-        text = re.sub(pattern, "", text, flags=re.IGNORECASE | re.MULTILINE)
-    
-    return text
+    return DEFAULT_NORMALIZER.remove_unspoken_segments(text)
 
-def clean_text(text):
+def clean_text(text, normalizer=DEFAULT_NORMALIZER):
     """Lowercase, remove punctuation, convert digits to words, and remove unspoken parts."""
-    text = text.lower()
-    text = remove_unspoken_segments(text)
-    text = text.translate(str.maketrans('', '', string.punctuation))
+    return normalizer.clean(text)
 
-    def replace_digits(match):
-        return num2words(match.group())
+def anchors_path(text_path):
+    """Sidecar with the transcript's (Refer Slide Time) anchors as word positions."""
+    return os.path.splitext(text_path)[0] + ".anchors.json"
 
-    text = re.sub(r'\d+', replace_digits, text)
-    return text
+def process_transcript(input_path, output_path, cache_dir=RAW_CACHE_DIR, normalizer=DEFAULT_NORMALIZER):
+    """Extract, clean and save a single PDF transcript as text. Returns its extraction stats."""
+    print(f"Processing: {os.path.basename(input_path)}")
+    raw_text, stats = extract_pdf_text_cached(input_path, cache_dir)
+    cleaned_text = clean_text(raw_text, normalizer)
 
-def process_all_transcripts(input_dir, output_dir):
-    os.makedirs(output_dir, exist_ok=True)
-    pdf_files = [f for f in os.listdir(input_dir) if f.lower().endswith('.pdf')]
+    with open(output_path, "w", encoding="utf-8") as f:
+        f.write(cleaned_text)
+    # Slide timestamps are stripped from the text but kept for segmentation
+    with open(anchors_path(output_path), "w", encoding="utf-8") as f:
+        json.dump(normalizer.word_anchors(raw_text, cleaned_text), f)
+    return dict(stats, file=os.path.basename(input_path))
 
-    for file_name in pdf_files:
-        input_path = os.path.join(input_dir, file_name)
-        base_name = os.path.splitext(file_name)[0]
-        output_path = os.path.join(output_dir, f"{base_name}.txt")
-
-        print(f"Processing: {file_name}")
-        raw_text = pdf_to_text(input_path)
-        cleaned_text = clean_text(raw_text)
+def process_all_transcripts(input_dir, output_dir, workers=1, cache_dir=RAW_CACHE_DIR,
+                            normalizer=DEFAULT_NORMALIZER):
+    """
+    Process every PDF in input_dir, in a process pool when workers > 1, and
+    write per-file page counts and extraction times to the cache's report.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    pdf_files = sorted(f for f in os.listdir(input_dir) if f.lower().endswith('.pdf'))
+    jobs = [
+        (os.path.join(input_dir, f), os.path.join(output_dir, f"{os.path.splitext(f)[0]}.txt"))
+        for f in pdf_files
+    ]
 
-        with open(output_path, "w", encoding="utf-8") as f:
-            f.write(cleaned_text)
+    start = time.perf_counter()
+    report = []
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [(in_path, pool.submit(process_transcript, in_path, out_path, cache_dir, normalizer))
+                       for in_path, out_path in jobs]
+            for in_path, future in futures:
+                try:
+                    report.append(future.result())
+                except Exception as e:
+                    print(f"⚠️ Failed to process {in_path}: {e}")
+    else:
+        for in_path, out_path in jobs:
+            try:
+                report.append(process_transcript(in_path, out_path, cache_dir, normalizer))
+            except Exception as e:
+                print(f"⚠️ Failed to process {in_path}: {e}")
+    elapsed = time.perf_counter() - start
 
+    os.makedirs(cache_dir, exist_ok=True)
+    with open(os.path.join(cache_dir, "extraction_report.json"), "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    parsed = [r for r in report if not r["cached"]]
+    print(f"\n📄 {len(report)} transcripts in {elapsed:.1f}s: {len(parsed)} parsed "
+          f"({sum(r['pages'] for r in parsed)} pages), {len(report) - len(parsed)} from cache")
     print(f"\n✅ All transcripts processed and saved to: {output_dir}")
 
 
 def main():
-    input_dir = "data/transcript_downloads"
-    output_dir = "data/transcript_processed"
-    process_all_transcripts(input_dir, output_dir)
-    print("✅ All transcripts processed and saved to:", output_dir)
+    parser = argparse.ArgumentParser(description="Extract and clean PDF transcripts.")
+    parser.add_argument("--input_dir", default="data/transcript_downloads", help="Folder with PDF transcripts")
+    parser.add_argument("--output_dir", default="data/transcript_processed", help="Folder for cleaned .txt files")
+    parser.add_argument("--workers", type=int, default=1, help="Parallel worker processes")
+    parser.add_argument("--cache_dir", default=RAW_CACHE_DIR, help="Raw text cache keyed by PDF hash")
+    parser.add_argument("--rules", help="JSON file with extra course-specific normalization rules")
+    args = parser.parse_args()
+    normalizer = TextNormalizer(load_rules(args.rules)) if args.rules else DEFAULT_NORMALIZER
+    process_all_transcripts(args.input_dir, args.output_dir, args.workers, args.cache_dir, normalizer)
+    print("✅ All transcripts processed and saved to:", args.output_dir)
 
     
 if __name__ == "__main__":
@@ -0,0 +1,185 @@
+"""
+Zero-copy segment reads from lecture WAVs.
+
+Segment manifests point into whole-lecture WAVs with an offset and duration.
+Instead of decoding a lecture to get 20 s out of it, the RIFF header is parsed
+once and the data chunk is mapped with numpy.memmap; a segment read touches
+only the pages holding its own samples.
+
+Usage:
+    python 05_train_manifest/audio_reader.py train_segments.jsonl --benchmark 200
+"""
+
+import io
+import os
+import json
+import time
+import struct
+import random
+import argparse
+from collections import OrderedDict, namedtuple
+import numpy as np
+import soundfile as sf
+
+WAVE_FORMAT_PCM = 0x0001
+WAVE_FORMAT_IEEE_FLOAT = 0x0003
+WAVE_FORMAT_EXTENSIBLE = 0xFFFE
+PCM_DTYPES = {2: np.dtype("<i2"), 4: np.dtype("<i4")}
+
+WavLayout = namedtuple("WavLayout", "data_offset n_frames channels sample_rate dtype")
+
+
+def read_wav_layout(path):
+    """Parse the RIFF chunks of a WAV file up to its data chunk; nothing past the header is read."""
+    with open(path, "rb") as f:
+        return _parse_wav_header(f, os.fstat(f.fileno()).st_size, path)
+
+
+def _parse_wav_header(f, file_size, name):
+    riff, _, wave_id = struct.unpack("<4sI4s", f.read(12))
+    if riff != b"RIFF" or wave_id != b"WAVE":
+        raise ValueError(f"{name} is not a RIFF/WAVE file")
+    fmt = None
+    while True:
+        header = f.read(8)
+        if len(header) < 8:
+            raise ValueError(f"{name} has no data chunk")
+        chunk_id, size = struct.unpack("<4sI", header)
+        if chunk_id == b"fmt ":
+            fmt = f.read(size + (size & 1))
+        elif chunk_id == b"data":
+            data_offset = f.tell()
+            break
+        else:
+            f.seek(size + (size & 1), os.SEEK_CUR)
+
+    if fmt is None:
+        raise ValueError(f"{name} has its data chunk before the fmt chunk")
+    audio_format, channels, sample_rate, _, block_align, bits = struct.unpack("<HHIIHH", fmt[:16])
+    if audio_format == WAVE_FORMAT_EXTENSIBLE and len(fmt) >= 26:
+        audio_format = struct.unpack("<H", fmt[24:26])[0]
+    sample_width = block_align // channels
+    if audio_format == WAVE_FORMAT_PCM and sample_width in PCM_DTYPES:
+        dtype = PCM_DTYPES[sample_width]
+    elif audio_format == WAVE_FORMAT_IEEE_FLOAT and sample_width == 4:
+        dtype = np.dtype("<f4")
+    else:
+        raise ValueError(f"{name}: unsupported WAV format {audio_format} with {bits}-bit samples")
+
+    # Streamed WAVs may carry a placeholder data size; trust the file length instead
+    data_size = min(size, file_size - data_offset)
+    return WavLayout(data_offset, data_size // block_align, channels, sample_rate, dtype)
+
+
+def decode_wav_bytes(data, dtype=np.float32):
+    """(frames, channels) samples and sample rate of an in-memory WAV, without a copy when dtype is None."""
+    layout = _parse_wav_header(io.BytesIO(data), len(data), "<bytes>")
+    samples = np.frombuffer(data, dtype=layout.dtype, count=layout.n_frames * layout.channels,
+                            offset=layout.data_offset).reshape(-1, layout.channels)
+    return (samples if dtype is None else to_float32(samples)), layout.sample_rate
+
+
+def wav_duration(path):
+    """Duration in seconds from the WAV header alone."""
+    layout = read_wav_layout(path)
+    return layout.n_frames / layout.sample_rate
+
+
+def open_wav_memmap(path):
+    """Read-only (frames, channels) memmap over a WAV's samples, and its sample rate."""
+    layout = read_wav_layout(path)
+    samples = np.memmap(path, dtype=layout.dtype, mode="r", offset=layout.data_offset,
+                        shape=(layout.n_frames, layout.channels))
+    return samples, layout.sample_rate
+
+
+def to_float32(samples):
+    """Scale integer PCM to float32 in [-1, 1), the way soundfile reads it."""
+    if samples.dtype.kind == "f":
+        return np.asarray(samples, dtype=np.float32)
+    return samples.astype(np.float32) / float(2 ** (8 * samples.dtype.itemsize - 1))
+
+
+class SegmentReader:
+    """
+    Serve manifest segments from memory-mapped lecture WAVs. Maps are kept for
+    the max_open most recently used files, so consecutive segments of one
+    lecture share a single header parse and mapping.
+    """
+
+    def __init__(self, max_open=64):
+        self.max_open = max_open
+        self._maps = OrderedDict()
+
+    def _memmap(self, path):
+        if path in self._maps:
+            self._maps.move_to_end(path)
+        else:
+            self._maps[path] = open_wav_memmap(path)
+            if len(self._maps) > self.max_open:
+                self._maps.popitem(last=False)
+        return self._maps[path]
+
+    def read(self, path, offset=0.0, duration=None, mono=True, dtype=np.float32):
+        """
+        Samples for [offset, offset + duration) seconds of a WAV, and its sample rate.
+        mono=True returns a 1-D array (channels averaged); dtype=None keeps raw PCM.
+        """
+        samples, sample_rate = self._memmap(path)
+        start = min(len(samples), int(round(offset * sample_rate)))
+        end = len(samples) if duration is None else min(len(samples), start + int(round(duration * sample_rate)))
+        segment = samples[start:end]
+        if dtype is not None:
+            segment = to_float32(segment)
+        else:
+            segment = np.array(segment)
+        if mono:
+            segment = segment[:, 0] if segment.shape[1] == 1 else segment.mean(axis=1)
+        return segment, sample_rate
+
+    def read_row(self, row, **kwargs):
+        """read() for a manifest row; lecture rows without an offset are read whole."""
+        return self.read(row["audio_filepath"], row.get("offset", 0.0), row.get("duration"), **kwargs)
+
+    def close(self):
+        self._maps.clear()
+
+
+def benchmark_reader(rows, n=200, seed=0):
+    """Compare memmap segment reads with decoding each lecture and slicing, and check they match."""
+    sample = random.Random(seed).sample(rows, min(n, len(rows)))
+    reader = SegmentReader()
+
+    start = time.perf_counter()
+    ours = [reader.read_row(row)[0] for row in sample]
+    memmap_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    theirs = []
+    for row in sample:
+        y, sr = sf.read(row["audio_filepath"], dtype="float32", always_2d=True)
+        a = int(round(row.get("offset", 0.0) * sr))
+        theirs.append(y[a:a + int(round(row["duration"] * sr))].mean(axis=1))
+    decode_time = time.perf_counter() - start
+
+    identical = all(np.array_equal(a, b) for a, b in zip(ours, theirs))
+    print(f"⏱️ memmap: {memmap_time:.3f}s, full decode + slice: {decode_time:.3f}s "
+          f"({decode_time / memmap_time if memmap_time else float('inf'):.0f}x) over {len(sample)} segments")
+    print("✅ Samples identical to soundfile" if identical else "❌ Samples differ from soundfile")
+    return identical
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Read manifest segments from memory-mapped WAVs.")
+    parser.add_argument("manifest", help="Manifest with audio_filepath/offset/duration rows")
+    parser.add_argument("--benchmark", type=int, metavar="N", help="Time N random segment reads against soundfile")
+    args = parser.parse_args()
+
+    with open(args.manifest, "r", encoding="utf-8") as f:
+        manifest_rows = [json.loads(line) for line in f if line.strip()]
+    if args.benchmark:
+        benchmark_reader(manifest_rows, args.benchmark)
+    else:
+        reader = SegmentReader()
+        total = sum(len(reader.read_row(row)[0]) for row in manifest_rows)
+        print(f"✅ Read {len(manifest_rows)} segments ({total} samples)")
@@ -0,0 +1,204 @@
+"""
+Duration-bucketed, token-balanced batching over a manifest.
+
+The manifest is scanned once into a bucket index (<manifest>.buckets.npz):
+per-row duration, word and character counts (counted like process_data.py)
+and the byte offset of every line. The index is keyed by the manifest's size
+and mtime, so later epochs and runs load it instead of re-reading the JSONL.
+
+Rows are sorted by duration into buckets and packed so that each batch's
+padded size, len(batch) * longest item, stays within a budget of audio
+seconds and, optionally, tokens. Batches are shuffled per epoch with a fixed
+seed. The sampler yields lists of row numbers, like a torch BatchSampler.
+
+Usage:
+    python 05_train_manifest/batch_sampler.py train_segments.jsonl --max_seconds 320 --report
+"""
+
+import os
+import json
+import time
+import argparse
+import numpy as np
+
+MAX_BATCH_SECONDS = 320.0
+N_BUCKETS = 30
+
+
+def index_path_for(manifest_path):
+    return f"{manifest_path}.buckets.npz"
+
+
+def build_bucket_index(manifest_path):
+    """Scan the manifest once: duration, word/char counts and line offset per row."""
+    durations, words, chars, offsets = [], [], [], []
+    with open(manifest_path, "rb") as f:
+        offset = 0
+        for line in f:
+            if line.strip():
+                row = json.loads(line)
+                text = row.get("text", "")
+                durations.append(row.get("duration", 0.0))
+                words.append(len(text.split()))
+                chars.append(len(text))
+                offsets.append(offset)
+            offset += len(line)
+    return {
+        "duration": np.asarray(durations, dtype=np.float64),
+        "words": np.asarray(words, dtype=np.int64),
+        "chars": np.asarray(chars, dtype=np.int64),
+        "offsets": np.asarray(offsets, dtype=np.int64),
+    }
+
+
+def load_bucket_index(manifest_path, index_path=None):
+    """The persisted index if it still matches the manifest's size and mtime, else a fresh one (saved)."""
+    index_path = index_path or index_path_for(manifest_path)
+    st = os.stat(manifest_path)
+    key = np.array([st.st_size, st.st_mtime_ns], dtype=np.int64)
+    if os.path.exists(index_path):
+        with np.load(index_path) as cached:
+            if np.array_equal(cached["key"], key):
+                return {name: cached[name] for name in ("duration", "words", "chars", "offsets")}
+
+    start = time.perf_counter()
+    index = build_bucket_index(manifest_path)
+    tmp_path = f"{index_path}.tmp.npz"
+    np.savez(tmp_path, key=key, **index)
+    os.replace(tmp_path, index_path)
+    print(f"🗂️ Indexed {len(index['duration'])} rows of {manifest_path} in {time.perf_counter() - start:.2f}s")
+    return index
+
+
+def read_rows(manifest_path, row_numbers, index):
+    """Fetch manifest rows by number with one seek each, using the index's line offsets."""
+    rows = []
+    with open(manifest_path, "rb") as f:
+        for i in row_numbers:
+            f.seek(int(index["offsets"][i]))
+            rows.append(json.loads(f.readline()))
+    return rows
+
+
+class DurationBucketSampler:
+    """
+    Batches of row numbers whose padded size fits max_seconds of audio and, if
+    given, max_tokens (token_unit "words" or "chars"). Rows are grouped into
+    n_buckets duration quantiles so batch members have similar lengths.
+    """
+
+    def __init__(self, index, max_seconds=MAX_BATCH_SECONDS, max_tokens=None, token_unit="chars",
+                 n_buckets=N_BUCKETS, shuffle=True, seed=0, drop_last=False):
+        self.duration = index["duration"]
+        self.tokens = index[token_unit]
+        self.max_seconds = max_seconds
+        self.max_tokens = max_tokens
+        self.n_buckets = max(1, n_buckets)
+        self.shuffle = shuffle
+        self.seed = seed
+        self.drop_last = drop_last
+        self.epoch = 0
+        self._batches = {}
+
+    def set_epoch(self, epoch):
+        self.epoch = epoch
+
+    def _buckets(self, rng):
+        order = np.argsort(self.duration, kind="stable")
+        buckets = np.array_split(order, min(self.n_buckets, max(1, len(order))))
+        if self.shuffle:
+            # Batch membership changes every epoch, but only among rows of similar length
+            buckets = [b[rng.permutation(len(b))] for b in buckets]
+        return buckets
+
+    def _pack(self, bucket):
+        batches, batch = [], []
+        longest = longest_tokens = 0
+        for i in bucket:
+            d, t = self.duration[i], self.tokens[i]
+            new_longest, new_tokens = max(longest, d), max(longest_tokens, t)
+            over_seconds = new_longest * (len(batch) + 1) > self.max_seconds
+            over_tokens = self.max_tokens is not None and new_tokens * (len(batch) + 1) > self.max_tokens
+            if batch and (over_seconds or over_tokens):
+                batches.append(batch)
+                batch, new_longest, new_tokens = [], d, t
+            batch.append(int(i))
+            longest, longest_tokens = new_longest, new_tokens
+        if batch and not (self.drop_last and len(batches)):
+            batches.append(batch)
+        return batches
+
+    def batches(self, epoch=None):
+        epoch = self.epoch if epoch is None else epoch
+        if epoch not in self._batches:
+            rng = np.random.default_rng((self.seed, epoch))
+            batches = [b for bucket in self._buckets(rng) for b in self._pack(bucket)]
+            if self.shuffle:
+                batches = [batches[i] for i in rng.permutation(len(batches))]
+            self._batches = {epoch: batches}
+        return self._batches[epoch]
+
+    def __iter__(self):
+        return iter(self.batches())
+
+    def __len__(self):
+        return len(self.batches())
+
+
+def padding_efficiency(batches, values):
+    """Share of the padded batch area (len * longest) that is real data."""
+    real = sum(float(values[b].sum()) for b in map(np.asarray, batches))
+    padded = sum(float(values[b].max()) * len(b) for b in map(np.asarray, batches))
+    return real / padded if padded else 1.0
+
+
+def random_batches(index, max_seconds, max_tokens=None, seed=0):
+    """Unbucketed baseline: shuffled rows packed under the same padded budgets."""
+    baseline = DurationBucketSampler(index, max_seconds, max_tokens, n_buckets=1, shuffle=False)
+    order = np.random.default_rng(seed).permutation(len(index["duration"]))
+    return baseline._pack(order)
+
+
+def padding_report(index, max_seconds=MAX_BATCH_SECONDS, max_tokens=None, bucket_counts=(10, 30, 100)):
+    """Print batches, mean batch size and audio/token padding efficiency per configuration."""
+    configs = [("random", random_batches(index, max_seconds, max_tokens))]
+    for n in bucket_counts:
+        sampler = DurationBucketSampler(index, max_seconds, max_tokens, n_buckets=n)
+        configs.append((f"{n} buckets", sampler.batches()))
+
+    print(f"\n📊 Padding efficiency (max {max_seconds:g}s"
+          f"{f', {max_tokens} tokens' if max_tokens else ''} per padded batch):")
+    print(f"{'config':>12} {'batches':>8} {'avg size':>9} {'audio':>7} {'chars':>7} {'words':>7}")
+    report = []
+    for name, batches in configs:
+        row = {
+            "config": name, "batches": len(batches),
+            "avg_size": float(np.mean([len(b) for b in batches])) if batches else 0.0,
+            "audio": padding_efficiency(batches, index["duration"]),
+            "chars": padding_efficiency(batches, index["chars"]),
+            "words": padding_efficiency(batches, index["words"]),
+        }
+        report.append(row)
+        print(f"{name:>12} {row['batches']:>8} {row['avg_size']:>9.1f} {row['audio']:>7.1%} "
+              f"{row['chars']:>7.1%} {row['words']:>7.1%}")
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Length-bucketed batches over a manifest.")
+    parser.add_argument("manifest", nargs="?", default="train_segments.jsonl", help="Manifest to batch")
+    parser.add_argument("--max_seconds", type=float, default=MAX_BATCH_SECONDS, help="Padded audio seconds per batch")
+    parser.add_argument("--max_tokens", type=int, help="Padded tokens per batch")
+    parser.add_argument("--token_unit", choices=("chars", "words"), default="chars", help="What a token is")
+    parser.add_argument("--buckets", type=int, default=N_BUCKETS, help="Number of duration buckets")
+    parser.add_argument("--report", action="store_true", help="Compare padding efficiency across configurations")
+    args = parser.parse_args()
+
+    bucket_index = load_bucket_index(args.manifest)
+    if args.report:
+        padding_report(bucket_index, args.max_seconds, args.max_tokens)
+    else:
+        sampler = DurationBucketSampler(bucket_index, args.max_seconds, args.max_tokens, args.token_unit, args.buckets)
+        batches = sampler.batches()
+        print(f"✅ {len(batches)} batches from {len(bucket_index['duration'])} rows, "
+              f"audio padding efficiency {padding_efficiency(batches, bucket_index['duration']):.1%}")
@@ -1,61 +1,147 @@
 import json
 import os
-from pathlib import Path
+import time
+import argparse
+from difflib import get_close_matches
+from concurrent.futures import ThreadPoolExecutor
 import soundfile as sf
+from audio_reader import wav_duration
+
+AUDIO_DIR = 'data/audio_processed'
+TRANSCRIPT_DIR = 'data/transcript_processed'
+MANIFEST_PATH = 'train_manifest.jsonl'
+PROBE_WORKERS = 16  # header probes are tiny reads, so threads overlap the I/O latency
 
 def get_audio_duration(audio_path):
     """
     Get the duration of a .wav audio file in seconds.
     """
-    with sf.SoundFile(audio_path) as audio:
-        duration = len(audio) / audio.samplerate
-    return duration
+    try:
+        return wav_duration(audio_path)
+    except ValueError:
+        # Not a plain PCM/float WAV; let libsndfile work it out
+        with sf.SoundFile(audio_path) as audio:
+            return len(audio) / audio.samplerate
+
+def manifest_entry(audio_filepath, duration, text, offset=None):
+    """
+    One manifest row. Lecture rows cover the whole file; segment rows add an
+    offset (seconds) so duration is read from that point of the lecture WAV.
+    """
+    entry = {'audio_filepath': audio_filepath}
+    if offset is not None:
+        entry['offset'] = round(offset, 3)
+    entry['duration'] = round(duration, 3) if offset is not None else duration
+    entry['text'] = text
+    return entry
+
+def load_manifest(manifest_path):
+    """Manifest rows with the offset filled in (0.0 for whole-lecture rows)."""
+    with open(manifest_path, 'r', encoding='utf-8') as f:
+        rows = [json.loads(line) for line in f if line.strip()]
+    for row in rows:
+        row.setdefault('offset', 0.0)
+    return rows
+
+def validate_manifest(manifest_path):
+    """Check every row's [offset, offset + duration) lies inside its WAV, reading headers only."""
+    durations = {}
+    problems = 0
+    for idx, row in enumerate(load_manifest(manifest_path)):
+        path = row['audio_filepath']
+        if path not in durations:
+            durations[path] = get_audio_duration(path) if os.path.isfile(path) else None
+        if durations[path] is None:
+            print(f"⚠️ Row {idx}: missing audio {path}")
+            problems += 1
+        elif row['offset'] < 0 or row['offset'] + row['duration'] > durations[path] + 1e-3:
+            print(f"⚠️ Row {idx}: {row['offset']}+{row['duration']}s outside {path} ({durations[path]:.3f}s)")
+            problems += 1
+    print(f"{'✅' if not problems else '❌'} {manifest_path}: {problems} invalid rows across {len(durations)} audio files")
+    return problems == 0
+
+def index_tree(directory, extension):
+    """{stem: path} for the files with this extension, from a single os.scandir."""
+    if not os.path.isdir(directory):
+        return {}
+    with os.scandir(directory) as entries:
+        return {
+            entry.name[:-len(extension)]: entry.path
+            for entry in entries if entry.name.endswith(extension) and entry.is_file()
+        }
 
-def create_training_manifest():
+def _probe_pair(pair):
+    """Duration from the WAV header and the stripped transcript text for one matched pair."""
+    audio_path, transcript_path = pair
+    with open(transcript_path, 'r', encoding='utf-8') as tf:
+        text = tf.read().strip()
+    return get_audio_duration(audio_path), text
+
+def pairing_report(audio_index, transcript_index, max_suggestions=3, cutoff=0.8):
+    """Unmatched audio and transcripts by stem, each with close-name suggestions from the other side."""
+    unmatched_audio = sorted(audio_index.keys() - transcript_index.keys())
+    unmatched_text = sorted(transcript_index.keys() - audio_index.keys())
+
+    def suggestions(names, candidates):
+        return {name: get_close_matches(name, candidates, max_suggestions, cutoff) for name in names}
+
+    return {
+        'matched': len(audio_index.keys() & transcript_index.keys()),
+        'unmatched_audio': suggestions(unmatched_audio, unmatched_text),
+        'unmatched_transcripts': suggestions(unmatched_text, unmatched_audio),
+    }
+
+def create_training_manifest(audio_dir=AUDIO_DIR, transcript_dir=TRANSCRIPT_DIR, manifest_path=MANIFEST_PATH,
+                             workers=PROBE_WORKERS):
     """
     Creates a train_manifest.jsonl file with audio_filepath, duration, and text.
+    Both folders are indexed once, durations are probed from WAV headers in a
+    thread pool, and unmatched files are written to a pairing report next to
+    the manifest.
     """
-    # Define your paths
-    AUDIO_DIR = 'data/audio_processed'
-    TRANSCRIPT_DIR = 'data/transcript_processed'
-    MANIFEST_PATH = 'train_manifest.jsonl'
-    with open(MANIFEST_PATH, 'w', encoding='utf-8') as manifest_file:
-        for audio_file in os.listdir(AUDIO_DIR):
-            if audio_file.endswith('.wav'):
-                audio_path = os.path.join(AUDIO_DIR, audio_file)
-                
-                # Base filename (no extension)
-                base_name = Path(audio_file).stem
-                
-                # Transcript path
-                transcript_file = os.path.join(TRANSCRIPT_DIR, f'{base_name}.txt')
-                
-                if not os.path.isfile(transcript_file):
-                    print(f"⚠️ Warning: No matching transcript for {audio_file}")
-                    continue
-                
-                # Get text
-                with open(transcript_file, 'r', encoding='utf-8') as tf:
-                    text = tf.read().strip()
-                
-                # Get duration
-                duration = get_audio_duration(audio_path)
-                
-                # Build JSON object
-                entry = {
-                    'audio_filepath': audio_path,
-                    'duration': duration,
-                    'text': text
-                }
-                
-                # Write JSON line
-                manifest_file.write(json.dumps(entry) + '\n')
-                print(f"✅ Added {audio_file} to manifest.")
-
-    print(f"\n Manifest created at {MANIFEST_PATH}")
+    start = time.perf_counter()
+    audio_index = index_tree(audio_dir, '.wav')
+    transcript_index = index_tree(transcript_dir, '.txt')
+    stems = sorted(audio_index.keys() & transcript_index.keys())
+    pairs = [(audio_index[stem], transcript_index[stem]) for stem in stems]
+
+    total_duration = 0.0
+    tmp_path = f"{manifest_path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as manifest_file, ThreadPoolExecutor(max_workers=workers) as pool:
+        # map() yields in input order, so rows stream out while later files are still being probed
+        for (audio_path, _), (duration, text) in zip(pairs, pool.map(_probe_pair, pairs)):
+            manifest_file.write(json.dumps(manifest_entry(audio_path, duration, text)) + '\n')
+            total_duration += duration
+    os.replace(tmp_path, manifest_path)
+
+    report = pairing_report(audio_index, transcript_index)
+    report_path = os.path.splitext(manifest_path)[0] + '.pairing.json'
+    with open(report_path, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+
+    elapsed = time.perf_counter() - start
+    print(f"✅ Added {len(pairs)} lectures ({total_duration / 3600:.2f} h) to the manifest in {elapsed:.2f}s")
+    for kind in ('unmatched_audio', 'unmatched_transcripts'):
+        if report[kind]:
+            print(f"⚠️ {len(report[kind])} {kind.replace('_', ' ')}, e.g. "
+                  + ", ".join(f"{name} (did you mean {hints[0]}?)" if hints else name
+                              for name, hints in list(report[kind].items())[:3]))
+    print(f"\n Manifest created at {manifest_path}, pairing report at {report_path}")
+    return report
 
 if __name__ == '__main__':
-    create_training_manifest()
-    print("Manifest creation complete.")
+    parser = argparse.ArgumentParser(description="Create or check a training manifest.")
+    parser.add_argument('--audio_dir', default=AUDIO_DIR, help="Folder with processed lecture WAVs")
+    parser.add_argument('--transcript_dir', default=TRANSCRIPT_DIR, help="Folder with processed transcripts")
+    parser.add_argument('--manifest', default=MANIFEST_PATH, help="Manifest to write")
+    parser.add_argument('--workers', type=int, default=PROBE_WORKERS, help="Threads probing WAV headers")
+    parser.add_argument('--validate', metavar='MANIFEST',
+                        help="Only check that a (segment) manifest's offsets and durations fit its WAVs")
+    args = parser.parse_args()
+    if args.validate:
+        validate_manifest(args.validate)
+    else:
+        create_training_manifest(args.audio_dir, args.transcript_dir, args.manifest, args.workers)
+        print("Manifest creation complete.")
 
 
@@ -0,0 +1,235 @@
+"""
+Pack a manifest into WebDataset-style tar shards.
+
+Each sample is stored as <key>.wav (its own segment only, as a standalone WAV)
+next to <key>.json (text, duration and where it came from), and samples fill
+shards of roughly --shard_size bytes. Sample order is shuffled once at export
+with a fixed seed; readers shuffle the shard order per epoch and can add a
+small in-memory shuffle buffer, so every epoch is reproducible while all disk
+I/O stays sequential.
+
+    data/shards/shard-000000.tar
+    data/shards/shard-000001.tar
+    data/shards/index.json
+
+Usage:
+    python 05_train_manifest/export_shards.py train_segments.jsonl data/shards --shard_size 1GB
+    python 05_train_manifest/export_shards.py train_segments.jsonl data/shards --benchmark 500
+"""
+
+import io
+import os
+import json
+import time
+import random
+import tarfile
+import argparse
+import numpy as np
+import soundfile as sf
+
+from audio_reader import SegmentReader, decode_wav_bytes
+from create_manifest import load_manifest
+
+SHARDS_DIR = "data/shards"
+SHARD_SIZE = 1 << 30
+SHUFFLE_SEED = 0
+WAV_SUBTYPES = {np.dtype("<i2"): "PCM_16", np.dtype("<i4"): "PCM_32", np.dtype("<f4"): "FLOAT"}
+
+
+def parse_size(text):
+    """'1GB', '256MB', '4096' -> bytes."""
+    text = str(text).strip().upper()
+    for suffix, scale in (("GB", 1 << 30), ("MB", 1 << 20), ("KB", 1 << 10), ("B", 1)):
+        if text.endswith(suffix):
+            return int(float(text[:-len(suffix)]) * scale)
+    return int(text)
+
+
+def encode_wav(samples, sample_rate):
+    buffer = io.BytesIO()
+    sf.write(buffer, samples, sample_rate, format="WAV", subtype=WAV_SUBTYPES[samples.dtype])
+    return buffer.getvalue()
+
+
+def _add_member(tar, name, data):
+    info = tarfile.TarInfo(name)
+    info.size = len(data)
+    info.mtime = 0  # byte-identical shards for identical inputs
+    tar.addfile(info, io.BytesIO(data))
+
+
+def export_shards(manifest_path, output_dir=SHARDS_DIR, shard_size=SHARD_SIZE, seed=SHUFFLE_SEED):
+    """Write the manifest's samples into shuffled tar shards plus an index.json; returns the index."""
+    rows = load_manifest(manifest_path)
+    order = list(range(len(rows)))
+    random.Random(seed).shuffle(order)
+    os.makedirs(output_dir, exist_ok=True)
+
+    reader = SegmentReader()
+    shards = []
+    tar = None
+    start = time.perf_counter()
+
+    def close_shard():
+        tar.close()
+        os.replace(shards[-1]["tmp_path"], os.path.join(output_dir, shards[-1]["name"]))
+        shards[-1]["bytes"] = os.path.getsize(os.path.join(output_dir, shards[-1]["name"]))
+        del shards[-1]["tmp_path"]
+        print(f"📦 {shards[-1]['name']}: {shards[-1]['samples']} samples, {shards[-1]['bytes'] / 1e6:.1f} MB")
+
+    for position, idx in enumerate(order):
+        row = rows[idx]
+        samples, sample_rate = reader.read_row(row, mono=False, dtype=None)
+        key = f"{idx:09d}"
+        wav_bytes = encode_wav(samples, sample_rate)
+        meta = json.dumps({
+            "text": row["text"], "duration": row["duration"], "sample_rate": sample_rate,
+            "audio_filepath": row["audio_filepath"], "offset": row["offset"],
+        }, ensure_ascii=False).encode("utf-8")
+
+        if tar is None or tar.fileobj.tell() + len(wav_bytes) > shard_size:
+            if tar is not None:
+                close_shard()
+            name = f"shard-{len(shards):06d}.tar"
+            shards.append({"name": name, "samples": 0, "first": position, "tmp_path": os.path.join(output_dir, f"{name}.tmp")})
+            tar = tarfile.open(shards[-1]["tmp_path"], "w", format=tarfile.USTAR_FORMAT)
+        _add_member(tar, f"{key}.wav", wav_bytes)
+        _add_member(tar, f"{key}.json", meta)
+        shards[-1]["samples"] += 1
+    if tar is not None:
+        close_shard()
+    reader.close()
+
+    # Drop shards left over from an earlier, larger export
+    names = {s["name"] for s in shards}
+    for name in os.listdir(output_dir):
+        if name.startswith("shard-") and name.endswith(".tar") and name not in names:
+            os.remove(os.path.join(output_dir, name))
+
+    index = {
+        "manifest": manifest_path, "seed": seed, "shard_size": shard_size,
+        "samples": len(rows), "hours": round(sum(r["duration"] for r in rows) / 3600, 3), "shards": shards,
+    }
+    with open(os.path.join(output_dir, "index.json"), "w", encoding="utf-8") as f:
+        json.dump(index, f, indent=2)
+    elapsed = time.perf_counter() - start
+    print(f"\n✅ {len(rows)} samples in {len(shards)} shards ({sum(s['bytes'] for s in shards) / 1e9:.2f} GB) "
+          f"in {elapsed:.1f}s, index at {os.path.join(output_dir, 'index.json')}")
+    return index
+
+
+def load_shard_index(shard_dir):
+    with open(os.path.join(shard_dir, "index.json"), "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def iter_shard(path, decode=True):
+    """Stream one tar shard front to back, yielding a dict per sample."""
+    sample = {}
+    with tarfile.open(path, "r|") as tar:
+        for member in tar:
+            key, ext = member.name.rsplit(".", 1)
+            data = tar.extractfile(member).read()
+            if sample and sample["key"] != key:
+                yield sample
+                sample = {}
+            sample["key"] = key
+            if ext == "json":
+                sample.update(json.loads(data))
+            elif decode:
+                audio, sample["sample_rate"] = decode_wav_bytes(data)
+                sample["audio"] = audio[:, 0] if audio.shape[1] == 1 else audio.mean(axis=1)
+            else:
+                sample["wav"] = data
+    if sample:
+        yield sample
+
+
+def iter_samples(shard_dir, epoch=0, shuffle=True, buffer_size=0, decode=True):
+    """
+    Stream every sample of an export. With shuffle, the shard order is permuted
+    by (index seed, epoch) and a buffer of buffer_size samples is shuffled on
+    the fly; the same epoch always yields the same order.
+    """
+    index = load_shard_index(shard_dir)
+    names = [s["name"] for s in index["shards"]]
+    rng = random.Random(index["seed"] * 1_000_003 + epoch)
+    if shuffle:
+        rng.shuffle(names)
+
+    buffer = []
+    for name in names:
+        for sample in iter_shard(os.path.join(shard_dir, name), decode):
+            if not shuffle or buffer_size <= 1:
+                yield sample
+                continue
+            buffer.append(sample)
+            if len(buffer) >= buffer_size:
+                yield buffer.pop(rng.randrange(len(buffer)))
+    rng.shuffle(buffer)
+    yield from buffer
+
+
+def drop_page_cache(paths):
+    """Ask the kernel to forget cached pages of these files so reads hit the disk (Linux only)."""
+    if not hasattr(os, "posix_fadvise"):
+        return False
+    for path in paths:
+        fd = os.open(path, os.O_RDONLY)
+        try:
+            os.fsync(fd)
+            os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_DONTNEED)
+        finally:
+            os.close(fd)
+    return True
+
+
+def benchmark_shards(manifest_path, shard_dir, n=500, seed=0, cold=True):
+    """
+    Samples/s and MB/s reading n random rows from JSONL + WAV files vs streaming
+    the shards. With cold, both sets of files are evicted from the page cache first.
+    """
+    rows = load_manifest(manifest_path)
+    sample = random.Random(seed).sample(rows, min(n, len(rows)))
+    shard_paths = [os.path.join(shard_dir, s["name"]) for s in load_shard_index(shard_dir)["shards"]]
+    if cold and not drop_page_cache({row["audio_filepath"] for row in sample} | set(shard_paths)):
+        print("ℹ️ Cannot drop the page cache on this platform; timings are warm.")
+
+    start = time.perf_counter()
+    n_bytes = 0
+    for row in sample:
+        with sf.SoundFile(row["audio_filepath"]) as f:
+            a = int(round(row["offset"] * f.samplerate))
+            f.seek(a)
+            audio = f.read(int(round(row["duration"] * f.samplerate)), dtype="float32")
+        n_bytes += audio.nbytes
+    wav_time = time.perf_counter() - start
+    print(f"⏱️ JSONL + WAV: {len(sample) / wav_time:.0f} samples/s, {n_bytes / wav_time / 1e6:.1f} MB/s")
+
+    start = time.perf_counter()
+    n_bytes = 0
+    count = 0
+    for item in iter_samples(shard_dir, shuffle=True, buffer_size=64):
+        n_bytes += item["audio"].nbytes
+        count += 1
+        if count >= len(sample):
+            break
+    shard_time = time.perf_counter() - start
+    print(f"⏱️ Shards:      {count / shard_time:.0f} samples/s, {n_bytes / shard_time / 1e6:.1f} MB/s "
+          f"({wav_time / len(sample) * count / shard_time:.1f}x)")
+    return wav_time, shard_time
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Pack a manifest into tar shards for sequential reading.")
+    parser.add_argument("manifest", nargs="?", default="train_segments.jsonl", help="Manifest to export")
+    parser.add_argument("output_dir", nargs="?", default=SHARDS_DIR, help="Folder for the shards and index.json")
+    parser.add_argument("--shard_size", default="1GB", help="Target shard size, e.g. 1GB or 256MB")
+    parser.add_argument("--seed", type=int, default=SHUFFLE_SEED, help="Export shuffle seed")
+    parser.add_argument("--benchmark", type=int, metavar="N", help="Compare reading N samples from WAVs vs shards")
+    parser.add_argument("--warm", action="store_true", help="Benchmark with files left in the page cache")
+    args = parser.parse_args()
+    if args.benchmark:
+        benchmark_shards(args.manifest, args.output_dir, args.benchmark, cold=not args.warm)
+    else:
+        export_shards(args.manifest, args.output_dir, parse_size(args.shard_size), args.seed)
@@ -0,0 +1,194 @@
+"""
+Split lecture-level manifest rows into utterance-sized training samples.
+
+Every lecture in train_manifest.jsonl is cut at pauses into segments of at
+most --max_duration seconds. Pauses come from the kept-ranges sidecar written
+by the audio cleaner (<name>.kept.json), or, for uncleaned audio, from the
+same silence detector run over the WAV. Transcript words are then spread over
+the voiced audio: linearly between the (Refer Slide Time: mm:ss) anchors saved
+by the text stage (<name>.anchors.json), or proportionally to voiced time when
+a lecture has none. Rows point into the lecture WAV instead of copying audio:
+
+    {"audio_filepath": ..., "offset": 12.34, "duration": 17.9, "text": ...}
+
+Usage:
+    python 05_train_manifest/segment_manifest.py train_manifest.jsonl train_segments.jsonl --workers 4
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import numpy as np
+import soundfile as sf
+from concurrent.futures import ProcessPoolExecutor
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "03_audio_preprocessor"))
+from clean_audio import (scan_energy, rms_dbfs, detect_nonsilent_ranges_file, keep_ranges,
+                         load_kept_ranges)
+from create_manifest import manifest_entry
+
+TRANSCRIPT_DIR = "data/transcript_processed"
+MAX_SEGMENT_SECONDS = 20.0
+MIN_SEGMENT_SECONDS = 1.0
+MIN_PAUSE_MS = 300       # shorter pauses than the cleaner's 500 ms give more cut points
+SILENCE_THRESH = -40     # dB relative to the lecture's own level, as in cleaning
+KEEP_SILENCE_MS = 100
+
+
+def voiced_ranges_from_kept(kept):
+    """Voiced [start_ms, end_ms] ranges on the cleaned timeline, and the source->cleaned time map."""
+    voiced, source_points, cleaned_points = [], [], []
+    pos = 0
+    for start, end in kept["kept_ms"]:
+        voiced.append([pos, pos + end - start])
+        source_points += [start, end]
+        cleaned_points += [pos, pos + end - start]
+        pos += end - start + kept["pause_ms"]
+    return voiced, (source_points, cleaned_points)
+
+
+def voiced_ranges_from_audio(wav_path, min_pause_ms=MIN_PAUSE_MS, silence_thresh=SILENCE_THRESH):
+    """Voiced [start_ms, end_ms] ranges of an uncleaned WAV, scanned block by block."""
+    scale = float(2 ** 15)
+    with sf.SoundFile(wav_path) as f:
+        total_energy, total_counts, n_ms, _ = scan_energy(f)
+        dbfs = rms_dbfs(total_energy, total_counts, scale)
+        nonsilent = detect_nonsilent_ranges_file(f, min_pause_ms, dbfs + silence_thresh, scale)
+    return keep_ranges(nonsilent, n_ms, KEEP_SILENCE_MS)
+
+
+def split_long_range(start, end, max_ms):
+    """Cut a range with no usable pause into equal pieces no longer than max_ms."""
+    pieces = max(1, int(np.ceil((end - start) / max_ms)))
+    edges = np.linspace(start, end, pieces + 1).round().astype(int)
+    return [[int(a), int(b)] for a, b in zip(edges, edges[1:])]
+
+
+def group_ranges(voiced, max_ms):
+    """Greedily pack consecutive voiced ranges into segments spanning at most max_ms."""
+    segments = []
+    for start, end in voiced:
+        for a, b in split_long_range(start, end, max_ms):
+            if segments and b - segments[-1][0][0] <= max_ms:
+                segments[-1].append([a, b])
+            else:
+                segments.append([[a, b]])
+    return segments
+
+
+def word_positions(cut_ms, voiced, n_words, anchors=None):
+    """
+    Word index at each cut time. Voiced time is the alignment axis: words are
+    spread evenly over it, pinned to the anchors' (time, word) points if given.
+    """
+    starts = np.array([a for a, _ in voiced], dtype=np.float64)
+    ends = np.array([b for _, b in voiced], dtype=np.float64)
+    cum = np.concatenate(([0.0], np.cumsum(ends - starts)))
+
+    def voiced_before(t):
+        t = np.asarray(t, dtype=np.float64)
+        idx = np.maximum(np.searchsorted(starts, t, side="right") - 1, 0)
+        return cum[idx] + np.clip(t - starts[idx], 0, ends[idx] - starts[idx])
+
+    xs, ys = [0.0], [0.0]
+    for time_ms, word in anchors or []:
+        x = float(voiced_before(time_ms))
+        # Keep only anchors that move forward in both time and text
+        if x > xs[-1] and ys[-1] < word < n_words:
+            xs.append(x)
+            ys.append(float(word))
+    xs.append(float(cum[-1]))
+    ys.append(float(n_words))
+    return np.rint(np.interp(voiced_before(cut_ms), xs, ys)).astype(int)
+
+
+def segment_lecture(row, transcript_dir=TRANSCRIPT_DIR, max_duration=MAX_SEGMENT_SECONDS,
+                    min_duration=MIN_SEGMENT_SECONDS):
+    """Segment rows for one lecture-level manifest row, plus stats for the report."""
+    audio_path = row["audio_filepath"]
+    base = os.path.splitext(os.path.basename(audio_path))[0]
+    words = row["text"].split()
+
+    kept = load_kept_ranges(audio_path)
+    if kept is not None:
+        voiced, (source_points, cleaned_points) = voiced_ranges_from_kept(kept)
+        to_wav_ms = lambda t: float(np.interp(t, source_points, cleaned_points)) if source_points else 0.0
+    else:
+        voiced = voiced_ranges_from_audio(audio_path)
+        to_wav_ms = float
+
+    anchors_file = os.path.join(transcript_dir, f"{base}.anchors.json")
+    anchors = []
+    if os.path.exists(anchors_file):
+        with open(anchors_file, "r", encoding="utf-8") as f:
+            anchors = [(to_wav_ms(a["time"] * 1000), a["word"]) for a in json.load(f)]
+
+    stats = {"lecture": base, "anchors": len(anchors), "cleaned": kept is not None,
+             "segments": 0, "dropped": 0}
+    if not voiced or not words:
+        return [], stats
+
+    segments = group_ranges(voiced, max_duration * 1000)
+    cuts = [seg[0][0] for seg in segments] + [segments[-1][-1][1]]
+    positions = word_positions(cuts, voiced, len(words), anchors)
+
+    rows = []
+    for seg, w0, w1 in zip(segments, positions, positions[1:]):
+        start_ms, end_ms = seg[0][0], seg[-1][1]
+        if w1 <= w0 or (end_ms - start_ms) < min_duration * 1000:
+            stats["dropped"] += 1
+            continue
+        rows.append(manifest_entry(audio_path, (end_ms - start_ms) / 1000, " ".join(words[w0:w1]), start_ms / 1000))
+    stats["segments"] = len(rows)
+    return rows, stats
+
+
+def _segment_row(args):
+    row, transcript_dir, max_duration = args
+    try:
+        return segment_lecture(row, transcript_dir, max_duration)
+    except Exception as e:
+        return [], {"lecture": row.get("audio_filepath"), "error": str(e)}
+
+
+def segment_manifest(manifest_path="train_manifest.jsonl", output_path="train_segments.jsonl",
+                     transcript_dir=TRANSCRIPT_DIR, max_duration=MAX_SEGMENT_SECONDS, workers=4):
+    """Segment every lecture of a manifest in a process pool, writing rows in manifest order."""
+    with open(manifest_path, "r", encoding="utf-8") as f:
+        lectures = [json.loads(line) for line in f if line.strip()]
+
+    start = time.perf_counter()
+    jobs = [(row, transcript_dir, max_duration) for row in lectures]
+    n_rows = 0
+    audio_seconds = 0.0
+    tmp_path = f"{output_path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as out, ProcessPoolExecutor(max_workers=workers) as pool:
+        for rows, stats in pool.map(_segment_row, jobs, chunksize=1):
+            if "error" in stats:
+                print(f"⚠️ Failed to segment {stats['lecture']}: {stats['error']}")
+                continue
+            for row in rows:
+                out.write(json.dumps(row) + "\n")
+                audio_seconds += row["duration"]
+            n_rows += len(rows)
+            print(f"✂️ {stats['lecture']}: {stats['segments']} segments "
+                  f"({stats['anchors']} anchors, {stats['dropped']} dropped)")
+    os.replace(tmp_path, output_path)
+
+    elapsed = time.perf_counter() - start
+    print(f"\n✅ {len(lectures)} lectures -> {n_rows} segments "
+          f"({audio_seconds / 3600:.2f} h) in {elapsed:.1f}s, saved to {output_path}")
+    return n_rows
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Split lecture-level manifest rows into short segments.")
+    parser.add_argument("manifest", nargs="?", default="train_manifest.jsonl", help="Lecture-level manifest")
+    parser.add_argument("output", nargs="?", default="train_segments.jsonl", help="Segment manifest to write")
+    parser.add_argument("--transcript_dir", default=TRANSCRIPT_DIR, help="Folder with <name>.anchors.json sidecars")
+    parser.add_argument("--max_duration", type=float, default=MAX_SEGMENT_SECONDS, help="Longest segment in seconds")
+    parser.add_argument("--workers", type=int, default=4, help="Lectures segmented in parallel")
+    args = parser.parse_args()
+    segment_manifest(args.manifest, args.output, args.transcript_dir, args.max_duration, args.workers)
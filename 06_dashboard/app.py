@@ -1,35 +1,142 @@
 import sqlite3
+import time
 import pandas as pd
 import dash
-from dash import dcc, html
-import plotly.express as px
+from dash import dcc, html, Input, Output, State
+import plotly.graph_objects as go
 import dash_bootstrap_components as dbc
 import os
 
 # --- Configuration ---
 DB_PATH = os.path.join(os.path.dirname(__file__), "dashboard_data.db")
-CARD_BACKGROUND = "#1f001f" 
-BACKGROUND_DARK = "#120012" 
+# Written by pipeline_progress.py while stages run; a separate file so it never invalidates cached_query
+PROGRESS_DB_PATH = os.path.join(os.path.dirname(__file__), "pipeline_progress.db")
+CARD_BACKGROUND = "#1f001f"
+BACKGROUND_DARK = "#120012"
 PRIMARY_RED = "#d4004c"
 ACCENT_PINK = "#ff6f9f"
 TEXT_LIGHT = "#ffffff"
+# Seconds a query result is reused while the database file is unchanged
+QUERY_TTL_SECONDS = 30
+HISTOGRAM_BINS = 30
+# Live pipeline panel: poll interval, and how long a running stage may go without events
+PROGRESS_POLL_MS = 2000
+STALL_SECONDS = 120
 
-# --- Load Data ---
-def load_data():
-    """Loads data from the SQLite database."""
+SUMMARY_COLUMNS = ["total_duration", "total_utterances", "vocabulary_size", "alphabet_size", "alphabet"]
+SUMMARY_SQL = f"SELECT {', '.join(SUMMARY_COLUMNS)} FROM summary_statistics"
+# Bins materialized by process_data.py
+HISTOGRAM_SQL = "SELECT bin_start, bin_end, count FROM histograms WHERE column_name = '{column}' ORDER BY bin"
+# Databases written before the histograms table existed are binned on the fly, still inside SQLite
+HISTOGRAM_FALLBACK_SQL = f'''
+WITH r AS (SELECT MIN({{column}}) AS low, (MAX({{column}}) - MIN({{column}})) / {HISTOGRAM_BINS}.0 AS width FROM audio_data)
+SELECT low + bin * width AS bin_start, low + (bin + 1) * width AS bin_end, COUNT(*) AS count
+FROM (SELECT MIN(COALESCE(CAST(({{column}} - low) / NULLIF(width, 0) AS INTEGER), 0), {HISTOGRAM_BINS - 1}) AS bin,
+             low, width FROM audio_data, r)
+GROUP BY bin ORDER BY bin
+'''
+
+# Only events newer than the last one the page has seen; written by pipeline_progress.py
+PROGRESS_DELTA_SQL = '''
+SELECT id, run_id, stage, event, ts, items, bytes, audio_seconds FROM pipeline_progress
+WHERE id > ? ORDER BY id LIMIT 5000
+'''
+# Where a fresh page starts reading: just before the first event of the latest run
+PROGRESS_START_SQL = '''
+SELECT COALESCE(MIN(id) - 1, 0) FROM pipeline_progress
+WHERE run_id = (SELECT run_id FROM pipeline_progress ORDER BY id DESC LIMIT 1)
+'''
+
+# --- Cached Queries ---
+_query_cache = {}
+
+def db_version():
+    """Modification times of the database and its WAL file; they change whenever process_data.py commits."""
+    version = []
+    for path in (DB_PATH, DB_PATH + "-wal"):
+        try:
+            version.append(os.stat(path).st_mtime_ns)
+        except FileNotFoundError:
+            version.append(None)
+    return tuple(version)
+
+def cached_query(sql):
+    """Runs a query read-only, reusing the result until QUERY_TTL_SECONDS pass or the database changes."""
+    version = db_version()
+    hit = _query_cache.get(sql)
+    if hit and hit[0] == version and time.monotonic() - hit[1] < QUERY_TTL_SECONDS:
+        return hit[2]
+    conn = sqlite3.connect(f"file:{DB_PATH}?mode=ro", uri=True)
     try:
-        conn = sqlite3.connect(DB_PATH)
-        df = pd.read_sql_query("SELECT * FROM audio_data", conn)
-        summary = pd.read_sql_query("SELECT * FROM summary_statistics", conn)
+        result = pd.read_sql_query(sql, conn)
+    finally:
         conn.close()
-        return df, summary
+    _query_cache[sql] = (version, time.monotonic(), result)
+    return result
+
+# --- Load Data ---
+def load_summary():
+    """Loads the single summary row from the SQLite database."""
+    try:
+        summary = cached_query(SUMMARY_SQL)
+    except (sqlite3.OperationalError, pd.io.sql.DatabaseError) as e:
+        print(f"Database error: {e}. Returning empty dataframes.")
+        summary = pd.DataFrame(columns=SUMMARY_COLUMNS)
+    if not summary.empty:
+        return summary.iloc[0].to_dict()
+    return {
+        "total_duration": 0, "total_utterances": 0, "vocabulary_size": 0, "alphabet_size": 0, "alphabet": ""
+    }
+
+def load_histogram(column):
+    """Pre-binned (bin_start, bin_end, count) rows for one audio_data column."""
+    try:
+        try:
+            return cached_query(HISTOGRAM_SQL.format(column=column))
+        except pd.io.sql.DatabaseError:
+            return cached_query(HISTOGRAM_FALLBACK_SQL.format(column=column))
     except (sqlite3.OperationalError, pd.io.sql.DatabaseError) as e:
         print(f"Database error: {e}. Returning empty dataframes.")
-        return pd.DataFrame(), pd.DataFrame(columns=[
-            "total_duration", "total_utterances", "vocabulary_size", "alphabet_size", "alphabet"
-        ])
+        return pd.DataFrame(columns=["bin_start", "bin_end", "count"])
 
-df, summary = load_data()
+def load_progress_events(last_id):
+    """Pipeline events after last_id (the latest run's first event when last_id is None), uncached."""
+    try:
+        conn = sqlite3.connect(f"file:{PROGRESS_DB_PATH}?mode=ro", uri=True)
+        try:
+            if last_id is None:
+                last_id = conn.execute(PROGRESS_START_SQL).fetchone()[0]
+            return conn.execute(PROGRESS_DELTA_SQL, (last_id,)).fetchall()
+        finally:
+            conn.close()
+    except sqlite3.OperationalError:
+        # No database or no pipeline_progress table yet
+        return []
+
+def fold_progress(state, events):
+    """Adds new events to the per-stage totals of the current run; a new run starts from zero."""
+    state = state or {"last_id": None, "run_id": None, "stages": {}}
+    for event_id, run_id, stage, event, ts, items, nbytes, audio_seconds in events:
+        if run_id != state["run_id"]:
+            state["run_id"], state["stages"] = run_id, {}
+        s = state["stages"].setdefault(stage, {
+            "total": 0, "done": 0, "failures": 0, "bytes": 0, "audio_seconds": 0.0,
+            "started": ts, "last": ts, "running": True
+        })
+        s["last"] = ts
+        if event == "start":
+            s["total"] += items
+            s["running"] = True
+        elif event == "item":
+            s["done"] += items
+            s["bytes"] += nbytes
+            s["audio_seconds"] += audio_seconds
+        elif event == "fail":
+            s["failures"] += items
+        elif event == "finish":
+            s["running"] = False
+        state["last_id"] = event_id
+    return state
 
 # --- Initialize Dash App ---
 app = dash.Dash(__name__, external_stylesheets=[dbc.themes.DARKLY])
@@ -41,11 +148,11 @@ def create_metric_card(title, value, unit=""):
         dbc.Card(
             dbc.CardBody([
                 html.H5(title, className="card-title", style={"color": ACCENT_PINK, "fontSize": "1rem"}),
-                html.H3(f"{value:,.2f}{unit}" if isinstance(value, float) else f"{value:,}{unit}", 
+                html.H3(f"{value:,.2f}{unit}" if isinstance(value, float) else f"{value:,}{unit}",
                         style={"color": PRIMARY_RED, "fontWeight": "bold"})
             ]),
             style={
-                "backgroundColor": CARD_BACKGROUND, 
+                "backgroundColor": CARD_BACKGROUND,
                 "border": f"1px solid {PRIMARY_RED}",
                 "color": TEXT_LIGHT
             },
@@ -54,35 +161,18 @@ def create_metric_card(title, value, unit=""):
         lg=3, md=6
     )
 
-# --- Prepare Data for Display ---
-if not summary.empty:
-    summary_data = summary.iloc[0].to_dict()
-else:
-    summary_data = {
-        "total_duration": 0, "total_utterances": 0, "vocabulary_size": 0, "alphabet_size": 0, "alphabet": ""
-    }
-
-# --- Card Creation ---
-metric_cards_1 = [
-    create_metric_card("Total Duration (s)", summary_data["total_duration"]),
-    create_metric_card("Total Utterances", summary_data["total_utterances"]),
-    create_metric_card("Vocabulary Size", summary_data["vocabulary_size"]),
-    create_metric_card("Alphabet Size", summary_data["alphabet_size"]),
-]
-
-alphabet_card = None
-if not summary.empty and "alphabet" in summary.columns:
-    raw_alphabet = summary_data["alphabet"]
+def create_alphabet_card(raw_alphabet):
+    """Creates the full-width card listing every character of the alphabet."""
     formatted_alphabet = f"[{', '.join([repr(char) for char in raw_alphabet])}]"
-    alphabet_card = dbc.Col(
+    return dbc.Col(
         dbc.Card(
             dbc.CardBody([
                 html.H6("Alphabet", className="card-title", style={"color": ACCENT_PINK}),
                 html.Div(
-                    formatted_alphabet, 
+                    formatted_alphabet,
                     style={
-                        "color": TEXT_LIGHT, 
-                        "fontSize": "1.2rem", 
+                        "color": TEXT_LIGHT,
+                        "fontSize": "1.2rem",
                         "wordBreak": "break-all",
                         "fontFamily": "monospace"
                     }
@@ -100,69 +190,147 @@ hist_titles = {
     "num_characters": "Number of Characters per Audio File",
     "num_words": "Number of Words per Audio File"
 }
-charts = []
-for col, title in hist_titles.items():
-    if col in df.columns:
-        fig = px.histogram(
-            df, x=col, nbins=30, color_discrete_sequence=[PRIMARY_RED]
-        )
-        # ⭐️ THIS IS THE UPDATED SECTION ⭐️
-        fig.update_layout(
-            # --- Title Styling ---
-            title=dict(
-                text=f"<b>{title}</b>", # Using <b> tag for bold text
-                font=dict(size=18, color=ACCENT_PINK), # Increased size
-                x=0.5 # Center the title
-            ),
-            # --- General Layout Styling ---
-            plot_bgcolor="rgba(0,0,0,0)",
-            paper_bgcolor="rgba(0,0,0,0)",
-            font_color=TEXT_LIGHT,
-            # --- X-Axis Styling ---
-            xaxis=dict(
-                showgrid=False,
-                linecolor=PRIMARY_RED,
-                title_font=dict(size=14), # Increased axis title size
-                tickfont=dict(size=12)  # Increased tick label size
-            ),
-            # --- Y-Axis Styling ---
-            yaxis=dict(
-                showgrid=False,
-                linecolor=PRIMARY_RED,
-                title_font=dict(size=14), # Increased axis title size
-                tickfont=dict(size=12)  # Increased tick label size
-            ),
-            # --- Margin and Height ---
-            margin=dict(l=40, r=20, t=50, b=40), # Adjusted margins for new font sizes
-            height=320 # Increased height slightly
-        )
-        charts.append(
-            dbc.Col(
-                dbc.Card(
-                    dbc.CardBody(dcc.Graph(figure=fig, config={"displayModeBar": False})),
-                    style={
-                        "backgroundColor": CARD_BACKGROUND, 
-                        "border": f"1px solid {PRIMARY_RED}"
-                    },
-                    className="shadow-lg m-1"
-                ), 
-                md=4
-            )
-        )
+
+def create_histogram(col, title, bins):
+    """Bar chart of pre-binned counts, styled like the rest of the dashboard."""
+    fig = go.Figure(go.Bar(
+        x=(bins["bin_start"] + bins["bin_end"]) / 2,
+        y=bins["count"],
+        width=bins["bin_end"] - bins["bin_start"],
+        marker_color=PRIMARY_RED
+    ))
+    fig.update_layout(
+        # --- Title Styling ---
+        title=dict(
+            text=f"<b>{title}</b>", # Using <b> tag for bold text
+            font=dict(size=18, color=ACCENT_PINK), # Increased size
+            x=0.5 # Center the title
+        ),
+        # --- General Layout Styling ---
+        plot_bgcolor="rgba(0,0,0,0)",
+        paper_bgcolor="rgba(0,0,0,0)",
+        font_color=TEXT_LIGHT,
+        # --- X-Axis Styling ---
+        xaxis=dict(
+            title=col,
+            showgrid=False,
+            linecolor=PRIMARY_RED,
+            title_font=dict(size=14), # Increased axis title size
+            tickfont=dict(size=12)  # Increased tick label size
+        ),
+        # --- Y-Axis Styling ---
+        yaxis=dict(
+            title="count",
+            showgrid=False,
+            linecolor=PRIMARY_RED,
+            title_font=dict(size=14), # Increased axis title size
+            tickfont=dict(size=12)  # Increased tick label size
+        ),
+        # --- Margin and Height ---
+        margin=dict(l=40, r=20, t=50, b=40), # Adjusted margins for new font sizes
+        height=320 # Increased height slightly
+    )
+    return dbc.Col(
+        dbc.Card(
+            dbc.CardBody(dcc.Graph(figure=fig, config={"displayModeBar": False})),
+            style={
+                "backgroundColor": CARD_BACKGROUND,
+                "border": f"1px solid {PRIMARY_RED}"
+            },
+            className="shadow-lg m-1"
+        ),
+        md=4
+    )
+
+def create_progress_table(state):
+    """Per-stage progress and throughput (files/s, MB/s, audio hours/s, failures) of the latest run."""
+    stages = (state or {}).get("stages", {})
+    if not stages:
+        return html.Div("No pipeline run recorded yet.", style={"color": TEXT_LIGHT})
+    now = time.time()
+    header = html.Thead(html.Tr([html.Th(h, style={"color": ACCENT_PINK}) for h in (
+        "Stage", "Status", "Done", "Failed", "Files/s", "MB/s", "Audio h/s", "Last event"
+    )]))
+    rows = []
+    for name, s in stages.items():
+        elapsed = max((now if s["running"] else s["last"]) - s["started"], 1e-9)
+        idle = now - s["last"]
+        status = "stalled" if s["running"] and idle > STALL_SECONDS else ("running" if s["running"] else "done")
+        rows.append(html.Tr([
+            html.Td(name),
+            html.Td(status, style={"color": PRIMARY_RED if status == "stalled" or s["failures"] else TEXT_LIGHT}),
+            html.Td(f"{s['done']:,}/{s['total']:,}"),
+            html.Td(f"{s['failures']:,}"),
+            html.Td(f"{s['done'] / elapsed:,.2f}"),
+            html.Td(f"{s['bytes'] / 1e6 / elapsed:,.2f}"),
+            html.Td(f"{s['audio_seconds'] / 3600 / elapsed:,.4f}"),
+            html.Td(f"{idle:,.0f}s ago"),
+        ]))
+    return dbc.Table([header, html.Tbody(rows)], bordered=False, hover=True, size="sm",
+                     style={"color": TEXT_LIGHT, "backgroundColor": CARD_BACKGROUND})
 
 # --- App Layout ---
-app.layout = dbc.Container(
-    fluid=True,
-    style={"backgroundColor": BACKGROUND_DARK, "minHeight": "100vh", "padding": "15px"},
-    children=[
-        html.H2("Speech Dataset Overview", className="text-center my-3", style={"color": PRIMARY_RED, "fontWeight": "bold"}),
-        dbc.Row(metric_cards_1, className="mb-3"),
-        dbc.Row([alphabet_card] if alphabet_card else [], className="mb-3"),
-        dbc.Row(charts),
+# The layout is only a skeleton; the callback below fills it from the database
+# when a page loads, so nothing is queried at import time.
+def serve_layout():
+    return dbc.Container(
+        fluid=True,
+        style={"backgroundColor": BACKGROUND_DARK, "minHeight": "100vh", "padding": "15px"},
+        children=[
+            dcc.Location(id="url"),
+            html.H2("Speech Dataset Overview", className="text-center my-3", style={"color": PRIMARY_RED, "fontWeight": "bold"}),
+            dbc.Row(id="metric-cards", className="mb-3"),
+            dbc.Row(id="alphabet-row", className="mb-3"),
+            dbc.Row(id="charts"),
+            html.H4("Pipeline Progress", className="my-3", style={"color": PRIMARY_RED, "fontWeight": "bold"}),
+            dbc.Card(
+                dbc.CardBody(html.Div(id="progress-table")),
+                style={"backgroundColor": CARD_BACKGROUND, "border": f"1px solid {PRIMARY_RED}"},
+                className="shadow-lg m-1"
+            ),
+            dcc.Interval(id="progress-interval", interval=PROGRESS_POLL_MS),
+            dcc.Store(id="progress-state"),
+        ]
+    )
+
+app.layout = serve_layout
+
+@app.callback(
+    Output("metric-cards", "children"),
+    Output("alphabet-row", "children"),
+    Output("charts", "children"),
+    Input("url", "pathname"),
+)
+def load_dashboard(_):
+    """Fills the cards and charts from (cached) summary and histogram queries."""
+    summary_data = load_summary()
+    metric_cards_1 = [
+        create_metric_card("Total Duration (s)", summary_data["total_duration"]),
+        create_metric_card("Total Utterances", summary_data["total_utterances"]),
+        create_metric_card("Vocabulary Size", summary_data["vocabulary_size"]),
+        create_metric_card("Alphabet Size", summary_data["alphabet_size"]),
     ]
+    alphabet_card = [create_alphabet_card(summary_data["alphabet"])] if summary_data["alphabet"] else []
+    charts = []
+    for col, title in hist_titles.items():
+        bins = load_histogram(col)
+        if not bins.empty:
+            charts.append(create_histogram(col, title, bins))
+    return metric_cards_1, alphabet_card, charts
+
+@app.callback(
+    Output("progress-table", "children"),
+    Output("progress-state", "data"),
+    Input("progress-interval", "n_intervals"),
+    State("progress-state", "data"),
 )
+def refresh_progress(_, state):
+    """Polls only the events added since the last tick and re-renders the pipeline panel."""
+    state = state or {"last_id": None, "run_id": None, "stages": {}}
+    state = fold_progress(state, load_progress_events(state["last_id"]))
+    return create_progress_table(state), state
 
 # --- This is the critical block that was missing ---
 # It tells Python to start the web server when the script is executed.
 if __name__ == "__main__":
-    app.run(debug=True)
\ No newline at end of file
+    app.run(debug=True)
@@ -0,0 +1,264 @@
+"""
+Edit distances and error counts for WER/CER.
+
+Both sequences are encoded to integer token IDs over a shared vocabulary, then:
+  - edit_distance uses the bit-parallel Myers/Hyyrö algorithm. The longer
+    sequence becomes a bit vector held in one Python int, so each token of the
+    shorter one costs a handful of big-int operations instead of a Python loop
+    over the other sequence. With max_distance the scan stops as soon as the
+    result is known to exceed the cutoff.
+  - align_counts runs the DP one row at a time in NumPy (the left-neighbour
+    dependency is solved with a running minimum) and carries substitution,
+    deletion and insertion counts along, so memory stays O(len(hyp)).
+
+Results equal levenshtein_legacy, the pure-Python DP process_data.py used before.
+
+Usage:
+    python 06_dashboard/error_metrics.py train_manifest.jsonl --benchmark 20
+"""
+
+import json
+import itertools
+import time
+import random
+import argparse
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+
+ERROR_WORKERS = 4
+ERROR_CHUNK = 64
+BENCHMARK_MAX_CHARS = 3000  # legacy DP cost grows with the square of this
+
+
+def levenshtein_legacy(s1, s2):
+    """Reference O(n·m) pure-Python Levenshtein distance, kept for verification."""
+    if len(s1) < len(s2):
+        return levenshtein_legacy(s2, s1)
+    if len(s2) == 0:
+        return len(s1)
+    previous_row = range(len(s2) + 1)
+    for i, c1 in enumerate(s1):
+        current_row = [i + 1]
+        for j, c2 in enumerate(s2):
+            insertions = previous_row[j + 1] + 1
+            deletions = current_row[j] + 1
+            substitutions = previous_row[j] + (c1 != c2)
+            current_row.append(min(insertions, deletions, substitutions))
+        previous_row = current_row
+    return previous_row[-1]
+
+
+def encode_tokens(*sequences):
+    """Integer ID arrays for sequences of hashable tokens (words or characters), over one shared vocabulary."""
+    vocab = {}
+    return [np.fromiter((vocab.setdefault(t, len(vocab)) for t in seq), dtype=np.int64, count=len(seq))
+            for seq in sequences]
+
+
+def _match_masks(pattern, text):
+    """Bit mask of pattern positions per token ID, for the tokens that occur in text."""
+    masks = {}
+    for token in np.intersect1d(pattern, text):
+        bits = np.packbits(pattern == token, bitorder="little")
+        masks[int(token)] = int.from_bytes(bits.tobytes(), "little")
+    return masks
+
+
+def myers_distance(pattern, text, max_distance=None):
+    """
+    Levenshtein distance between two integer ID arrays (Hyyrö's formulation of
+    Myers' bit-vector algorithm). Returns max_distance + 1 once the distance is
+    certain to exceed max_distance.
+    """
+    m, n = len(pattern), len(text)
+    if max_distance is not None and abs(m - n) > max_distance:
+        return max_distance + 1
+    if m == 0 or n == 0:
+        return max(m, n)
+
+    masks = _match_masks(pattern, text)
+    full = (1 << m) - 1
+    high = 1 << (m - 1)
+    pv, mv, score = full, 0, m
+    for j, token in enumerate(text.tolist()):
+        eq = masks.get(token, 0)
+        xv = eq | mv
+        xh = ((((eq & pv) + pv) & full) ^ pv) | eq
+        ph = mv | (~(xh | pv) & full)
+        mh = pv & xh
+        if ph & high:
+            score += 1
+        elif mh & high:
+            score -= 1
+        # Every remaining text token can lower the score by at most one
+        if max_distance is not None and score - (n - j - 1) > max_distance:
+            return max_distance + 1
+        ph = ((ph << 1) | 1) & full
+        mh = (mh << 1) & full
+        pv = mh | (~(xv | ph) & full)
+        mv = ph & xv
+    return score
+
+
+def edit_distance(ref, hyp, max_distance=None):
+    """Levenshtein distance between two token sequences (lists of words, strings of characters)."""
+    a, b = encode_tokens(ref, hyp)
+    # The loop runs over the shorter sequence; the longer one is the bit vector
+    if len(a) < len(b):
+        a, b = b, a
+    return myers_distance(a, b, max_distance)
+
+
+def align_counts(ref, hyp):
+    """
+    Substitutions, deletions, insertions and hits of one minimum-cost alignment
+    of hyp against ref. S + D + I always equals edit_distance(ref, hyp).
+    """
+    a, b = encode_tokens(ref, hyp)
+    n = len(b)
+    if len(a) == 0 or n == 0:
+        return {"distance": len(a) + n, "substitutions": 0, "deletions": len(a), "insertions": n, "hits": 0}
+    cols = np.arange(n + 1)
+    cost = cols.copy()
+    subs = np.zeros(n + 1, dtype=np.int64)
+    dels = np.zeros(n + 1, dtype=np.int64)
+    ins = cols.copy()
+    for token in a.tolist():
+        diag = cost[:-1] + (b != token)
+        up = cost[1:] + 1
+        take_diag = diag <= up
+        new_cost = np.empty_like(cost)
+        new_cost[0] = cost[0] + 1
+        new_cost[1:] = np.where(take_diag, diag, up)
+        new_subs = np.concatenate(([subs[0]], np.where(take_diag, subs[:-1] + (b != token), subs[1:])))
+        new_dels = np.concatenate(([dels[0] + 1], np.where(take_diag, dels[:-1], dels[1:] + 1)))
+        new_ins = np.concatenate(([ins[0]], np.where(take_diag, ins[:-1], ins[1:])))
+
+        # Insertions from the left: cost[j] = min over k <= j of new_cost[k] + (j - k)
+        shifted = new_cost - cols
+        running = np.minimum.accumulate(shifted)
+        source = np.maximum.accumulate(np.where(shifted == running, cols, 0))
+        cost = running + cols
+        subs, dels = new_subs[source], new_dels[source]
+        ins = new_ins[source] + (cols - source)
+
+    d = int(cost[-1])
+    s, dl, i = int(subs[-1]), int(dels[-1]), int(ins[-1])
+    return {"distance": d, "substitutions": s, "deletions": dl, "insertions": i, "hits": len(a) - s - dl}
+
+
+def utterance_errors(ref_text, pred_text):
+    """Word alignment counts and character distance for one utterance."""
+    words = align_counts(ref_text.split(), pred_text.split())
+    return {
+        "word_errors": words["distance"], "substitutions": words["substitutions"],
+        "deletions": words["deletions"], "insertions": words["insertions"],
+        "char_errors": edit_distance(ref_text, pred_text),
+    }
+
+
+def _utterance_errors(pair):
+    return utterance_errors(*pair)
+
+
+def iter_errors(pairs, workers=ERROR_WORKERS, chunk_size=ERROR_CHUNK, pool=None):
+    """
+    utterance_errors for an iterable of (ref_text, pred_text) pairs, in order.
+    With workers > 1 one process pool handles chunk_size pairs at a time, so
+    only a chunk of transcripts is held in memory. Pass a running pool to
+    reuse it across calls (as process_manifest does for its batches).
+    """
+    pairs = iter(pairs)
+    if pool is not None:
+        yield from _map_chunks(pool, pairs, chunk_size)
+        return
+    if workers <= 1:
+        for ref, pred in pairs:
+            yield utterance_errors(ref, pred)
+        return
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        yield from _map_chunks(pool, pairs, chunk_size)
+
+
+def _map_chunks(pool, pairs, chunk_size):
+    while True:
+        chunk = list(itertools.islice(pairs, chunk_size))
+        if not chunk:
+            break
+        yield from pool.map(_utterance_errors, chunk)
+
+
+def corrupt_text(text, rate, rng):
+    """A synthetic prediction: text with roughly rate of its characters substituted, dropped or inserted."""
+    letters = "abcdefghijklmnopqrstuvwxyz "
+    out = []
+    for c in text:
+        r = rng.random()
+        if r < rate / 3:
+            out.append(rng.choice(letters))
+        elif r < 2 * rate / 3:
+            continue
+        elif r < rate:
+            out.extend((c, rng.choice(letters)))
+        else:
+            out.append(c)
+    return "".join(out)
+
+
+def benchmark_errors(rows, n=20, max_chars=BENCHMARK_MAX_CHARS, rate=0.1, workers=ERROR_WORKERS, seed=0):
+    """
+    Check edit_distance and align_counts against levenshtein_legacy and time
+    them. Rows without a pred_text get a seeded synthetic one; the legacy DP
+    only sees the first max_chars characters, the new engine also runs on whole
+    lectures.
+    """
+    rng = random.Random(seed)
+    sample = rng.sample(rows, min(n, len(rows)))
+    pairs = [(row["text"], row.get("pred_text") or corrupt_text(row["text"], rate, rng)) for row in sample]
+    clipped = [(ref[:max_chars], pred[:max_chars]) for ref, pred in pairs]
+
+    mismatches = 0
+    legacy_time = new_time = 0.0
+    for ref, pred in clipped:
+        for a, b in ((ref.split(), pred.split()), (list(ref), list(pred))):
+            start = time.perf_counter()
+            expected = levenshtein_legacy(a, b)
+            legacy_time += time.perf_counter() - start
+            start = time.perf_counter()
+            got = edit_distance(a, b)
+            new_time += time.perf_counter() - start
+            mismatches += got != expected or align_counts(a, b)["distance"] != expected
+    print(f"⏱️ Clipped to {max_chars} chars: legacy {legacy_time:.2f}s, bit-parallel {new_time:.3f}s "
+          f"({legacy_time / new_time if new_time else float('inf'):.0f}x) over {len(clipped)} utterances")
+    # The manifest as it is (empty pred_text falls back to the length of the reference)
+    for row in rows:
+        ref, pred = row["text"], row.get("pred_text", "")
+        if len(ref) * len(pred) <= max_chars ** 2:
+            mismatches += edit_distance(list(ref), list(pred)) != levenshtein_legacy(list(ref), list(pred))
+            mismatches += edit_distance(ref.split(), pred.split()) != levenshtein_legacy(ref.split(), pred.split())
+
+    start = time.perf_counter()
+    for ref, pred in pairs:
+        utterance_errors(ref, pred)
+    serial_time = time.perf_counter() - start
+    start = time.perf_counter()
+    list(iter_errors(pairs, workers))
+    parallel_time = time.perf_counter() - start
+    chars = sum(len(ref) for ref, _ in pairs)
+    print(f"⏱️ Full utterances ({chars / len(pairs):.0f} chars avg): {serial_time:.2f}s serial, "
+          f"{parallel_time:.2f}s with {workers} workers")
+    print("✅ Identical to the legacy DP" if not mismatches else f"❌ {mismatches} distances differ from the legacy DP")
+    return mismatches == 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="WER/CER edit distances and alignment counts.")
+    parser.add_argument("manifest", nargs="?", default="train_manifest.jsonl", help="Manifest with text/pred_text rows")
+    parser.add_argument("--benchmark", type=int, default=20, metavar="N", help="Utterances to verify and time")
+    parser.add_argument("--max_chars", type=int, default=BENCHMARK_MAX_CHARS, help="Prefix length given to the legacy DP")
+    parser.add_argument("--workers", type=int, default=ERROR_WORKERS, help="Processes for the parallel timing")
+    args = parser.parse_args()
+
+    with open(args.manifest, "r", encoding="utf-8") as f:
+        manifest_rows = [json.loads(line) for line in f if line.strip()]
+    benchmark_errors(manifest_rows, args.benchmark, args.max_chars, workers=args.workers)
@@ -1,110 +1,234 @@
 import sqlite3
+import hashlib
 import json
 import os
+import argparse
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+
+from error_metrics import ERROR_WORKERS, edit_distance, iter_errors
 
 # --- Configuration ---
 # Path to your raw data file
-INPUT_FILE = '../train_manifest.jsonl' 
+INPUT_FILE = '../train_manifest.jsonl'
 # Path where the database will be created/updated
 DB_FILE = 'dashboard_data.db'
+# Manifest rows read, compared and committed at a time
+INGEST_BATCH = 500
+# Bins per pre-computed dashboard histogram
+HISTOGRAM_BINS = 30
+HISTOGRAM_COLUMNS = ("duration", "num_words", "num_characters")
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS audio_data (
+    audio_filepath TEXT NOT NULL,
+    offset REAL NOT NULL DEFAULT 0,
+    duration REAL,
+    num_words INTEGER,
+    num_characters INTEGER,
+    word_errors INTEGER,
+    char_errors INTEGER,
+    word_substitutions INTEGER,
+    word_deletions INTEGER,
+    word_insertions INTEGER,
+    text TEXT,
+    content_hash TEXT,
+    PRIMARY KEY (audio_filepath, offset)
+);
+CREATE INDEX IF NOT EXISTS idx_audio_data_duration ON audio_data (duration);
+CREATE TABLE IF NOT EXISTS vocabulary (
+    word TEXT PRIMARY KEY,
+    count INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS alphabet (
+    char TEXT PRIMARY KEY,
+    count INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS summary_statistics (
+    total_duration REAL,
+    total_utterances INTEGER,
+    vocabulary_size INTEGER,
+    alphabet_size INTEGER,
+    alphabet TEXT,
+    word_error_rate REAL,
+    character_error_rate REAL,
+    word_match_rate REAL,
+    mean_word_accuracy REAL,
+    word_substitutions INTEGER,
+    word_deletions INTEGER,
+    word_insertions INTEGER
+);
+CREATE TABLE IF NOT EXISTS histograms (
+    column_name TEXT NOT NULL,
+    bin INTEGER NOT NULL,
+    bin_start REAL,
+    bin_end REAL,
+    count INTEGER,
+    PRIMARY KEY (column_name, bin)
+);
+'''
 
 def levenshtein_distance(s1, s2):
     """
     Calculates the Levenshtein distance between two sequences (e.g., words or characters).
     This distance is the minimum number of single-element edits (insertions, deletions, substitutions)
-    required to change s1 into s2.
+    required to change s1 into s2. Computed bit-parallel by error_metrics.edit_distance.
     """
-    if len(s1) < len(s2):
-        return levenshtein_distance(s2, s1)
-
-    if len(s2) == 0:
-        return len(s1)
-
-    previous_row = range(len(s2) + 1)
-    for i, c1 in enumerate(s1):
-        current_row = [i + 1]
-        for j, c2 in enumerate(s2):
-            insertions = previous_row[j + 1] + 1
-            deletions = current_row[j] + 1
-            substitutions = previous_row[j] + (c1 != c2)
-            current_row.append(min(insertions, deletions, substitutions))
-        previous_row = current_row
-    
-    return previous_row[-1]
-
-def process_manifest(input_file, db_file):
+    return edit_distance(s1, s2)
+
+def connect_db(db_file):
+    """Opens the dashboard database in WAL mode so the dashboard can read while it is being written."""
+    conn = sqlite3.connect(db_file)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    return conn
+
+def init_schema(conn, rebuild=False):
     """
-    Processes a .jsonl manifest file to extract audio data metrics,
-    calculates summary and error statistics, and saves everything to an SQLite database.
+    Creates the tables if missing. Databases written by the old drop-and-rebuild
+    version (no content_hash column) are rebuilt once, as is everything with rebuild=True.
     """
-    # --- Data Collection ---
-    total_duration = 0
-    total_utterances = 0
-    vocabulary = set()
-    alphabet = set()
-    audio_data_rows = []
-
-    # --- Variables for Error Calculation ---
-    total_word_errors = 0
-    total_ref_words = 0
-    total_char_errors = 0
-    total_ref_chars = 0
-    sum_of_word_accuracies = 0.0
+    columns = [row[1] for row in conn.execute("PRAGMA table_info(audio_data)")]
+    if rebuild or (columns and "content_hash" not in columns):
+        conn.executescript('''
+        DROP TABLE IF EXISTS audio_data;
+        DROP TABLE IF EXISTS vocabulary;
+        DROP TABLE IF EXISTS alphabet;
+        DROP TABLE IF EXISTS summary_statistics;
+        DROP TABLE IF EXISTS histograms;
+        ''')
+        print("Old tables dropped.")
+    conn.executescript(SCHEMA)
 
-    print(f"Starting to process {input_file}...")
-    
-    # Check if the input file exists
-    if not os.path.exists(input_file):
-        print(f"Error: Input file not found at '{input_file}'.")
-        print("Your project structure in the VS Code sidebar shows the file should be at this path.")
-        print("Please double-check the path and the directory you are running the script from.")
-        return
+def text_counts(text):
+    """Vocabulary (lowercased words) and alphabet (characters) counts of a reference text."""
+    return Counter(text.lower().split()), Counter(text)
+
+def apply_counts(cursor, table, column, counts):
+    """Adds (or, for negative counts, removes) occurrences in a counted table."""
+    cursor.executemany(f'''
+    INSERT INTO {table} ({column}, count) VALUES (?, ?)
+    ON CONFLICT({column}) DO UPDATE SET count = count + excluded.count
+    ''', [(key, n) for key, n in counts.items() if n])
 
-    # Read and process each line from the JSONL file
+def read_batches(input_file, batch_size=INGEST_BATCH):
+    """Streams the manifest as lists of (key, content_hash, row); a key repeated within a batch keeps its last row."""
+    batch = {}
     with open(input_file, 'r', encoding='utf-8') as f:
         for line in f:
-            data = json.loads(line.strip())
-            duration = data.get('duration', 0)
-            ref_text = data.get('text', '')
-            # IMPORTANT: Assumes a 'pred_text' field exists for the model's prediction
-            pred_text = data.get('pred_text', '')
-    
-            # Update overall stats
-            total_duration += duration
-            total_utterances += 1
-            vocabulary.update(ref_text.lower().split())
-            alphabet.update(char for char in ref_text)
-
-            # --- Calculate Errors for this Utterance ---
-            ref_words = ref_text.split()
-            pred_words = pred_text.split()
-            
-            word_errors = levenshtein_distance(ref_words, pred_words)
-            char_errors = levenshtein_distance(list(ref_text), list(pred_text))
-
-            num_ref_words = len(ref_words)
-            num_ref_chars = len(ref_text)
-            
-            # Accumulate totals
-            total_word_errors += word_errors
-            total_ref_words += num_ref_words
-            total_char_errors += char_errors
-            total_ref_chars += num_ref_chars
-
-            # Calculate accuracy for this specific utterance and add to sum
-            if num_ref_words > 0:
-                utterance_accuracy = (num_ref_words - word_errors) / num_ref_words
-                sum_of_word_accuracies += utterance_accuracy
-
-            # Append row for bulk insertion
-            audio_data_rows.append((
-                data.get('audio_filepath', ''), 
-                duration, 
-                len(ref_words), 
-                len(ref_text)
-            ))
+            line = line.strip()
+            if not line:
+                continue
+            data = json.loads(line)
+            key = (data.get('audio_filepath', ''), data.get('offset', 0.0) or 0.0)
+            batch[key] = (key, hashlib.sha256(line.encode('utf-8')).hexdigest(), data)
+            if len(batch) >= batch_size:
+                yield list(batch.values())
+                batch = {}
+    if batch:
+        yield list(batch.values())
 
-    print("File processing complete.")
+def ingest_batch(conn, batch, pool=None):
+    """
+    Upserts one batch of manifest rows; rows whose content hash is unchanged are skipped.
+    Edit distances run on pool (a ProcessPoolExecutor shared by all batches) if given. Returns (new, updated).
+    """
+    cursor = conn.cursor()
+    keys = [key for key, _, _ in batch]
+    cursor.executemany("INSERT OR IGNORE INTO seen_rows VALUES (?, ?)", keys)
+    cursor.execute("DELETE FROM batch_rows")
+    cursor.executemany("INSERT INTO batch_rows VALUES (?, ?)", keys)
+    stored = {}
+    for path, offset, content_hash, text in cursor.execute('''
+    SELECT a.audio_filepath, a.offset, a.content_hash, a.text
+    FROM batch_rows b JOIN audio_data a ON a.audio_filepath = b.audio_filepath AND a.offset = b.offset
+    '''):
+        stored[(path, offset)] = (content_hash, text)
+
+    changed = [(key, content_hash, data) for key, content_hash, data in batch
+               if stored.get(key, (None,))[0] != content_hash]
+    if not changed:
+        return 0, 0
+
+    words, chars = Counter(), Counter()
+    for key, _, _ in changed:
+        if key in stored:
+            old_words, old_chars = text_counts(stored[key][1])
+            words.subtract(old_words)
+            chars.subtract(old_chars)
+
+    rows = []
+    pairs = ((data.get('text', ''), data.get('pred_text', '')) for _, _, data in changed)
+    for (key, content_hash, data), errors in zip(changed, iter_errors(pairs, workers=1, pool=pool)):
+        ref_text = data.get('text', '')
+        new_words, new_chars = text_counts(ref_text)
+        words.update(new_words)
+        chars.update(new_chars)
+        rows.append((
+            key[0], key[1], data.get('duration', 0), len(ref_text.split()), len(ref_text),
+            errors["word_errors"], errors["char_errors"],
+            errors["substitutions"], errors["deletions"], errors["insertions"],
+            ref_text, content_hash
+        ))
+
+    cursor.executemany('''
+    INSERT INTO audio_data (
+        audio_filepath, offset, duration, num_words, num_characters, word_errors, char_errors,
+        word_substitutions, word_deletions, word_insertions, text, content_hash
+    )
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    ON CONFLICT(audio_filepath, offset) DO UPDATE SET
+        duration = excluded.duration, num_words = excluded.num_words,
+        num_characters = excluded.num_characters, word_errors = excluded.word_errors,
+        char_errors = excluded.char_errors, word_substitutions = excluded.word_substitutions,
+        word_deletions = excluded.word_deletions, word_insertions = excluded.word_insertions,
+        text = excluded.text, content_hash = excluded.content_hash
+    ''', rows)
+    apply_counts(cursor, "vocabulary", "word", words)
+    apply_counts(cursor, "alphabet", "char", chars)
+    updated = sum(key in stored for key, _, _ in changed)
+    return len(changed) - updated, updated
+
+def remove_unseen_rows(conn):
+    """Deletes rows that are no longer in the manifest and takes their text out of the counted tables."""
+    cursor = conn.cursor()
+    words, chars = Counter(), Counter()
+    removed = 0
+    for (text,) in cursor.execute('''
+    SELECT text FROM audio_data
+    WHERE NOT EXISTS (SELECT 1 FROM seen_rows s WHERE s.audio_filepath = audio_data.audio_filepath
+                      AND s.offset = audio_data.offset)
+    ''').fetchall():
+        old_words, old_chars = text_counts(text)
+        words.update(old_words)
+        chars.update(old_chars)
+        removed += 1
+    if removed:
+        cursor.execute('''
+        DELETE FROM audio_data
+        WHERE NOT EXISTS (SELECT 1 FROM seen_rows s WHERE s.audio_filepath = audio_data.audio_filepath
+                          AND s.offset = audio_data.offset)
+        ''')
+        apply_counts(cursor, "vocabulary", "word", {word: -n for word, n in words.items()})
+        apply_counts(cursor, "alphabet", "char", {c: -n for c, n in chars.items()})
+    cursor.execute("DELETE FROM vocabulary WHERE count <= 0")
+    cursor.execute("DELETE FROM alphabet WHERE count <= 0")
+    return removed
+
+def refresh_summary(conn):
+    """Recomputes the single summary_statistics row from SQL aggregates over the ingested tables."""
+    cursor = conn.cursor()
+    (total_duration, total_utterances, total_word_errors, total_ref_words, total_char_errors,
+     total_ref_chars, sum_of_word_accuracies, total_substitutions, total_deletions,
+     total_insertions) = cursor.execute('''
+    SELECT COALESCE(SUM(duration), 0), COUNT(*), COALESCE(SUM(word_errors), 0), COALESCE(SUM(num_words), 0),
+           COALESCE(SUM(char_errors), 0), COALESCE(SUM(num_characters), 0),
+           COALESCE(SUM(CASE WHEN num_words > 0 THEN (num_words - word_errors) * 1.0 / num_words END), 0),
+           COALESCE(SUM(word_substitutions), 0), COALESCE(SUM(word_deletions), 0), COALESCE(SUM(word_insertions), 0)
+    FROM audio_data
+    ''').fetchone()
+    vocabulary_size = cursor.execute("SELECT COUNT(*) FROM vocabulary").fetchone()[0]
+    alphabet = ''.join(c for (c,) in cursor.execute("SELECT char FROM alphabet ORDER BY char"))
 
     # --- Calculate Final Metrics ---
     wer = (total_word_errors / total_ref_words) * 100 if total_ref_words > 0 else 0
@@ -114,73 +238,106 @@ def process_manifest(input_file, db_file):
     # Mean Word Accuracy is the average of individual utterance accuracies.
     mean_word_accuracy = (sum_of_word_accuracies / total_utterances) * 100 if total_utterances > 0 else 0
 
+    summary = {
+        "total_duration": total_duration, "total_utterances": total_utterances,
+        "vocabulary_size": vocabulary_size, "alphabet_size": len(alphabet), "alphabet": alphabet,
+        "word_error_rate": wer, "character_error_rate": cer, "word_match_rate": wmr,
+        "mean_word_accuracy": mean_word_accuracy, "word_substitutions": total_substitutions,
+        "word_deletions": total_deletions, "word_insertions": total_insertions,
+    }
+    cursor.execute("DELETE FROM summary_statistics")
+    cursor.execute(f'''
+    INSERT INTO summary_statistics ({", ".join(summary)}) VALUES ({", ".join("?" for _ in summary)})
+    ''', list(summary.values()))
+    return summary
+
+def refresh_histograms(conn, bins=HISTOGRAM_BINS):
+    """
+    Materializes equal-width histograms of the dashboard columns with GROUP BY
+    queries, so the dashboard ships bins to the browser instead of raw rows.
+    """
+    cursor = conn.cursor()
+    cursor.execute("DELETE FROM histograms")
+    for column in HISTOGRAM_COLUMNS:
+        low, high = cursor.execute(f"SELECT MIN({column}), MAX({column}) FROM audio_data").fetchone()
+        if low is None:
+            continue
+        width = (high - low) / bins or 1.0
+        cursor.execute(f'''
+        INSERT INTO histograms (column_name, bin, bin_start, bin_end, count)
+        SELECT ?, bin, ? + bin * ?, ? + (bin + 1) * ?, COUNT(*)
+        FROM (SELECT MIN(CAST(({column} - ?) / ? AS INTEGER), ?) AS bin FROM audio_data)
+        GROUP BY bin
+        ''', (column, low, width, low, width, low, width, bins - 1))
+
+def process_manifest(input_file, db_file, workers=ERROR_WORKERS, rebuild=False, batch_size=INGEST_BATCH):
+    """
+    Streams a .jsonl manifest into the SQLite database in batches: rows are upserted
+    by (audio_filepath, offset) and skipped when their content hash is unchanged,
+    vocabulary and alphabet are kept as counted tables, rows gone from the manifest
+    are deleted, and the summary statistics and histograms are recomputed with SQL aggregates.
+    Each batch is its own transaction, so the dashboard can keep reading (WAL mode).
+    Edit distances are computed by error_metrics across `workers` processes,
+    in one pool started for the whole run.
+    """
+    print(f"Starting to process {input_file}...")
+
+    # Check if the input file exists
+    if not os.path.exists(input_file):
+        print(f"Error: Input file not found at '{input_file}'.")
+        print("Your project structure in the VS Code sidebar shows the file should be at this path.")
+        print("Please double-check the path and the directory you are running the script from.")
+        return
 
     # --- Database Interaction ---
     print(f"Connecting to database at {db_file}...")
-    conn = sqlite3.connect(db_file)
-    cursor = conn.cursor()
+    conn = connect_db(db_file)
+    init_schema(conn, rebuild)
+    # Keys seen in this run, and the keys of the batch being compared
+    conn.execute("CREATE TEMP TABLE seen_rows (audio_filepath TEXT, offset REAL, PRIMARY KEY (audio_filepath, offset))")
+    conn.execute("CREATE TEMP TABLE batch_rows (audio_filepath TEXT, offset REAL)")
 
-    # --- Create/Recreate Tables ---
-    cursor.execute("DROP TABLE IF EXISTS audio_data")
-    cursor.execute("DROP TABLE IF EXISTS summary_statistics")
-    print("Old tables dropped.")
-
-    cursor.execute('''
-    CREATE TABLE audio_data (
-        audio_filepath TEXT,
-        duration REAL,
-        num_words INTEGER,
-        num_characters INTEGER
-    )
-    ''')
-    cursor.execute('''
-    CREATE TABLE summary_statistics (
-        total_duration REAL,
-        total_utterances INTEGER,
-        vocabulary_size INTEGER,
-        alphabet_size INTEGER,
-        alphabet TEXT,
-        word_error_rate REAL,
-        character_error_rate REAL,
-        word_match_rate REAL,
-        mean_word_accuracy REAL
-    )
-    ''')
-    print("New tables created.")
+    # --- Ingest in committed batches ---
+    new = updated = unchanged = 0
+    pool = ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+    try:
+        for batch in read_batches(input_file, batch_size):
+            with conn:
+                n_new, n_updated = ingest_batch(conn, batch, pool)
+            new += n_new
+            updated += n_updated
+            unchanged += len(batch) - n_new - n_updated
+    finally:
+        if pool is not None:
+            pool.shutdown()
+    print("File processing complete.")
 
-    # --- Insert Data ---
-    cursor.executemany('''
-    INSERT INTO audio_data (audio_filepath, duration, num_words, num_characters)
-    VALUES (?, ?, ?, ?)
-    ''', audio_data_rows)
-    print(f"{len(audio_data_rows)} rows inserted into 'audio_data'.")
-
-    # Insert the single row of summary statistics with calculated values
-    cursor.execute('''
-    INSERT INTO summary_statistics (
-        total_duration, total_utterances, vocabulary_size, alphabet_size, alphabet,
-        word_error_rate, character_error_rate, word_match_rate, mean_word_accuracy
-    )
-    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-    ''', (
-        total_duration, total_utterances, len(vocabulary), len(alphabet), 
-        ''.join(sorted(list(alphabet))), 
-        wer, cer, wmr, mean_word_accuracy
-    ))
-    print("Summary statistics inserted.")
-
-    conn.commit()
+    with conn:
+        removed = remove_unseen_rows(conn)
+        summary = refresh_summary(conn)
+        refresh_histograms(conn)
     conn.close()
+    print(f"{new} rows inserted, {updated} updated, {unchanged} unchanged, {removed} removed in 'audio_data'.")
+    print("Summary statistics and histograms updated.")
 
     # --- Final Summary ---
     print("\n--- Summary ---")
-    print(f"✅ Total Duration: {total_duration:.2f} seconds")
-    print(f"✅ Total Utterances: {total_utterances}")
-    print(f"✅ Vocabulary Size: {len(vocabulary)}")
-    print(f"✅ Alphabet Size: {len(alphabet)}")
-    print(f"✅ Alphabet: {''.join(sorted(alphabet))}")
+    print(f"✅ Total Duration: {summary['total_duration']:.2f} seconds")
+    print(f"✅ Total Utterances: {summary['total_utterances']}")
+    print(f"✅ Vocabulary Size: {summary['vocabulary_size']}")
+    print(f"✅ Alphabet Size: {summary['alphabet_size']}")
+    print(f"✅ Alphabet: {summary['alphabet']}")
+    print(f"✅ WER: {summary['word_error_rate']:.2f}% (S={summary['word_substitutions']}, "
+          f"D={summary['word_deletions']}, I={summary['word_insertions']}), CER: {summary['character_error_rate']:.2f}%")
     print(f"✅ Data saved to SQLite database: {db_file}")
+    return summary
 
 if __name__ == "__main__":
-    process_manifest(INPUT_FILE, DB_FILE)
-
+    parser = argparse.ArgumentParser(description="Compute dataset and error statistics into the dashboard database.")
+    parser.add_argument("--input", default=INPUT_FILE, help="Manifest to analyze")
+    parser.add_argument("--db", default=DB_FILE, help="SQLite database to write")
+    parser.add_argument("--workers", type=int, default=ERROR_WORKERS, help="Processes computing edit distances")
+    parser.add_argument("--batch_size", type=int, default=INGEST_BATCH, help="Manifest rows per committed batch")
+    parser.add_argument("--rebuild", action="store_true", help="Drop all tables and ingest from scratch")
+    args = parser.parse_args()
+    process_manifest(args.input, args.db, args.workers, args.rebuild, args.batch_size)
@@ -0,0 +1,92 @@
+"""
+Startup cost of main.py, measured with `python -X importtime`.
+
+For every subcommand this reports:
+  - CLI startup: wall time and total import time of `main.py <command> --help`
+    (argument parsing only; no stage module is imported);
+  - stage imports: the import time of the modules that command's stage
+    functions import before doing any work, net of a bare interpreter's own
+    startup imports (site, encodings, ...).
+
+The target is under 200 ms of CLI startup for every command, and under 200 ms
+of stage imports for the commands that do not process audio.
+
+Usage:
+    python benchmark_startup.py [--repeat 5]
+"""
+
+import os
+import sys
+import time
+import argparse
+import subprocess
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+STAGE_DIRS = ["01_scraper", "02_downloader", "03_audio_preprocessor", "04_text_preprocessor",
+              "05_train_manifest", "06_dashboard"]
+# What each stage function in main.py imports
+STAGE_MODULES = {
+    "scrape": ["scrape_data", "scrape_transcripts", "scrape_api", "scrape_batch", "pipeline_state"],
+    "download": ["download_data", "lesson_index", "pipeline_state"],
+    "audio": ["audio_pipeline", "convert_audio", "pipeline_state"],
+    "text": ["preprocess_transcript", "pipeline_state"],
+    "manifest": ["create_manifest", "segment_manifest", "export_shards", "convert_audio", "pipeline_state"],
+    "dashboard": ["process_data", "pipeline_state"],
+}
+AUDIO_COMMANDS = {"audio"}
+TARGET_MS = 200
+
+
+def import_time_ms(stderr):
+    """Total of the top-level cumulative times in -X importtime output, in ms."""
+    total = 0
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        if not name[1:].startswith(" "):  # nested imports are indented
+            total += int(cumulative)
+    return total / 1000
+
+
+def run(cmd, repeat):
+    """Best-of-repeat (wall ms, import ms) of a Python command line."""
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = subprocess.run([sys.executable, "-X", "importtime"] + cmd, cwd=ROOT,
+                                capture_output=True, text=True)
+        wall = (time.perf_counter() - start) * 1000
+        if result.returncode != 0:
+            raise RuntimeError(f"{' '.join(cmd)} failed:\n{result.stderr[-2000:]}")
+        sample = (wall, import_time_ms(result.stderr))
+        best = sample if best is None or sample[0] < best[0] else best
+    return best
+
+
+def benchmark_startup(repeat=5):
+    baseline = run(["-c", "pass"], repeat)[1]
+    print(f"Interpreter startup imports: {baseline:.0f} ms (subtracted from stage imports)\n")
+    print(f"{'command':<11}{'--help wall':>13}{'imports':>10}{'stage imports':>16}  target")
+    rows = []
+    path_setup = "import sys; sys.path[:0] = " + repr(STAGE_DIRS + ["."]) + "; "
+    for command in ("(none)",) + tuple(STAGE_MODULES) + ("all",):
+        help_cmd = ["main.py", "--help"] if command == "(none)" else ["main.py", command, "--help"]
+        wall, imports = run(help_cmd, repeat)
+        modules = STAGE_MODULES.get(command, [])
+        if command == "all":
+            modules = sorted({m for ms in STAGE_MODULES.values() for m in ms})
+        stage_ms = 0.0
+        if modules:
+            stage_ms = max(0.0, run(["-c", path_setup + "; ".join(f"import {m}" for m in modules)], repeat)[1] - baseline)
+        ok = wall < TARGET_MS and (command in AUDIO_COMMANDS or command == "all" or stage_ms < TARGET_MS)
+        rows.append({"command": command, "help_wall_ms": wall, "help_import_ms": imports, "stage_import_ms": stage_ms})
+        print(f"{command:<11}{wall:>10.0f} ms{imports:>7.0f} ms{stage_ms:>13.0f} ms  {'✅' if ok else '❌'}")
+    return rows
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measure main.py startup and per-command import cost.")
+    parser.add_argument("--repeat", type=int, default=5, help="Runs per measurement; the fastest is reported")
+    args = parser.parse_args()
+    benchmark_startup(args.repeat)
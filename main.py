@@ -2,7 +2,6 @@ import os
 import sys
 import subprocess
 import argparse
-import asyncio
 
 # Add the directories to Python path
 sys.path.append('01_scraper')
@@ -12,82 +11,323 @@ sys.path.append('04_text_preprocessor')
 sys.path.append('05_train_manifest')
 sys.path.append('06_dashboard')
 
-from scrape_data import scrape_nptel_course
-from scrape_transcripts import scrape_transcripts
-from download_data import *
-from clean_audio import *
-from remove_trailing_audio import *
-from rename_audio import *
-from preprocess_transcript import *
-from rename_transcripts import *
-from create_manifest import *
-from process_data import *
-
-
-def get_args():
-    parser = argparse.ArgumentParser(description="NPTEL YouTube Audio Scraper/Downloader.")
-    parser.add_argument("course_url", type=str, help="The NPTEL course URL to scrape.")
-    parser.add_argument("--download", action="store_true", help="Download audio from saved JSON file.")
-    parser.add_argument("--json", type=str, default="data/video_links.json", help="Path to JSON file.")
-    return parser.parse_args()
-
-args = get_args()
-COURSE_URL = args.course_url
-
-async def main():
-    # Define the folder name
-    folder_name = 'data'
-    if not os.path.exists(folder_name):
-        os.makedirs(folder_name)
-        print(f"✅ Folder '{folder_name}' created.")
-    else:
-        print(f"ℹ️ Folder '{folder_name}' already exists.")
+# Stage modules (playwright, librosa/pydub, PyPDF2, numpy, ...) are imported
+# inside the stage functions below, so a command only pays for what it runs
+# and `python main.py --help` stays fast. benchmark_startup.py measures it.
+
+SAMPLE_RATE = 16000
+TRIM_SECONDS = 10
+AUDIO_WORKERS = 4
+TEXT_WORKERS = 4
+SCRAPE_PAGES = 4
+COMMANDS = ("scrape", "download", "audio", "text", "manifest", "dashboard", "all")
+
+
+def get_parser():
+    parser = argparse.ArgumentParser(
+        description="NPTEL YouTube Audio Scraper/Downloader.",
+        epilog="A bare course URL (python main.py <url>) runs every stage, as `all` does."
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument("--force", action="store_true", help="Ignore the incremental build ledger and rebuild every artifact.")
+
+    courses = argparse.ArgumentParser(add_help=False)
+    courses.add_argument("course_url", type=str, nargs="+",
+                         help="The NPTEL course URL to scrape, or several URLs / files with one URL per line.")
+    courses.add_argument("--json", type=str, default="data/video_links.json", help="Path to JSON file.")
+
+    scraping = argparse.ArgumentParser(add_help=False)
+    scraping.add_argument("--rescrape", action="store_true", help="Scrape the course again even if the link files exist.")
+    scraping.add_argument("--dom_scrape", action="store_true", help="Scrape by clicking through the page instead of capturing its API responses.")
+    scraping.add_argument("--contexts", type=int, default=4, help="Courses scraped concurrently in batch mode.")
+
+    downloading = argparse.ArgumentParser(add_help=False)
+    downloading.add_argument("--migrate", action="store_true", help="Rename data downloaded under the old title-based names to lesson IDs.")
+
+    audio = argparse.ArgumentParser(add_help=False)
+    audio.add_argument("--clean_audio", action="store_true", help="Also remove silence, normalize and denoise audio.")
+    audio.add_argument("--in_memory_clean", action="store_true",
+                       help="Clean each lecture in one piece instead of block by block (needs memory for the whole lecture).")
+    audio.add_argument("--max_memory_gb", type=float, default=None,
+                       help="Memory budget for lectures cleaned at once (default: half of physical memory).")
+
+    text = argparse.ArgumentParser(add_help=False)
+    text.add_argument("--text_workers", type=int, default=TEXT_WORKERS,
+                      help="Worker processes extracting and normalizing transcript PDFs.")
+
+    commands.add_parser("scrape", parents=[common, courses, scraping], help="Scrape video and transcript links.")
+    download = commands.add_parser("download", parents=[common, downloading],
+                                   help="Download audio and transcripts from the scraped link files.")
+    download.add_argument("course_url", type=str, nargs="*",
+                          help="Courses whose data/courses/<id>/ link files to use (default: --json and data/transcripts.json).")
+    download.add_argument("--json", type=str, default="data/video_links.json", help="Path to JSON file.")
+    commands.add_parser("audio", parents=[common, audio], help="Convert and trim (optionally clean) downloaded audio.")
+    commands.add_parser("text", parents=[common, text], help="Extract and normalize transcript text.")
+    commands.add_parser("manifest", parents=[common], help="Build the manifest, segment manifest and tar shards.")
+    dashboard = commands.add_parser("dashboard", parents=[common], help="Build the dashboard database and serve it.")
+    dashboard.add_argument("--no_launch", action="store_true", help="Only build the database.")
+    run_all = commands.add_parser("all", parents=[common, courses, scraping, downloading, audio, text], help="Run every stage.")
+    run_all.add_argument("--no_dashboard", action="store_true", help="Do not launch the live dashboard while the pipeline runs.")
+    return parser
 
-    ## Scrape audio and transcript data from NPTEL site
-    await scrape_nptel_course(args.course_url, args.json)
-    await scrape_transcripts(args.course_url, "data/transcripts.json")
+
+def get_args(argv=None):
+    argv = sys.argv[1:] if argv is None else list(argv)
+    # Keep the old `python main.py <url> [flags]` form working
+    if argv and argv[0] not in COMMANDS and not argv[0].startswith("-"):
+        argv = ["all"] + argv
+    return get_parser().parse_args(argv)
+
+
+def link_files_for(args):
+    """(video_json, transcripts_json) pairs the download stage reads, without scraping."""
+    if not args.course_url:
+        return [(args.json, "data/transcripts.json")]
+    from scrape_batch import read_course_urls, course_link_files
+    course_urls = read_course_urls(args.course_url)
+    if len(course_urls) > 1:
+        return [course_link_files(url) for url in course_urls]
+    return [(args.json, "data/transcripts.json")]
+
+
+def require_course_urls(course_urls, sources):
+    """Exit with a clear message when the given URLs / URL files hold no course."""
+    if not course_urls:
+        sys.exit(f"❌ No course URLs in {' '.join(sources)} (files need one URL per line; # starts a comment).")
+    return course_urls
+
+
+def audio_jobs():
+    from convert_audio import find_audio_files
+    return [
+        (path, os.path.join("data/audio_processed", os.path.splitext(os.path.basename(path))[0] + ".wav"))
+        for path in find_audio_files("data/audio_downloads")
+    ]
+
+
+def text_jobs():
+    if not os.path.isdir("data/transcript_downloads"):
+        return []
+    return [
+        (os.path.join("data/transcript_downloads", f), os.path.join("data/transcript_processed", os.path.splitext(f)[0] + ".txt"))
+        for f in sorted(os.listdir("data/transcript_downloads")) if f.lower().endswith(".pdf")
+    ]
+
+
+async def scrape_stage(args, ledger):
+    """Scrape audio and transcript data from the NPTEL site; returns the link files."""
+    from scrape_data import scrape_nptel_course_parallel
+    from scrape_transcripts import scrape_transcripts
+    from scrape_api import scrape_course_via_api, ensure_link_file
+    from scrape_batch import scrape_courses, read_course_urls
+
+    course_urls = read_course_urls(args.course_url)
+    with ledger.stage("scrape"):
+        if len(course_urls) > 1:
+            # Batch mode: one shared browser, per-course link files under data/courses/
+            link_files = list((await scrape_courses(
+                course_urls, contexts=args.contexts, skip_existing=not args.rescrape, dom_scrape=args.dom_scrape
+            )).values())
+        else:
+            link_files = [(args.json, "data/transcripts.json")]
+            if args.rescrape or not os.path.exists(args.json) or not os.path.exists("data/transcripts.json"):
+                if args.dom_scrape:
+                    await scrape_nptel_course_parallel(course_urls[0], args.json, SCRAPE_PAGES)
+                    await scrape_transcripts(course_urls[0], "data/transcripts.json")
+                    ensure_link_file("data/transcripts.json")
+                else:
+                    await scrape_course_via_api(course_urls[0], args.json, "data/transcripts.json")
+            else:
+                print("ℹ️ Link files already exist, skipping scrape (use --rescrape to refresh).")
     print("✅ All video links and transcript links saved.")
+    return link_files
 
-    ## Download audio files and transcripts from the scraped JSON file
-    download_audio_from_json(args.json)
-    download_transcripts("data/transcripts.json", "data/transcript_downloads")
+
+def download_stage(args, ledger, link_files):
+    from download_data import download_audio_from_json, download_transcripts
+    from lesson_index import LessonIndex, index_link_files, migrate_data_dirs, link_file_course
+
+    ## One-off: move files named by the old rename passes over to lesson IDs
+    if args.migrate:
+        lessons = LessonIndex()
+        index_link_files(lessons, [v for v, _ in link_files], [t for _, t in link_files])
+        migrate_data_dirs(lessons)
+        lessons.save()
+
+    ## Download audio files and transcripts from the scraped JSON files; both are
+    ## saved under their lesson ID, so audio and text pair by name without renaming.
+    ## In batch mode the ID carries the course ID, so courses sharing the download
+    ## folders (and the ledger and manifest paths after them) never clash
+    with ledger.stage("download"):
+        for video_json, transcripts_json in link_files:
+            course = link_file_course(video_json)
+            download_audio_from_json(video_json, progress=ledger.progress, course=course)
+            download_transcripts(transcripts_json, "data/transcript_downloads", progress=ledger.progress, course=course)
     print("✅ All audio files and transcripts downloaded.")
 
-    ## Preprocess audio files
-    bash_script_path = "03_audio_preprocessor/preprocess_audio.sh"
-    subprocess.run(['bash', bash_script_path, 'data/audio_downloads', 'data/audio_wav', '4'])
 
-    ## Remove trailing audio from the downloaded files
-    trim_trailing_audio("data/audio_wav", "data/audio_processed", 10)
+def memory_budget(max_memory_gb):
+    """Bytes the audio stage may keep in flight: --max_memory_gb, or half of physical memory."""
+    if max_memory_gb:
+        return int(max_memory_gb * (1 << 30))
+    try:
+        return os.sysconf("SC_PAGE_SIZE") * os.sysconf("SC_PHYS_PAGES") // 2
+    except (ValueError, OSError, AttributeError):
+        return None
+
+
+def audio_stage(args, ledger):
+    """Decode, resample and trim audio in one pass (optionally clean), writing one WAV per lecture;
+    only new or changed downloads are processed."""
+    from functools import partial
+    from audio_pipeline import transform_audio_file, estimate_transform_memory
+    from pipeline_state import run_file_stage
+
+    # Clean block by block unless asked otherwise, so memory does not grow with lecture length
+    stream = args.clean_audio and not args.in_memory_clean
+    # Without cleaning, ffmpeg does the work in its own process and threads suffice;
+    # cleaning is CPU-bound Python, so it gets worker processes under a memory budget
+    run_file_stage(
+        ledger, "audio", audio_jobs(),
+        {"sample_rate": SAMPLE_RATE, "channels": 1, "seconds_to_trim": TRIM_SECONDS, "clean": args.clean_audio,
+         "stream": stream},
+        partial(transform_audio_file, sample_rate=SAMPLE_RATE, channels=1, trim_seconds=TRIM_SECONDS,
+                clean=args.clean_audio, stream=stream),
+        workers=AUDIO_WORKERS,
+        processes=args.clean_audio,
+        estimate=partial(estimate_transform_memory, sample_rate=SAMPLE_RATE, stream=stream),
+        max_memory_bytes=memory_budget(args.max_memory_gb) if args.clean_audio else None
+    )
     print("✅ All audio files converted and trimmed and saved to:", "data/audio_processed")
 
-    ## Preprocess transcripts
-    process_all_transcripts("data/transcript_downloads", "data/transcript_processed")
+
+def text_stage(args, ledger):
+    import preprocess_transcript
+    from pipeline_state import run_file_stage
+
+    os.makedirs("data/transcript_processed", exist_ok=True)
+    # PDF extraction and normalization are CPU-bound Python, so they get worker processes
+    run_file_stage(
+        ledger, "transcripts", text_jobs(), {"rules": preprocess_transcript.DEFAULT_NORMALIZER.describe()},
+        preprocess_transcript.process_transcript,
+        workers=args.text_workers,
+        processes=args.text_workers > 1
+    )
     print("✅ All transcripts processed and saved to:", "data/transcript_processed")
 
-    ## Rename audio files and transcripts to match
-    rename_audio_files_in_dir("data/audio_processed")
-    rename_transcript_files_in_dir("data/transcript_processed")
-    print("✅ All files renamed.")
 
-    ## Create manifest file
-    create_training_manifest()
+def manifest_stage(args, ledger):
+    from create_manifest import create_training_manifest
+    from segment_manifest import segment_manifest, MAX_SEGMENT_SECONDS
+    from export_shards import export_shards, SHARDS_DIR, SHARD_SIZE
+    from pipeline_state import run_aggregate_stage
+
+    audio_outputs = [out for _, out in audio_jobs()]
+    text_outputs = [out for _, out in text_jobs()]
+
+    ## Create manifest file (only when any processed audio or transcript changed)
+    manifest_inputs = [out for out in audio_outputs + text_outputs if os.path.exists(out)]
+    run_aggregate_stage(ledger, "manifest", manifest_inputs, {}, "train_manifest.jsonl", create_training_manifest)
     print("✅ Manifest file created.")
 
+    ## Split lectures into utterance-sized offset/duration rows
+    sidecars = [
+        os.path.splitext(out)[0] + suffix
+        for out in audio_outputs + text_outputs for suffix in (".kept.json", ".anchors.json")
+        if os.path.exists(os.path.splitext(out)[0] + suffix)
+    ]
+    run_aggregate_stage(
+        ledger, "segments", ["train_manifest.jsonl"] + sidecars, {"max_duration": MAX_SEGMENT_SECONDS},
+        "train_segments.jsonl", lambda: segment_manifest("train_manifest.jsonl", "train_segments.jsonl")
+    )
+    print("✅ Segment manifest created.")
+
+    ## Pack the segments into tar shards for sequential reading during training
+    run_aggregate_stage(
+        ledger, "shards", ["train_segments.jsonl"] + [out for out in audio_outputs if os.path.exists(out)],
+        {"shard_size": SHARD_SIZE}, os.path.join(SHARDS_DIR, "index.json"),
+        lambda: export_shards("train_segments.jsonl", SHARDS_DIR, SHARD_SIZE)
+    )
+    print("✅ Training shards exported to:", SHARDS_DIR)
+
+
+def dashboard_stage(args, ledger):
+    from process_data import process_manifest
+    from pipeline_state import run_aggregate_stage
+
     ## Process the data for Grafana
-    process_manifest("train_manifest.jsonl", "06_dashboard/processed_data.csv")
+    run_aggregate_stage(
+        ledger, "grafana", ["train_manifest.jsonl"], {}, "06_dashboard/processed_data.csv",
+        lambda: process_manifest("train_manifest.jsonl", "06_dashboard/processed_data.csv")
+    )
     print("✅ Processed data for Grafana.")
 
     ## Create SQLite database
-    process_manifest("train_manifest.jsonl", "06_dashboard/dashboard_data.db")
+    run_aggregate_stage(
+        ledger, "dashboard", ["train_manifest.jsonl"], {}, "06_dashboard/dashboard_data.db",
+        lambda: process_manifest("train_manifest.jsonl", "06_dashboard/dashboard_data.db")
+    )
     print("✅ SQLite database created.")
 
-    print("✅ All tasks completed successfully.")
-
-if __name__ == "__main__":
-    asyncio.run(main())
 
-    # 🚀 Launch dashboard after pipeline finishes
+def launch_dashboard():
     app_path = os.path.join("06_dashboard", "app.py")
-    subprocess.Popen([sys.executable, app_path])
+    process = subprocess.Popen([sys.executable, app_path])
     print("🌐 Dashboard started at http://127.0.0.1:8050")
+    return process
+
+
+def main(args):
+    import asyncio
+    from pipeline_state import PipelineLedger
+    from pipeline_progress import ProgressReporter, PROGRESS_DB_PATH
+
+    # An empty URL file fails here, before any folder, database or dashboard is created
+    if getattr(args, "course_url", None):
+        from scrape_batch import read_course_urls
+        require_course_urls(read_course_urls(args.course_url), args.course_url)
+
+    # Define the folder name
+    folder_name = 'data'
+    if not os.path.exists(folder_name):
+        os.makedirs(folder_name)
+        print(f"✅ Folder '{folder_name}' created.")
+    else:
+        print(f"ℹ️ Folder '{folder_name}' already exists.")
+
+    # 🚀 Launch the dashboard first; its pipeline panel follows the stages live
+    if args.command == "all" and not args.no_dashboard:
+        launch_dashboard()
+
+    # Stage progress goes into its own database next to the dashboard's, where the live dashboard polls it
+    progress = ProgressReporter(PROGRESS_DB_PATH)
+    ledger = PipelineLedger(force=args.force, progress=progress)
+
+    if args.command in ("scrape", "all"):
+        link_files = asyncio.run(scrape_stage(args, ledger))
+    if args.command == "download":
+        link_files = link_files_for(args)
+    if args.command in ("download", "all"):
+        download_stage(args, ledger, link_files)
+    if args.command in ("audio", "all"):
+        audio_stage(args, ledger)
+    if args.command in ("text", "all"):
+        text_stage(args, ledger)
+    if args.command in ("manifest", "all"):
+        manifest_stage(args, ledger)
+    if args.command in ("dashboard", "all"):
+        dashboard_stage(args, ledger)
+
+    ledger.report()
+    ledger.close()
+    progress.close()
+    print("✅ All tasks completed successfully.")
+
+    if args.command == "dashboard" and not args.no_launch:
+        launch_dashboard().wait()
+
+
+if __name__ == "__main__":
+    main(get_args())
@@ -0,0 +1,86 @@
+import os
+import time
+import uuid
+import sqlite3
+import threading
+
+# Kept apart from dashboard_data.db: progress commits must not change the
+# dashboard database's mtime, which keys the dashboard's query cache
+PROGRESS_DB_PATH = "06_dashboard/pipeline_progress.db"
+
+
+def output_stats(path):
+    """Bytes of a stage output and, for WAV files, its audio duration in seconds (header only)."""
+    if not path or not os.path.exists(path):
+        return 0, 0.0
+    seconds = 0.0
+    if path.lower().endswith(".wav"):
+        try:
+            import soundfile as sf
+            seconds = sf.info(path).duration
+        except Exception:
+            pass
+    return os.path.getsize(path), seconds
+
+
+class ProgressReporter:
+    """
+    Append-only log of pipeline progress next to the dashboard database.
+
+    Every stage writes a "start" event (with the number of items it will
+    process), one "item" or "fail" event per finished item (with its bytes and
+    audio seconds) and a "finish" event. Rows carry an increasing id, so the
+    dashboard polls with "id > last seen" and folds only the new events into
+    its per-stage throughput. The database is in WAL mode and each event is
+    committed at once, so the dashboard sees progress while stages run.
+    """
+
+    def __init__(self, db_path=PROGRESS_DB_PATH, run_id=None):
+        os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+        self.run_id = run_id or uuid.uuid4().hex[:12]
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(db_path, timeout=30, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript('''
+        CREATE TABLE IF NOT EXISTS pipeline_progress (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            run_id TEXT,
+            stage TEXT,
+            event TEXT,
+            ts REAL,
+            items INTEGER,
+            bytes INTEGER,
+            audio_seconds REAL,
+            item TEXT
+        );
+        CREATE INDEX IF NOT EXISTS idx_pipeline_progress_run ON pipeline_progress (run_id, id);
+        ''')
+
+    def _log(self, stage, event, items=0, nbytes=0, audio_seconds=0.0, item=None):
+        with self._lock:
+            self.conn.execute('''
+            INSERT INTO pipeline_progress (run_id, stage, event, ts, items, bytes, audio_seconds, item)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            ''', (self.run_id, stage, event, time.time(), items, nbytes, audio_seconds, item))
+            self.conn.commit()
+
+    def start(self, stage, total):
+        self._log(stage, "start", items=total)
+
+    def advance(self, stage, item=None, nbytes=0, audio_seconds=0.0):
+        self._log(stage, "item", 1, nbytes, audio_seconds, item)
+
+    def advance_output(self, stage, item, output_path):
+        """advance() with the bytes and audio duration of the file the item produced."""
+        nbytes, seconds = output_stats(output_path)
+        self.advance(stage, item, nbytes, seconds)
+
+    def fail(self, stage, item=None):
+        self._log(stage, "fail", 1, item=item)
+
+    def finish(self, stage):
+        self._log(stage, "finish")
+
+    def close(self):
+        self.conn.close()
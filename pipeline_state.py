@@ -0,0 +1,234 @@
+import os
+import json
+import time
+import sqlite3
+import hashlib
+from contextlib import contextmanager
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, FIRST_COMPLETED, wait
+
+LEDGER_PATH = "data/pipeline_state.db"
+
+
+def hash_params(params):
+    """Stable digest of a stage's parameters (sample rate, trim seconds, regex set, ...)."""
+    blob = json.dumps(params, sort_keys=True, default=str)
+    return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+
+def combine_digests(digests):
+    """Order-independent digest of a set of (key, digest) pairs, used for aggregate stages."""
+    h = hashlib.sha256()
+    for key, digest in sorted(digests):
+        h.update(f"{key}\0{digest}\n".encode("utf-8"))
+    return h.hexdigest()
+
+
+class PipelineLedger:
+    """
+    Persistent SQLite record of the artifacts each stage has produced.
+
+    An artifact is fresh when the content hash of its input and the digest of
+    the stage parameters match the last successful run and the recorded output
+    still exists, so unchanged lectures skip every stage on the next run.
+    """
+
+    def __init__(self, db_path=LEDGER_PATH, force=False, progress=None):
+        os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+        self.force = force
+        # Optional pipeline_progress.ProgressReporter fed by the stage runners
+        self.progress = progress
+        self.stats = {}
+        self.conn = sqlite3.connect(db_path)
+        self.conn.executescript('''
+        CREATE TABLE IF NOT EXISTS file_hashes (
+            path TEXT PRIMARY KEY,
+            size INTEGER,
+            mtime_ns INTEGER,
+            digest TEXT
+        );
+        CREATE TABLE IF NOT EXISTS artifacts (
+            stage TEXT,
+            key TEXT,
+            input_digest TEXT,
+            params_digest TEXT,
+            output_path TEXT,
+            updated_at REAL,
+            PRIMARY KEY (stage, key)
+        );
+        ''')
+
+    def file_digest(self, path):
+        """SHA-256 of a file, re-hashed only when its size or mtime changed."""
+        st = os.stat(path)
+        row = self.conn.execute(
+            "SELECT size, mtime_ns, digest FROM file_hashes WHERE path = ?", (path,)
+        ).fetchone()
+        if row and row[0] == st.st_size and row[1] == st.st_mtime_ns:
+            return row[2]
+
+        h = hashlib.sha256()
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                h.update(block)
+        digest = h.hexdigest()
+        self.conn.execute(
+            "INSERT OR REPLACE INTO file_hashes (path, size, mtime_ns, digest) VALUES (?, ?, ?, ?)",
+            (path, st.st_size, st.st_mtime_ns, digest)
+        )
+        self.conn.commit()
+        return digest
+
+    def is_fresh(self, stage, key, input_digest, params_digest, output_path):
+        row = self.conn.execute(
+            "SELECT input_digest, params_digest, output_path FROM artifacts WHERE stage = ? AND key = ?",
+            (stage, key)
+        ).fetchone()
+        fresh = (
+            not self.force
+            and row == (input_digest, params_digest, output_path)
+            and os.path.exists(output_path)
+        )
+        self._stage_stats(stage)["hits" if fresh else "misses"] += 1
+        return fresh
+
+    def record(self, stage, key, input_digest, params_digest, output_path):
+        self.conn.execute('''
+        INSERT OR REPLACE INTO artifacts (stage, key, input_digest, params_digest, output_path, updated_at)
+        VALUES (?, ?, ?, ?, ?, ?)
+        ''', (stage, key, input_digest, params_digest, output_path, time.time()))
+        self.conn.commit()
+
+    def record_failure(self, stage):
+        self._stage_stats(stage)["failures"] += 1
+
+    @contextmanager
+    def stage(self, name):
+        """Time a stage; wall time accumulates into the per-stage report."""
+        stats = self._stage_stats(name)
+        start = time.perf_counter()
+        try:
+            yield stats
+        finally:
+            stats["seconds"] += time.perf_counter() - start
+
+    def _stage_stats(self, name):
+        return self.stats.setdefault(name, {"hits": 0, "misses": 0, "failures": 0, "seconds": 0.0})
+
+    def report(self):
+        print("\n--- Pipeline stages ---")
+        print(f"{'stage':<14}{'hits':>8}{'misses':>8}{'failed':>8}{'wall (s)':>12}")
+        for name, s in self.stats.items():
+            print(f"{name:<14}{s['hits']:>8}{s['misses']:>8}{s['failures']:>8}{s['seconds']:>12.2f}")
+
+    def close(self):
+        self.conn.close()
+
+
+def run_file_stage(ledger, stage, jobs, params, fn, workers=1, processes=False, estimate=None, max_memory_bytes=None):
+    """
+    Run fn(input_path, output_path) for every (input_path, output_path) job whose
+    input content or stage parameters changed since the last successful run.
+    Ledger reads and writes stay on the calling thread; only fn runs in the pool.
+
+    CPU-bound stages pass processes=True (fn must then be picklable, e.g. a
+    module-level function or functools.partial). With max_memory_bytes, a job is
+    only started while estimate(input_path) summed over running jobs stays within
+    it; one job always runs, so a lecture larger than the budget still gets built.
+    Returns the number of artifacts rebuilt.
+    """
+    params_digest = hash_params(params)
+    with ledger.stage(stage):
+        pending = deque()
+        for input_path, output_path in jobs:
+            digest = ledger.file_digest(input_path)
+            if not ledger.is_fresh(stage, input_path, digest, params_digest, output_path):
+                pending.append((input_path, output_path, digest))
+
+        print(f"🔁 {stage}: {len(jobs) - len(pending)} up to date, {len(pending)} to build.")
+        progress = ledger.progress
+        if progress:
+            progress.start(stage, len(pending))
+        rebuilt = 0
+        workers = max(1, workers)
+        executor = ProcessPoolExecutor if processes else ThreadPoolExecutor
+        try:
+            with executor(max_workers=workers) as pool:
+                in_flight = {}
+                reserved = 0
+                while pending or in_flight:
+                    # Admit jobs while under the worker and memory bounds
+                    while pending and len(in_flight) < workers:
+                        inp, out, digest = pending[0]
+                        cost = estimate(inp) if max_memory_bytes and estimate else 0
+                        if max_memory_bytes and in_flight and reserved + cost > max_memory_bytes:
+                            break
+                        pending.popleft()
+                        in_flight[pool.submit(fn, inp, out)] = (inp, out, digest, cost)
+                        reserved += cost
+
+                    done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        inp, out, digest, cost = in_flight.pop(future)
+                        reserved -= cost
+                        try:
+                            future.result()
+                        except Exception as e:
+                            print(f"❌ {stage} failed for {inp}: {e}")
+                            ledger.record_failure(stage)
+                            if progress:
+                                progress.fail(stage, inp)
+                            continue
+                        if os.path.exists(out):
+                            ledger.record(stage, inp, digest, params_digest, out)
+                            rebuilt += 1
+                            if progress:
+                                progress.advance_output(stage, inp, out)
+                        else:
+                            ledger.record_failure(stage)
+                            if progress:
+                                progress.fail(stage, inp)
+        finally:
+            # Close the stage on the live panel even when the loop is interrupted
+            if progress:
+                progress.finish(stage)
+    return rebuilt
+
+
+def run_aggregate_stage(ledger, stage, input_paths, params, output_path, fn):
+    """
+    Run fn() once when any of input_paths (or the parameters) changed since the
+    last run that produced output_path. Returns True when fn ran.
+    """
+    params_digest = hash_params(params)
+    with ledger.stage(stage):
+        digest = combine_digests((p, ledger.file_digest(p)) for p in input_paths)
+        progress = ledger.progress
+        if ledger.is_fresh(stage, output_path, digest, params_digest, output_path):
+            print(f"🔁 {stage}: up to date.")
+            if progress:
+                progress.start(stage, 0)
+                progress.finish(stage)
+            return False
+        if progress:
+            progress.start(stage, 1)
+        try:
+            fn()
+        except BaseException:
+            ledger.record_failure(stage)
+            if progress:
+                progress.fail(stage, output_path)
+            raise
+        else:
+            if os.path.exists(output_path):
+                ledger.record(stage, output_path, digest, params_digest, output_path)
+                if progress:
+                    progress.advance_output(stage, output_path, output_path)
+            else:
+                ledger.record_failure(stage)
+                if progress:
+                    progress.fail(stage, output_path)
+        finally:
+            if progress:
+                progress.finish(stage)
+        return True
@@ -0,0 +1,8 @@
+import os
+import sys
+
+# The stage scripts import each other by module name, as main.py does
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+for folder in ("01_scraper", "02_downloader", "03_audio_preprocessor", "04_text_preprocessor",
+               "05_train_manifest", "06_dashboard", ""):
+    sys.path.insert(0, os.path.join(ROOT, folder))
@@ -0,0 +1,68 @@
+import os
+import shutil
+import threading
+
+import numpy as np
+import pytest
+import soundfile as sf
+
+from audio_pipeline import iter_decoded_pcm, transform_audio_file, PIPE_BLOCK_FRAMES
+
+STUB_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "corrupt_ffmpeg")
+
+
+@pytest.fixture
+def corrupt_ffmpeg(monkeypatch):
+    monkeypatch.setenv("PATH", STUB_DIR + os.pathsep + os.environ.get("PATH", ""))
+
+
+def test_long_error_log_does_not_block(corrupt_ffmpeg):
+    outcome = {}
+
+    def consume():
+        try:
+            outcome["frames"] = sum(len(block) for block in iter_decoded_pcm("lecture.mp3"))
+        except RuntimeError as e:
+            outcome["error"] = str(e)
+
+    worker = threading.Thread(target=consume, daemon=True)
+    worker.start()
+    worker.join(30)
+    assert not worker.is_alive(), "decoder hung on a full stderr pipe"
+    assert "ffmpeg failed for lecture.mp3" in outcome["error"]
+    assert "Header missing" in outcome["error"]
+
+
+def test_closing_early_keeps_the_consumers_error(corrupt_ffmpeg, monkeypatch):
+    monkeypatch.setenv("FFMPEG_STUB_PCM_BYTES", str(4 * PIPE_BLOCK_FRAMES * 2))
+    monkeypatch.setenv("FFMPEG_STUB_LOG_BYTES", "100")
+    with pytest.raises(ValueError, match="consumer failed"):
+        for block in iter_decoded_pcm("lecture.mp3"):
+            raise ValueError("consumer failed")
+    blocks = iter_decoded_pcm("lecture.mp3")
+    next(blocks)
+    blocks.close()  # does not raise for the exit status of a stream nobody finished
+
+
+@pytest.mark.skipif(shutil.which("ffmpeg") is None, reason="ffmpeg is not installed")
+def test_streaming_clean_keeps_its_scratch_file_out_of_the_manifest(tmp_path, monkeypatch):
+    import clean_audio
+    from create_manifest import index_tree
+
+    source = str(tmp_path / "lecture.flac")
+    sf.write(source, (np.sin(np.arange(16000 * 12) / 8) * 8000).astype(np.int16), 16000)
+    out_dir = tmp_path / "audio_processed"
+    scratch = []
+
+    def interrupted(input_path, output_path, *args, **kwargs):
+        # What a killed run leaves behind: the scratch file, no output
+        scratch.append(input_path)
+        assert sf.info(input_path).frames == 16000 * 2
+        assert index_tree(str(out_dir), ".wav") == {}
+        raise KeyboardInterrupt
+
+    monkeypatch.setattr(clean_audio, "clean_file_streaming", interrupted)
+    with pytest.raises(KeyboardInterrupt):
+        transform_audio_file(source, str(out_dir / "lecture.wav"), clean=True, stream=True)
+    assert os.path.basename(scratch[0]).endswith(".part")
+    assert os.listdir(out_dir) == []
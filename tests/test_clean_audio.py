@@ -0,0 +1,46 @@
+import numpy as np
+import soundfile as sf
+
+from clean_audio import (SilenceScanner, detect_silence_ranges, detect_nonsilent_ranges,
+                         detect_nonsilent_ranges_file, ms_energy, keep_ranges, scan_energy, rms_dbfs)
+
+
+def test_scanner_matches_whole_array_detection():
+    rng = np.random.default_rng(0)
+    for _ in range(500):
+        n = int(rng.integers(0, 4000))
+        min_silence_len = int(rng.integers(1, 600))
+        energy = ((rng.random(n) < rng.random()) * rng.integers(0, 10 ** 8, n)).astype(np.int64)
+        counts = np.full(n, 16, dtype=np.int64)
+        thresh = float(rng.uniform(-60, 0))
+
+        scanner = SilenceScanner(min_silence_len, thresh, 32768.0)
+        pos = 0
+        while pos < n:
+            size = int(rng.integers(1, 700))
+            scanner.feed(energy[pos:pos + size], counts[pos:pos + size])
+            pos += size
+        assert scanner.finish() == detect_silence_ranges(energy, counts, min_silence_len, thresh, 32768.0)
+
+
+def test_file_scan_matches_in_memory_ranges(tmp_path):
+    rng = np.random.default_rng(1)
+    sr = 16000
+    # Two minutes of alternating speech-like bursts and near-silence, so ranges cross energy blocks
+    loud = np.repeat(rng.random(240) < 0.6, sr // 2)
+    samples = (rng.normal(0, 20, len(loud)) + loud * rng.normal(0, 8000, len(loud)))
+    samples = np.clip(samples, -32768, 32767).astype(np.int16).reshape(-1, 1)
+    path = str(tmp_path / "lecture.wav")
+    sf.write(path, samples, sr, subtype="PCM_16")
+
+    energy, counts = ms_energy(samples, sr)
+    dbfs = rms_dbfs(int(energy.sum()), samples.size, 32768.0)
+    expected = keep_ranges(detect_nonsilent_ranges(energy, counts, 500, dbfs - 40, 32768.0), len(energy))
+
+    with sf.SoundFile(path) as f:
+        total_energy, _, n_ms, window_energy = scan_energy(f)
+        assert total_energy == int(energy.sum()) and n_ms == len(energy)
+        assert np.array_equal(window_energy, energy[:n_ms // 500 * 500].reshape(-1, 500).sum(axis=1))
+        nonsilent = detect_nonsilent_ranges_file(f, 500, dbfs - 40, 32768.0)
+    assert len(expected) > 10
+    assert keep_ranges(nonsilent, n_ms) == expected
@@ -0,0 +1,73 @@
+import os
+import json
+
+from download_data import download_audio_from_json, load_download_manifest
+
+STUB = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "yt-dlp")
+
+
+def read_log(path):
+    if not os.path.exists(path):
+        return []
+    with open(path, encoding="utf-8") as f:
+        return f.read().split()
+
+
+def test_download_with_stub(tmp_path, monkeypatch, capsys):
+    log = str(tmp_path / "calls.log")
+    monkeypatch.setenv("YTDLP_STUB_LOG", log)
+    links = tmp_path / "video_links.json"
+    links.write_text(json.dumps([
+        {"lesson_title": "Lecture 1", "youtube_link": "https://www.youtube.com/watch?v=one"},
+        {"lesson_title": "Lecture 2", "youtube_link": "https://www.youtube.com/watch?v=two"},
+        # Listed twice by the scraper: one download
+        {"lesson_title": "Lecture 2", "youtube_link": "https://www.youtube.com/watch?v=two"},
+        # Same title, different video: its own lesson ID
+        {"lesson_title": "Lecture 2", "youtube_link": "https://www.youtube.com/watch?v=three"},
+        {"lesson_title": "Broken", "youtube_link": "https://www.youtube.com/watch?v=fail"},
+    ]))
+    out = tmp_path / "audio"
+    out.mkdir()
+    # An interrupted download of lecture 1 is resumed, not skipped
+    (out / "lecture1.m4a.part").write_bytes(b"partial")
+    index = str(tmp_path / "lesson_index.json")
+
+    failures = download_audio_from_json(str(links), str(out), concurrency=3, retries=0,
+                                        ytdlp_bin=STUB, index_path=index)
+
+    assert failures == ["broken"]
+    assert "0 already downloaded, 1 duplicate entries, 4 to fetch" in capsys.readouterr().out
+    assert sorted(read_log(log)) == sorted([
+        "https://www.youtube.com/watch?v=one", "https://www.youtube.com/watch?v=two",
+        "https://www.youtube.com/watch?v=three", "https://www.youtube.com/watch?v=fail",
+    ])
+    manifest = load_download_manifest(str(out))
+    assert sorted(manifest) == ["lecture1", "lecture2", "lecture2-2"]
+    assert manifest["lecture2-2"]["link"].endswith("v=three")
+    assert all((out / record["file"]).exists() for record in manifest.values())
+
+    # A second run only retries the failed lesson
+    os.remove(log)
+    download_audio_from_json(str(links), str(out), retries=0, ytdlp_bin=STUB, index_path=index)
+    assert read_log(log) == ["https://www.youtube.com/watch?v=fail"]
+
+
+def test_courses_sharing_the_folder(tmp_path, monkeypatch):
+    monkeypatch.setenv("YTDLP_STUB_LOG", str(tmp_path / "calls.log"))
+    out = tmp_path / "audio"
+    index = str(tmp_path / "lesson_index.json")
+    for course, video in (("106106184", "one"), ("106106999", "two")):
+        links = tmp_path / "courses" / course / "video_links.json"
+        links.parent.mkdir(parents=True)
+        links.write_text(json.dumps([{"lesson_title": "Introduction",
+                                      "youtube_link": f"https://www.youtube.com/watch?v={video}"}]))
+        download_audio_from_json(str(links), str(out), retries=0, ytdlp_bin=STUB, index_path=index,
+                                 course=course)
+    # The second course's "Introduction" is downloaded, not skipped as already there
+    assert sorted(load_download_manifest(str(out))) == ["106106184-introduction", "106106999-introduction"]
+    assert sorted(read_log(str(tmp_path / "calls.log"))) == [
+        "https://www.youtube.com/watch?v=one", "https://www.youtube.com/watch?v=two"]
+
+
+def test_missing_link_file_is_no_failure(tmp_path):
+    assert download_audio_from_json(str(tmp_path / "missing.json"), str(tmp_path / "audio")) == []
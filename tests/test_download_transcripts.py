@@ -0,0 +1,113 @@
+import json
+import hashlib
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+
+from download_data import download_transcripts, load_download_manifest, TRANSCRIPT_MANIFEST
+
+
+def pdf(body):
+    return b"%PDF-1.4\n" + body * 2000 + b"\n%%EOF\n"
+
+
+FILES = {"f1": pdf(b"one"), "f2": pdf(b"two"), "big": pdf(b"large")}
+CONFIRM_TOKEN = "t0k3n"
+
+
+class DriveStandIn(BaseHTTPRequestHandler):
+    """Serves FILES like Drive's uc?export=download endpoint, including the confirm-token step."""
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        query = parse_qs(urlparse(self.path).query)
+        file_id = query.get("id", [None])[0]
+        self.server.requests.append((file_id, self.client_address[1]))
+        body = FILES.get(file_id)
+        if body is None:
+            return self.reply(404, b"not found")
+        etag = '"' + hashlib.md5(body).hexdigest() + '"'
+        if file_id == "big" and query.get("confirm") != [CONFIRM_TOKEN]:
+            return self.reply(200, b"<html>virus scan warning</html>",
+                              {"Set-Cookie": f"download_warning_1={CONFIRM_TOKEN}"})
+        if self.headers.get("If-None-Match") == etag:
+            return self.reply(304, b"")
+        self.reply(200, body, {"ETag": etag})
+
+    def reply(self, status, body, headers=None):
+        self.send_response(status)
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def drive():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), DriveStandIn)
+    server.requests = []
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def link(file_id):
+    return f"https://drive.google.com/file/d/{file_id}/view"
+
+
+def test_download_transcripts_against_local_server(tmp_path, drive, capsys):
+    base_url = f"http://127.0.0.1:{drive.server_address[1]}/uc"
+    links = tmp_path / "transcripts.json"
+    links.write_text(json.dumps([
+        {"title": "Lecture 1", "link": link("f1")},
+        {"title": "Lecture 1", "link": link("f1")},  # listed twice
+        {"title": "Lecture 2", "link": link("f2")},
+        {"title": "Lecture 3", "link": link("big")},
+        {"title": "Lecture 4", "link": link("f3")},
+        {"title": "Lecture 5", "link": link("missing")},
+    ]))
+    out = tmp_path / "pdfs"
+    out.mkdir()
+    # Downloaded by an older version, before the manifest existed
+    (out / "lecture4.pdf").write_bytes(pdf(b"three"))
+    index = str(tmp_path / "lesson_index.json")
+
+    failed = download_transcripts(str(links), str(out), workers=2, base_url=base_url, index_path=index)
+
+    assert failed == 1
+    # The duplicate is reported as such, not as already downloaded
+    assert "6 transcripts: 1 already downloaded, 1 duplicate entries, 0 without a Drive link, 4 to download" \
+        in capsys.readouterr().out
+    requested = [file_id for file_id, _ in drive.requests]
+    assert sorted(requested) == ["big", "big", "f1", "f2", "missing"]
+    # Each worker thread keeps its own connection alive across files
+    assert len({port for _, port in drive.requests}) <= 2
+    assert (out / "lecture1.pdf").read_bytes() == FILES["f1"]
+    assert (out / "lecture3.pdf").read_bytes() == FILES["big"]
+    assert not list(out.glob("*.part"))
+    manifest = load_download_manifest(str(out), TRANSCRIPT_MANIFEST)
+    assert sorted(manifest) == ["lecture1.pdf", "lecture2.pdf", "lecture3.pdf", "lecture4.pdf"]
+    assert manifest["lecture4.pdf"]["file_id"] == "f3"
+
+    # Nothing left to fetch but the failure
+    drive.requests.clear()
+    assert download_transcripts(str(links), str(out), workers=2, base_url=base_url, index_path=index) == 1
+    assert [file_id for file_id, _ in drive.requests] == ["missing"]
+
+    # Revalidation sends the recorded etags and keeps the files on 304
+    drive.requests.clear()
+    download_transcripts(str(links), str(out), workers=2, base_url=base_url, revalidate=True, index_path=index)
+    assert (out / "lecture2.pdf").read_bytes() == FILES["f2"]
+
+
+def test_missing_link_file_is_no_failure(tmp_path):
+    missing = str(tmp_path / "missing.json")
+    assert download_transcripts(missing, str(tmp_path / "pdfs")) == 0
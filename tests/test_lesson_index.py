@@ -0,0 +1,67 @@
+import json
+
+from lesson_index import LessonIndex, index_link_files, link_file_course, youtube_video_id
+
+
+def test_same_title_from_different_sources_is_a_collision(tmp_path):
+    index = LessonIndex(str(tmp_path / "index.json"))
+    first = index.lesson_id("Introduction", "audio", "vidA")
+    second = index.lesson_id("Introduction", "audio", "vidB")
+    assert (first, second) == ("introduction", "introduction-2")
+    assert len(index.collisions) == 1 and index.collisions[0]["source"] == "vidB"
+
+    # Same source again: same ID, no new collision
+    assert index.lesson_id("Introduction", "audio", "vidB") == "introduction-2"
+    assert len(index.collisions) == 1
+
+    # Transcripts pair with the audio lessons in order
+    assert index.lesson_id("Introduction", "transcript", "fileA") == "introduction"
+    assert index.lesson_id("Introduction", "transcript", "fileB") == "introduction-2"
+
+
+def test_ids_survive_reload_and_adopt_sources(tmp_path):
+    path = str(tmp_path / "index.json")
+    # An index written before sources were recorded
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"lessons": {"graphs": {"key": "graphs", "titles": {"audio": "Graphs"}}}, "collisions": []}, f)
+    index = LessonIndex(path)
+    assert index.lesson_id("Graphs", "audio", "vid1") == "graphs"
+    index.save()
+
+    index = LessonIndex(path)
+    assert index.lesson_id("Graphs", "audio", "vid1") == "graphs"
+    assert index.lesson_id("Graphs", "audio", "vid2") == "graphs-2"
+
+
+def test_index_link_files_uses_sources(tmp_path):
+    videos = tmp_path / "video_links.json"
+    videos.write_text(json.dumps([
+        {"lesson_title": "Lecture 1 - Introduction", "youtube_link": "https://www.youtube.com/watch?v=aaa"},
+        {"lesson_title": "Lecture 1 - Introduction", "youtube_link": "https://youtu.be/bbb"},
+    ]))
+    transcripts = tmp_path / "transcripts.json"
+    transcripts.write_text(json.dumps([
+        {"title": "Lecture 1 - Introduction", "link": "https://drive.google.com/file/d/f1/view"},
+    ]))
+    index = LessonIndex(str(tmp_path / "index.json"))
+    index_link_files(index, [str(videos)], [str(transcripts)])
+    lessons = index.lessons
+    assert lessons["lecture1introduction"]["sources"] == {"audio": "aaa", "transcript": "f1"}
+    assert lessons["lecture1introduction-2"]["sources"] == {"audio": "bbb"}
+    assert youtube_video_id("https://www.youtube.com/embed/ccc") == "ccc"
+
+
+def test_courses_get_their_own_lessons(tmp_path):
+    index = LessonIndex(str(tmp_path / "index.json"))
+    for course, video in (("106106184", "aaa"), ("106106999", "bbb")):
+        links = tmp_path / "courses" / course / "video_links.json"
+        links.parent.mkdir(parents=True)
+        links.write_text(json.dumps([{"lesson_title": "Introduction", "youtube_link": f"https://youtu.be/{video}"}]))
+        assert link_file_course(str(links)) == course
+        index_link_files(index, [str(links)])
+    # Same title in two courses: two lessons, not a collision
+    assert sorted(index.lessons) == ["106106184-introduction", "106106999-introduction"]
+    assert index.collisions == []
+    assert index.lesson_id("Introduction", "transcript", "f1", "106106999") == "106106999-introduction"
+    assert sorted(index.ids_for_key("introduction")) == sorted(index.lessons)
+    assert link_file_course("data/video_links.json") is None
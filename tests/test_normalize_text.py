@@ -0,0 +1,51 @@
+import os
+import json
+
+from normalize_text import DEFAULT_NORMALIZER, TextNormalizer, clean_text_legacy, fuzz_equivalence
+import preprocess_transcript
+from preprocess_transcript import pdf_to_text, process_transcript, anchors_path
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PATTERNS = [rule["pattern"] for rule in DEFAULT_NORMALIZER.rules]
+
+
+def test_rule_order_matches_cascade():
+    for text in (
+        "Department of Prof. \n",
+        "Welcome (see Indian Institute of Technology Madras) to this course (part 1) on graphs",
+    ):
+        assert DEFAULT_NORMALIZER.clean(text) == clean_text_legacy(text, PATTERNS)
+
+
+def test_fuzz_equivalence():
+    assert fuzz_equivalence(3000, seed=1) == []
+
+
+def test_raw_transcripts_match_cascade():
+    texts = [pdf_to_text(os.path.join(ROOT, "01_scraper", "transcripts", "106106139.pdf"))]
+    with open(os.path.join(ROOT, "train_manifest.jsonl"), encoding="utf-8") as f:
+        texts += [json.loads(line)["text"] for line in f if line.strip()]
+    for text in texts:
+        assert DEFAULT_NORMALIZER.clean(text) == clean_text_legacy(text, PATTERNS)
+
+
+def test_process_transcript_cleans_the_whole_text_once(tmp_path, monkeypatch):
+    raw_text = ("Welcome to lecture 1 on graphs.\n(Refer Slide Time: 00:15)\nA graph has 2 parts, "
+                "vertices and edges.\n(Refer Slide Time: 01:02)\nNow (see slide 3) we look at trees.\n") * 50
+    monkeypatch.setattr(preprocess_transcript, "extract_pdf_text_cached",
+                        lambda path, cache_dir: (raw_text, {"pages": 1, "cached": True}))
+
+    class CountingNormalizer(TextNormalizer):
+        whole_text_cleans = 0
+
+        def clean(self, text):
+            if text == raw_text:
+                CountingNormalizer.whole_text_cleans += 1
+            return super().clean(text)
+
+    out = str(tmp_path / "lesson.txt")
+    process_transcript("lesson.pdf", out, str(tmp_path / "cache"), CountingNormalizer())
+    assert CountingNormalizer.whole_text_cleans == 1
+    with open(anchors_path(out), encoding="utf-8") as f:
+        anchors = json.load(f)
+    assert len(anchors) == 100 and anchors == DEFAULT_NORMALIZER.word_anchors(raw_text)
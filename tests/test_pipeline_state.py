@@ -0,0 +1,37 @@
+import time
+import threading
+
+from pipeline_state import PipelineLedger, run_file_stage
+
+
+def test_memory_admission_bounds_running_jobs(tmp_path):
+    jobs = []
+    for i in range(6):
+        path = tmp_path / f"in{i}.txt"
+        path.write_text(str(i))
+        jobs.append((str(path), str(tmp_path / f"out{i}.txt")))
+    running = []
+    peak = []
+    lock = threading.Lock()
+
+    def build(inp, out):
+        with lock:
+            running.append(inp)
+            peak.append(len(running))
+        time.sleep(0.05)
+        with lock:
+            running.remove(inp)
+        with open(out, "w") as f:
+            f.write("done")
+
+    ledger = PipelineLedger(str(tmp_path / "ledger.db"))
+    # Three workers, but the budget only fits two 40-byte jobs at a time
+    rebuilt = run_file_stage(ledger, "stage", jobs, {}, build, workers=3,
+                             estimate=lambda inp: 40, max_memory_bytes=100)
+    assert rebuilt == 6
+    assert max(peak) == 2
+
+    # A job larger than the whole budget still runs, alone
+    (tmp_path / "in0.txt").write_text("changed")
+    assert run_file_stage(ledger, "stage", jobs[:1], {}, build, estimate=lambda inp: 500, max_memory_bytes=100) == 1
+    ledger.close()
@@ -0,0 +1,43 @@
+import json
+import sqlite3
+from concurrent.futures import ProcessPoolExecutor
+
+import process_data
+from process_data import process_manifest
+
+
+def write_manifest(path, n):
+    with open(path, "w", encoding="utf-8") as f:
+        for i in range(n):
+            f.write(json.dumps({"audio_filepath": f"data/audio_processed/lesson{i}.wav", "duration": 1.0 + i,
+                                "text": f"lecture {i} on graphs and trees",
+                                "pred_text": f"lecture {i} on graph and three"}) + "\n")
+
+
+def error_rows(db_file):
+    conn = sqlite3.connect(db_file)
+    try:
+        return conn.execute("SELECT audio_filepath, word_errors, char_errors FROM audio_data ORDER BY 1").fetchall()
+    finally:
+        conn.close()
+
+
+def test_one_pool_for_all_batches(tmp_path, monkeypatch):
+    manifest = str(tmp_path / "train_manifest.jsonl")
+    write_manifest(manifest, 9)
+    pools = []
+
+    class CountingPool(ProcessPoolExecutor):
+        def __init__(self, *args, **kwargs):
+            pools.append(self)
+            super().__init__(*args, **kwargs)
+
+    monkeypatch.setattr(process_data, "ProcessPoolExecutor", CountingPool)
+    process_manifest(manifest, str(tmp_path / "pooled.db"), workers=2, batch_size=2)
+    process_manifest(manifest, str(tmp_path / "serial.db"), workers=1, batch_size=2)
+
+    # Five batches, one pool; same errors as computing them in-process
+    assert len(pools) == 1
+    rows = error_rows(str(tmp_path / "pooled.db"))
+    assert len(rows) == 9 and all(word_errors == 2 for _, word_errors, _ in rows)
+    assert rows == error_rows(str(tmp_path / "serial.db"))
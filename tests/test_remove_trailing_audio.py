@@ -0,0 +1,72 @@
+import os
+import wave
+import struct
+
+import numpy as np
+import pytest
+from pydub import AudioSegment
+
+from remove_trailing_audio import trim_audio_file, trim_audio_file_pydub, trim_trailing_audio
+
+
+def write_wav(path, seconds, rate=16000, channels=1, trailing_chunk=False):
+    rng = np.random.default_rng(int(seconds * 1000) + rate + channels)
+    samples = rng.integers(-32768, 32767, size=(int(seconds * rate), channels), dtype=np.int16)
+    with wave.open(path, "wb") as f:
+        f.setnchannels(channels)
+        f.setsampwidth(2)
+        f.setframerate(rate)
+        f.writeframes(samples.tobytes())
+    if trailing_chunk:
+        # A LIST chunk after the data, as some encoders write; in-place truncation must not cut it off
+        with open(path, "r+b") as f:
+            f.seek(0, os.SEEK_END)
+            f.write(b"LIST" + struct.pack("<I", 4) + b"INFO")
+            size = f.tell() - 8
+            f.seek(4)
+            f.write(struct.pack("<I", size))
+
+
+def pydub_samples(path):
+    audio = AudioSegment.from_wav(path)
+    return audio.raw_data, audio.frame_rate, audio.channels
+
+
+CASES = [
+    {"seconds": 25.3},
+    {"seconds": 10.0005},
+    {"seconds": 3.0},
+    {"seconds": 12.7, "rate": 44100, "channels": 2},
+    {"seconds": 14.1, "rate": 8000, "trailing_chunk": True},
+]
+
+
+@pytest.mark.parametrize("case", CASES)
+@pytest.mark.parametrize("in_place", [False, True])
+def test_trim_matches_pydub_slice(tmp_path, case, in_place):
+    source = str(tmp_path / "lecture.wav")
+    write_wav(source, **case)
+    expected = str(tmp_path / "expected.wav")
+    trim_audio_file_pydub(source, expected, seconds_to_trim=10)
+
+    if in_place:
+        output = source
+    else:
+        output = str(tmp_path / "out" / "lecture.wav")
+        os.makedirs(os.path.dirname(output))
+    trim_audio_file(source, output, seconds_to_trim=10)
+    assert pydub_samples(output) == pydub_samples(expected)
+
+
+def test_folder_trim_reports_failures(tmp_path):
+    input_dir, output_dir = tmp_path / "wav", tmp_path / "processed"
+    input_dir.mkdir()
+    write_wav(str(input_dir / "a.wav"), 12)
+    write_wav(str(input_dir / "b.wav"), 11)
+    (input_dir / "broken.wav").write_bytes(b"RIFF\0\0\0\0WAVEjunk")
+
+    failed = trim_trailing_audio(str(input_dir), str(output_dir), seconds_to_trim=10, workers=2)
+
+    assert failed == [str(input_dir / "broken.wav")]
+    assert pydub_samples(str(output_dir / "a.wav"))[0] == AudioSegment.from_wav(str(input_dir / "a.wav"))[:2000].raw_data
+    assert (output_dir / "b.wav").exists()
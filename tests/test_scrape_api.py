@@ -0,0 +1,81 @@
+import os
+import json
+import asyncio
+
+import scrape_api
+from scrape_api import load_recorded_responses, parse_course_payloads, scrape_course_via_api
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+REPLAY_DIR = os.path.join(FIXTURES, "nptel_api")
+
+EXPECTED_LESSONS = [
+    {"lesson_title": "Lecture 1 - Introduction", "youtube_link": "https://www.youtube.com/watch?v=lesson00001"},
+    {"lesson_title": "Lecture 2 - Graphs and Trees", "youtube_link": "https://www.youtube.com/watch?v=lesson00002"},
+    {"lesson_title": "Lecture 3 - Breadth First Search", "youtube_link": "https://www.youtube.com/watch?v=lesson00003"},
+    {"lesson_title": "Lecture 4 - Depth First Search", "youtube_link": "https://www.youtube.com/watch?v=lesson00004"},
+    # Shares its video with lecture 4 and is still a lesson of its own
+    {"lesson_title": "Lecture 4 - Depth First Search (Recap)",
+     "youtube_link": "https://www.youtube.com/watch?v=lesson00004"},
+    {"lesson_title": "Lecture 5 - Shortest Paths", "youtube_link": "https://www.youtube.com/watch?v=lesson00005"},
+]
+EXPECTED_TRANSCRIPTS = [
+    {"title": "Lecture 1 - Introduction", "link": "https://drive.google.com/file/d/transcript01en/view"},
+    {"title": "Lecture 2 - Graphs and Trees", "link": "https://drive.google.com/file/d/transcript02en/view"},
+]
+
+
+def test_parse_recorded_payloads():
+    # The promo, instructor intro and announcement videos, and language
+    # records' "name" fields, must not turn into lessons or titles
+    lessons, transcripts = parse_course_payloads([p["body"] for p in load_recorded_responses(REPLAY_DIR)])
+    assert lessons == EXPECTED_LESSONS
+    assert transcripts == EXPECTED_TRANSCRIPTS
+
+
+def test_replay_saves_link_files(tmp_path):
+    video_json, transcripts_json = str(tmp_path / "video_links.json"), str(tmp_path / "transcripts.json")
+    asyncio.run(scrape_course_via_api("https://nptel.ac.in/courses/106106183", video_json, transcripts_json,
+                                      replay_dir=REPLAY_DIR))
+    with open(video_json, encoding="utf-8") as f:
+        assert json.load(f) == EXPECTED_LESSONS
+    with open(transcripts_json, encoding="utf-8") as f:
+        assert json.load(f) == EXPECTED_TRANSCRIPTS
+
+
+def test_unrecognised_outline_falls_back_to_dom(tmp_path, monkeypatch):
+    replay = tmp_path / "replay"
+    replay.mkdir()
+    with open(os.path.join(FIXTURES, "nptel_api_promo_only.json"), encoding="utf-8") as f:
+        (replay / "000.json").write_text(f.read(), encoding="utf-8")
+    calls = []
+
+    async def dom_lessons(course_url, output_json, context=None):
+        calls.append("lessons")
+        return []
+
+    async def dom_transcripts(course_url, output_json, context=None):
+        calls.append("transcripts")
+        return []
+
+    monkeypatch.setattr(scrape_api, "scrape_nptel_course_parallel", dom_lessons)
+    monkeypatch.setattr(scrape_api, "scrape_transcripts", dom_transcripts)
+    asyncio.run(scrape_course_via_api("https://nptel.ac.in/courses/106106999", str(tmp_path / "v.json"),
+                                      str(tmp_path / "t.json"), replay_dir=str(replay)))
+    assert calls == ["lessons", "transcripts"]
+    assert not os.path.exists(tmp_path / "v.json")
+
+
+def test_course_without_transcripts_saves_an_empty_list(tmp_path, monkeypatch):
+    replay = tmp_path / "replay"
+    replay.mkdir()
+    with open(os.path.join(REPLAY_DIR, "000.json"), encoding="utf-8") as f:
+        (replay / "000.json").write_text(f.read(), encoding="utf-8")
+
+    async def no_transcripts(course_url, output_json, context=None):
+        return None  # e.g. the course has no Downloads tab
+
+    monkeypatch.setattr(scrape_api, "scrape_transcripts", no_transcripts)
+    transcripts_json = tmp_path / "transcripts.json"
+    asyncio.run(scrape_course_via_api("https://nptel.ac.in/courses/106106183", str(tmp_path / "v.json"),
+                                      str(transcripts_json), replay_dir=str(replay)))
+    assert json.loads(transcripts_json.read_text()) == []
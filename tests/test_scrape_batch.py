@@ -0,0 +1,60 @@
+import os
+import json
+import asyncio
+
+import scrape_batch
+from scrape_batch import scrape_courses, course_link_files
+
+
+class FakeContext:
+    async def close(self):
+        pass
+
+
+class FakeBrowser:
+    async def new_context(self):
+        return FakeContext()
+
+    async def close(self):
+        pass
+
+
+class FakePlaywright:
+    class chromium:
+        @staticmethod
+        async def launch(headless=True):
+            return FakeBrowser()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+
+def test_course_without_transcripts_is_downloaded_and_cached(tmp_path, monkeypatch):
+    calls = []
+
+    async def lessons_only(course_url, video_json, transcripts_json, context=None):
+        # What a scraper did for a course without transcripts: lesson links only
+        calls.append(course_url)
+        os.makedirs(os.path.dirname(video_json), exist_ok=True)
+        with open(video_json, "w", encoding="utf-8") as f:
+            json.dump([{"lesson_title": "Introduction", "youtube_link": "https://youtu.be/aaa"}], f)
+        return [{}], []
+
+    monkeypatch.setattr(scrape_batch, "async_playwright", FakePlaywright)
+    monkeypatch.setattr(scrape_batch, "scrape_course_via_api", lessons_only)
+    url = "https://nptel.ac.in/courses/106106184"
+    root = str(tmp_path / "courses")
+
+    link_files = asyncio.run(scrape_courses([url], root))
+    assert link_files == {url: course_link_files(url, root)}
+    with open(os.path.join(root, "index.json"), encoding="utf-8") as f:
+        assert json.load(f)["106106184"]["status"] == "ok"
+
+    # Written by the real scrapers as []; then the course is not scraped again
+    with open(course_link_files(url, root)[1], "w", encoding="utf-8") as f:
+        json.dump([], f)
+    asyncio.run(scrape_courses([url], root))
+    assert calls == [url]
@@ -0,0 +1,46 @@
+import os
+import json
+import asyncio
+
+import pytest
+
+from scrape_data import scrape_nptel_course_parallel
+
+FIXTURE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "nptel_course.html")
+
+
+async def scrape_fixture(json_path, pages):
+    from playwright.async_api import async_playwright
+
+    async with async_playwright() as p:
+        try:
+            browser = await p.chromium.launch(headless=True)
+        except Exception as e:
+            pytest.skip(f"Chromium is not installed: {e}")
+        context = await browser.new_context()
+        # Keep the player offline: every YouTube embed is an empty page
+        await context.route("**/*youtube.com/**", lambda route: route.fulfill(body="<html></html>"))
+        data = await scrape_nptel_course_parallel("file://" + FIXTURE, json_path, pages=pages,
+                                                  timeout_ms=1500, context=context)
+        await browser.close()
+    return data
+
+
+@pytest.mark.parametrize("pages", [1, 3])
+def test_scrape_static_course_fixture(tmp_path, capsys, pages):
+    json_path = str(tmp_path / "video_links.json")
+    data = asyncio.run(scrape_fixture(json_path, pages))
+
+    assert [(d["lesson_title"], d["youtube_link"][-11:]) for d in data] == [
+        ("Lecture 1 - Introduction", "lesson00001"),  # already playing when the page opens
+        ("Lecture 2 - Graphs", "lesson00002"),
+        ("Lecture 3 - Trees", "lesson00003"),
+        ("Lecture 5 - Introduction", "lesson00005"),
+        ("Lecture 6 - Paths", "lesson00006"),
+        ("Lecture 7 - Paths (re-upload)", "lesson00006"),  # same video, still its own lesson
+    ]
+    with open(json_path, encoding="utf-8") as f:
+        assert json.load(f) == data
+    out = capsys.readouterr().out
+    assert "player stayed on the previous video after 2 clicks on 'Lecture 4 - Reading Material'" in out
+    assert "No YouTube iframe found" not in out